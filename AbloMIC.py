@@ -10,10 +10,10 @@ widgets imported from different modules. The application is built on ``PyQt5``.
 The microscope employs **Xeryon** and **Navitar** motors for precise movements
 and **Basler** camera for grabbing pictures and video.
 
-Todo:
-    Microscope should have an autofocus feature. This can be done, for example,
-    by **OpenCV** and blur detection as described `here
-    <https://www.pyimagesearch.com/2015/09/07/blur-detection-with-opencv/>`_.
+Focus is found by :class:`autofocus.AutoFocus` which moves the Z stage and
+measures blur of the live stream (similar to the blur detection described
+`here <https://www.pyimagesearch.com/2015/09/07/blur-detection-with-opencv/>`_
+but vectorized in ``NumPy``).
 
 """
 
@@ -53,6 +53,9 @@ import qtawesome as qta     # qta-browser
 
 import ablolib as al
 import xeryon
+from autofocus import (AutoFocus, FocusLock, FocusMapper, AutoFocusGUI,
+    FocusMapGUI)
+from tilescan import TileScan, TileScanGUI
 
 
 class MicGUI(QWidget):
@@ -70,6 +73,15 @@ class MicGUI(QWidget):
         motorY: Instance of :class:`xeryon.Motor`
         motorR: Instance of :class:`xeryon.Motor`
         motorZ: Instance of :class:`xeryon.Motor`
+        autofocus: Instance of :class:`autofocus.AutoFocus` driving
+            :attr:`motorZ`, it gets frames of the :attr:`basler` stream.
+        focusLock: Instance of :class:`autofocus.FocusLock` keeping
+            :attr:`motorZ` in focus while scanning XY.
+        focusMapper: Instance of :class:`autofocus.FocusMapper` which maps
+            focus within limits of :attr:`xystage`.
+        tileScan: Instance of :class:`tilescan.TileScan` which acquires
+            mosaics by moving :attr:`motorX` and :attr:`motorY` (and
+            :attr:`motorZ` according to the focus map).
 
         xystage: Widget of :class:`xeryon.XYWidget`
 
@@ -133,11 +145,35 @@ class MicGUI(QWidget):
             axis_letter='Z3',
             closeSignal = parentCloseSignal)
 
+        # Autofocus measures frames of the Basler stream
+        self.autofocus = AutoFocus(motor=self.motorZ)
+        self.focusLock = FocusLock(motor=self.motorZ,autofocus=self.autofocus,
+            motorX=self.motorX,motorY=self.motorY)
+        self.basler.consumers.append(self.autofocus)
+        self.basler.consumers.append(self.focusLock)
+        self.focusMapper = FocusMapper(self.autofocus,self.motorX,self.motorY)
+
         vbox = QVBoxLayout()
         vbox.addWidget(xeryon.MoveVGUI(motor=self.motorZ))
+        vbox.addWidget(AutoFocusGUI(self.autofocus,self.basler,
+            focusLock=self.focusLock,messageSignal=messageSignal))
+        vbox.addWidget(FocusMapGUI(self.focusMapper,self.xystage,self.basler,
+            messageSignal=messageSignal))
         zGB = QGroupBox('Z movements')
         zGB.setLayout(vbox)
 
+        # Tile scan ------------------------------------------------------------
+
+        self.tileScan = TileScan(self.basler.Basler,self.motorX,self.motorY,
+            focusMapper=self.focusMapper,focusLock=self.focusLock)
+        self.basler.consumers.append(self.tileScan)
+
+        vbox = QVBoxLayout()
+        vbox.addWidget(TileScanGUI(self.tileScan,self.xystage,self.basler,
+            messageSignal=messageSignal))
+        scanGB = QGroupBox('Tile scan')
+        scanGB.setLayout(vbox)
+
         # Rotational stage -----------------------------------------------------
 
         self.motorR = xeryon.Motor(
@@ -168,6 +204,7 @@ class MicGUI(QWidget):
         mainVBox.addWidget(baslerGB)
         mainVBox.addWidget(xyGB)
         mainVBox.addWidget(zGB)
+        mainVBox.addWidget(scanGB)
         mainVBox.addWidget(rotateGB)
         mainVBox.addWidget(xeryonGB)
         mainVBox.addStretch(1)
@@ -180,6 +217,14 @@ class MicGUI(QWidget):
         self.motorY.connect()
         self.motorZ.connect()
         self.motorR.connect()
+
+        # Record stage positions with each frame of recorded video
+        self.basler.metadata.update({
+            'X': self.motorX.EPOS.get,
+            'Y': self.motorY.EPOS.get,
+            'Z': self.motorZ.EPOS.get,
+            'R': self.motorR.EPOS.get,
+        })
         # self.xystage.update()
 
     def closeEvent(self,*_):
@@ -176,7 +176,7 @@ class WorkerSignals(QObject):
     finished = pyqtSignal()
 
 class Worker(QRunnable):
-    """ Worker thread. Used by `xeryon.py`. """
+    """ Worker thread. Used by `xeryon.py` and `basler.py`. """
 
     def __init__(self, fn, *args, name="Noname", **kwargs):
         super(Worker, self).__init__()
@@ -190,11 +190,11 @@ class Worker(QRunnable):
     @pyqtSlot()
     def run(self):
 
-        self.fn(*self.args, **self.kwargs)
         try:
             self.fn(*self.args, **self.kwargs)
-        except:
+        except Exception as ex:
             printE(f"{self.name} worker: Something went wrong while executing thread function.")
+            printException(ex)
         finally:
             self.signals.finished.emit()
 
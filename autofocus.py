@@ -0,0 +1,1174 @@
+"""
+Autofocus
+=========
+
+Module used to focus the microscope by moving the Z stage
+(:class:`xeryon.Motor`) and measuring sharpness of the live stream of the
+**Basler** camera.
+
+**Sharpness:** Focus metrics are computed on a region of interest in the
+center of the image (:func:`focusROI`) decimated to at most
+:data:`ROI_SIZE` pixels, so one measurement takes about a millisecond
+regardless of the camera resolution. Raw images of color cameras are
+measured on one green plane. All metrics are vectorized (see
+:data:`METRICS`):
+
+    - :func:`varianceOfLaplacian`: variance of the 4-neighbor Laplacian,
+    - :func:`tenengrad`: mean squared magnitude of the Sobel gradient.
+
+**Frames:** No extra images are grabbed (which would stop the stream, see
+:func:`basler.Thread.pause`). :class:`AutoFocus` is one of
+:attr:`basler.Thread.consumers`, it waits for the first frame exposed after
+the stage settled (:class:`FrameRequest`) and measures it in the
+acquisition thread.
+
+**Search:** Coarse-to-fine, see :func:`AutoFocus.search`.
+
+**Focus lock:** :class:`FocusLock` keeps the stage in focus while the sample
+moves (e.g. tilted sample scanned in XY) by small corrective steps, see
+:func:`FocusLock.push`.
+
+**Focus map:** :class:`FocusMapper` focuses a sparse grid of points
+(:func:`mapGrid`) within the limits of the XY stage and fits a smooth
+surface (:class:`FocusMap`) through them. Afterwards Z is commanded from the
+surface whenever the XY stage moves, so tiles of a scan need a single Z move
+instead of focusing.
+"""
+
+import time
+import threading
+import numpy as np
+from PyQt5.QtCore import Qt, QObject, QThreadPool, pyqtSignal
+from PyQt5.QtWidgets import (QWidget, QPushButton, QHBoxLayout, QLabel,
+    QComboBox, QLineEdit, QCheckBox)
+from PyQt5.QtGui import QDoubleValidator
+
+import ablolib as al
+from bayer import BAYER_PATTERNS
+
+# Region of interest: fraction of the image (centered), maximum size after
+# decimation [px]
+ROI_FRACTION = 0.5
+ROI_SIZE = 256
+
+# Coarse-to-fine search: range of the first level [mm] and number of
+# positions at each level. Each level spans two steps of the previous one.
+AF_SPAN = 0.4
+AF_STEPS = (9,5,5)
+
+# Frame is taken if its frame counter is at least FRAME_SKIP above the newest
+# frame seen when the stage settled: the next frame may be exposed already
+# (in transfer). Host time is not used, transfer takes tens of ms.
+FRAME_SKIP = 2
+FRAME_TIMEOUT = 2.0     # [s]
+
+# Focus lock: sharpness is measured on every N-th frame (smaller ROI),
+# correction starts when it drops by LOCK_DROP relative to the reference and
+# stops when it recovers within LOCK_RECOVER (hysteresis). Corrective steps
+# [mm] are limited to LOCK_MAX_STEPS per correction.
+LOCK_EVERY = 5
+LOCK_SIZE = 128
+LOCK_STEP = 0.005
+LOCK_DROP = 0.15
+LOCK_RECOVER = 0.05
+LOCK_MAX_STEPS = 20
+LOCK_HOLD_TIMEOUT = 5.0     # [s], see `FocusLock.hold()`
+
+# Focus map: number of points along X and Y, margin from the stage limits
+# (fraction of the range). Once the surface is determined by 3 points, other
+# points are searched in a narrower range [mm] around the prediction.
+MAP_POINTS = (3,3)
+MAP_MARGIN = 0.1
+MAP_SPAN = 0.1
+
+def focusROI(img,roi=ROI_FRACTION,size=ROI_SIZE,bayer=None):
+    """ Cut centered region of interest out of `img` and decimate it.
+
+    Args:
+        img (:class:`np.ndarray`): Image (mono, raw Bayer or RGB).
+        roi (float): Width and height of the region relative to the image.
+            Defaults to :data:`ROI_FRACTION`.
+        size (int): Maximum width and height of the result. Defaults to
+            :data:`ROI_SIZE`.
+        bayer (str,optional): Bayer pattern of a raw image (see
+            :data:`bayer.BAYER_PATTERNS`), only green pixels of red rows are
+            taken. Defaults to None.
+
+    Returns:
+        :class:`np.ndarray`: Region as ``np.float32``.
+    """
+    h,w = img.shape[:2]
+    rh,rw = max(3,int(h*roi)),max(3,int(w*roi))
+    y0,x0 = (h-rh)//2 & ~1,(w-rw)//2 & ~1     # Even, keeps Bayer pattern
+    if bayer:
+        n = max(1,int(np.ceil(max(rh,rw)/2/size)))
+        (gy,_),(_,gx) = BAYER_PATTERNS[bayer]
+        region = img[y0+gy:y0+rh:2*n,x0+gx:x0+rw:2*n]
+    else:
+        n = max(1,int(np.ceil(max(rh,rw)/size)))
+        region = img[y0:y0+rh:n,x0:x0+rw:n]
+    if region.ndim == 3:
+        return region.sum(axis=2,dtype=np.float32)
+    return region.astype(np.float32)
+
+def varianceOfLaplacian(img):
+    """ Variance of the Laplacian (4 neighbors) of `img`.
+
+    Args:
+        img (:class:`np.ndarray`): Image as float.
+
+    Returns:
+        float: Sharpness.
+    """
+    lap = (img[1:-1,:-2] + img[1:-1,2:] + img[:-2,1:-1] + img[2:,1:-1]
+        - 4*img[1:-1,1:-1])
+    return float(lap.var())
+
+def tenengrad(img):
+    """ Tenengrad, i.e. mean squared magnitude of the Sobel gradient of
+    `img`.
+
+    Args:
+        img (:class:`np.ndarray`): Image as float.
+
+    Returns:
+        float: Sharpness.
+    """
+    rows = img[:-2] + 2*img[1:-1] + img[2:]         # Vertical smoothing
+    cols = img[:,:-2] + 2*img[:,1:-1] + img[:,2:]   # Horizontal smoothing
+    gx = rows[:,2:] - rows[:,:-2]
+    gy = cols[2:] - cols[:-2]
+    return float(np.mean(gx*gx + gy*gy))
+
+# Focus metrics: name -> function of the region of interest
+METRICS = {
+    'laplacian':    varianceOfLaplacian,
+    'tenengrad':    tenengrad,
+}
+
+def sharpness(img,metric='laplacian',roi=ROI_FRACTION,size=ROI_SIZE,
+              bayer=None):
+    """ Measure sharpness of `img`, see :func:`focusROI` and
+    :data:`METRICS`.
+
+    Returns:
+        float: Sharpness (the higher the better focused).
+    """
+    return METRICS[metric](focusROI(img,roi,size,bayer))
+
+class FrameRequest():
+    """
+    Handshake between a worker thread waiting for the first frame exposed
+    after some moment (e.g. after the stage settled) and a consumer of
+    :class:`basler.Thread` which gets every grabbed frame.
+
+    The consumer passes metadata of every frame to :func:`accept` (so the
+    newest frame counter is known). The worker calls :func:`request` and
+    :func:`wait`. Frame whose counter `frameId` is at least :attr:`skip`
+    above the newest one at :func:`request` is accepted (see
+    :data:`FRAME_SKIP`), the consumer passes it (or a result computed from
+    it) to :func:`put`. Frames are counted by :func:`accept` if the camera
+    does not provide the counter or if it restarts (reconnected camera).
+
+    Args:
+        skip (int): Defaults to :data:`FRAME_SKIP`.
+        discard (callable,optional): Called with a result passed to
+            :func:`put` which is never returned by :func:`wait` (came after
+            the timeout). Defaults to None.
+    """
+
+    def __init__(self,skip=FRAME_SKIP,discard=None):
+        self.skip = skip
+        self.discard = discard
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.count = 0          # Frames passed to `accept()`
+        self.lastId = None      # Counter of the newest frame
+        self.minId = None       # First frame which can be accepted
+        self.waiting = False    # Request is pending
+        self.result = None
+        self.meta = None
+
+    def request(self):
+        """ Request the first frame exposed from now on. Call :func:`wait`
+        afterwards. """
+        with self.lock:
+            if self.result is not None and self.discard is not None:
+                self.discard(self.result)
+            self.result = self.meta = None
+            self.ready.clear()
+            self.minId = (None if self.lastId is None
+                else self.lastId + self.skip)
+            self.waiting = True
+
+    def accept(self,meta):
+        """ Check frame with metadata `meta`. Call with every grabbed frame.
+
+        Returns:
+            bool: True if the frame is the requested one (once per request).
+        """
+        self.count += 1
+        frameId = meta.get('frameId')
+        if frameId is None:
+            frameId = self.count
+        with self.lock:
+            restarted = self.lastId is not None and frameId <= self.lastId
+            self.lastId = frameId
+            if not self.waiting:
+                return False
+            if self.minId is None or restarted:
+                # No frame seen before the request: this one may be in flight
+                self.minId = frameId + self.skip - 1
+            if frameId < self.minId:
+                return False
+            self.waiting = False
+            return True
+
+    def put(self,result,meta=None):
+        """ Pass the accepted frame (or a result computed from it) and its
+        metadata to :func:`wait`. """
+        with self.lock:
+            self.result,self.meta = result,meta
+        self.ready.set()
+
+    def wait(self,timeout=FRAME_TIMEOUT):
+        """ Wait for the requested frame. Blocking.
+
+        Args:
+            timeout (float): Maximum waiting time [s]. Defaults to
+                :data:`FRAME_TIMEOUT`.
+
+        Returns:
+            (object, dict): Result passed to :func:`put` and metadata of the
+            frame or (None, None) if no frame came in time or the request
+            was cancelled.
+        """
+        if not self.ready.wait(timeout):
+            self.cancel()
+        with self.lock:
+            result,meta = self.result,self.meta
+            self.result = self.meta = None
+        return result,meta
+
+    def cancel(self):
+        """ Cancel pending request, :func:`wait` returns (None, None) """
+        with self.lock:
+            self.waiting = False
+        self.ready.set()
+
+class AutoFocus(QObject):
+    """
+    **Bases:** :class:`QObject`
+
+    Autofocus driving Z stage `motor`. Frames are delivered by
+    :func:`push` (add this object to :attr:`basler.BaslerGUI.consumers`).
+
+    **Search:** Sharpness is measured at :attr:`steps` [0] positions spread
+    over :attr:`span` around the current position. Next level measures
+    :attr:`steps` [1] positions spread over two steps of the previous level
+    around the best position, etc. Positions already measured are not
+    measured again. Best position of the last level is refined by fitting a
+    parabola through it and its neighbors. Each measurement waits for the
+    stage to settle (:func:`xeryon.Motor.waitForPosition`) and for the first
+    frame exposed afterwards (see :class:`FrameRequest`).
+
+    Args:
+        motor (:class:`xeryon.Motor`): Z stage.
+        metric (str): Key of :data:`METRICS`. Defaults to 'laplacian'.
+        span (float): Range of the first level [mm]. Defaults to
+            :data:`AF_SPAN`.
+        steps (tuple): Number of positions of each level. Defaults to
+            :data:`AF_STEPS`.
+
+    Attributes:
+        roi (float): See :func:`focusROI`.
+        size (int): See :func:`focusROI`.
+        measured (list): Positions and sharpness (z, score) measured by the
+            last search.
+        focusT (float): Time-to-focus of the last search [s], i.e. from the
+            start to the settled best position.
+        progress (:class:`pyqtSignal`): Emits position and sharpness of each
+            measurement.
+        finished (:class:`pyqtSignal`): Emits best position and time-to-focus
+            [s].
+        failed (:class:`pyqtSignal`): Emits error message.
+    """
+
+    progress = pyqtSignal(float,float)
+    finished = pyqtSignal(float,float)
+    failed = pyqtSignal(str)
+
+    def __init__(self,motor,metric='laplacian',span=AF_SPAN,steps=AF_STEPS):
+        super().__init__()
+
+        self.motor = motor
+        self.metric = metric
+        self.span = span
+        self.steps = steps
+        self.roi = ROI_FRACTION
+        self.size = ROI_SIZE
+        self.measured = []
+        self.focusT = None
+
+        self.running = False
+        self.aborted = False
+        self.frameRequest = FrameRequest()
+        self.threadpool = QThreadPool()
+
+    def push(self,img,meta):
+        """ Measure sharpness of `img` if it was requested by
+        :func:`measure`, otherwise return immediately. Called by
+        :class:`basler.Thread` with each grabbed image.
+
+        Args:
+            img (:class:`np.ndarray`): Grabbed image.
+            meta (dict): Metadata of the image (frame counter `frameId`,
+                `bayer`), see :class:`basler.Thread`.
+        """
+        if self.frameRequest.accept(meta):
+            self.frameRequest.put(sharpness(img,self.metric,self.roi,
+                self.size,meta.get('bayer') or None),meta)
+
+    def measure(self,z):
+        """ Move to `z`, wait until the stage settles and measure sharpness
+        of the next frame. Blocking, call from a worker thread.
+
+        Args:
+            z (float): Position [mm].
+
+        Returns:
+            float: Sharpness or None if the stage did not settle or no frame
+            came in :data:`FRAME_TIMEOUT`.
+        """
+        self.motor.DPOS.set(z)
+        if not self.motor.waitForPosition(z):
+            al.printE(f"AutoFocus: Z stage did not settle at {z:.4f}!")
+            return None
+        self.frameRequest.request()
+        score,_ = self.frameRequest.wait()
+        if score is None:
+            if not self.aborted:
+                al.printE("AutoFocus: No frame received, is the camera "
+                    "streaming?")
+            return None
+        self.measured.append((z,score))
+        self.progress.emit(z,score)
+        return score
+
+    def search(self,center=None,span=None):
+        """ Find the best focus, see Search above. Blocking, call from a
+        worker thread (see :func:`start`).
+
+        Args:
+            center (float,optional): Center of the first level [mm]. Defaults
+                to the current position.
+            span (float,optional): Range of the first level [mm]. Defaults to
+                :attr:`span`.
+
+        Returns:
+            float: Best position (the stage is moved there) or None if the
+            search failed or was aborted.
+        """
+        startT = time.perf_counter()
+        self.measured = []
+        scores = {}     # Measured positions (rounded) -> sharpness
+        best = self.motor.DPOS.get() if center is None else center
+        span = self.span if span is None else span
+        for n in self.steps:
+            zs = np.unique(np.clip(np.linspace(best-span/2,best+span/2,n),
+                *self.motor.limits))
+            for z in zs:
+                key = round(z,6)
+                if key not in scores:
+                    if self.aborted:
+                        return None
+                    score = self.measure(z)
+                    if score is None:
+                        return None
+                    scores[key] = score
+            values = np.array([scores[round(z,6)] for z in zs])
+            i = int(np.argmax(values))
+            best = zs[i]
+            if len(zs) > 1:
+                span = 2*(zs[1]-zs[0])
+        # Sub-step refinement: vertex of parabola through the best 3 points
+        if 0 < i < len(zs)-1:
+            a,b,_ = np.polyfit(zs[i-1:i+2]-best,values[i-1:i+2],2)
+            if a < 0:
+                best += np.clip(-b/(2*a),zs[i-1]-best,zs[i+1]-best)
+        self.motor.DPOS.set(best)
+        self.motor.waitForPosition(best)
+        self.focusT = time.perf_counter() - startT
+        al.printOK(f"AutoFocus: Z = {best:.4f} mm ({len(scores)} frames, "
+            f"time-to-focus {self.focusT:.2f} s)")
+        return float(best)
+
+    def start(self,center=None):
+        """ Run :func:`search` in a worker thread. :attr:`finished` or
+        :attr:`failed` emits when done.
+
+        Args:
+            center (float,optional): See :func:`search`.
+
+        Returns:
+            bool: False if the motor is not connected or a search is running.
+        """
+        if self.running:
+            return False
+        if not self.motor.connected:
+            self.failed.emit("Z stage is not connected!")
+            return False
+        self.running = True
+        self.aborted = False
+        worker = al.Worker(self.__run,center,name="AutoFocus")
+        self.threadpool.start(worker)
+        return True
+
+    def abort(self):
+        """ Stop running search, the current measurement is cancelled """
+        self.aborted = True
+        self.frameRequest.cancel()
+
+    def __run(self,center):
+        try:
+            best = self.search(center)
+        finally:
+            self.running = False
+        if best is None:
+            self.failed.emit("Autofocus aborted" if self.aborted
+                else "Autofocus failed")
+        else:
+            self.finished.emit(best,self.focusT)
+
+class FocusLock(QObject):
+    """
+    **Bases:** :class:`QObject`
+
+    Continuous focus lock driving Z stage `motor`. Frames are delivered by
+    :func:`push` (add this object to :attr:`basler.BaslerGUI.consumers`),
+    nothing is done until :func:`start` is called and while `autofocus` is
+    running.
+
+    **Hysteresis:** Sharpness of every :attr:`every`-th frame is compared
+    with the reference (sharpness when locked, raised whenever a frame is
+    sharper). Sharpness depends on the image content, so the reference is
+    measured again whenever the XY stage (`motorX`, `motorY`) moves.
+    Correction starts when sharpness drops by :attr:`drop` and climbs the
+    sharpness by steps of :attr:`step` (:func:`xeryon.Motor.step`) measuring
+    each settled position. It stops when sharpness recovers within
+    :attr:`recover`. If the direction had to be reversed twice, the drop was
+    caused by the sample itself (e.g. less structured area) so the stage
+    returns to the sharpest position found and its sharpness becomes the new
+    reference.
+
+    **Hold:** No correction starts between :func:`hold` and :func:`release`,
+    e.g. while a tile of :class:`tilescan.TileScan` is exposed.
+
+    Args:
+        motor (:class:`xeryon.Motor`): Z stage.
+        autofocus (:class:`AutoFocus`,optional): Autofocus of the same
+            stage, lock holds while it is running. Defaults to None.
+        motorX (:class:`xeryon.Motor`,optional): X stage. Defaults to None.
+        motorY (:class:`xeryon.Motor`,optional): Y stage. Defaults to None.
+        every (int): Measure every N-th frame. Defaults to
+            :data:`LOCK_EVERY`.
+        step (float): Corrective step [mm]. Defaults to :data:`LOCK_STEP`.
+        metric (str): Key of :data:`METRICS`. Defaults to 'laplacian'.
+
+    Attributes:
+        enabled (bool): Lock is active, see :func:`start` and :func:`stop`.
+        drop (float): Relative drop of sharpness starting correction.
+        recover (float): Relative drop of sharpness ending correction.
+        corrections (int): Number of corrections since :func:`start`.
+        corrected (:class:`pyqtSignal`): Emits new position after each
+            correction.
+        failed (:class:`pyqtSignal`): Emits error message if the lock can not
+            start or stops because the Z stage is not connected.
+    """
+
+    corrected = pyqtSignal(float)
+    failed = pyqtSignal(str)
+
+    def __init__(self,motor,autofocus=None,motorX=None,motorY=None,
+                 every=LOCK_EVERY,step=LOCK_STEP,metric='laplacian'):
+        super().__init__()
+
+        self.motor = motor
+        self.autofocus = autofocus
+        self.xyMotors = [m for m in (motorX,motorY) if m is not None]
+        self.every = every
+        self.step = step
+        self.metric = metric
+        self.roi = ROI_FRACTION
+        self.size = LOCK_SIZE
+        self.drop = LOCK_DROP
+        self.recover = LOCK_RECOVER
+        self.direction = 1      # Direction of the last successful correction
+
+        self.enabled = False
+        self.holding = False
+        self.xyMoved = False    # Set when XY moves, see `push()`
+        self.__reset()
+        for m in self.xyMotors:
+            m.DPOS.signal.connect(self.__xyMoved)
+
+    def __reset(self):
+        self.ref = None         # Reference sharpness
+        self.frames = 0
+        self.corrections = 0
+        self.correcting = False
+        self.target = None      # Position of the last move (until measured)
+        self.settled = False    # The last move settled, frame is requested
+        self.frameRequest = FrameRequest()
+
+    def start(self):
+        """ Lock focus at the current position.
+
+        Returns:
+            bool: False if the Z stage is not connected (:attr:`failed`
+            emits).
+        """
+        self.__reset()
+        if not self.motor.connected:
+            self.enabled = False
+            self.failed.emit("Z stage is not connected!")
+            return False
+        self.enabled = True
+        return True
+
+    def stop(self):
+        """ Unlock focus """
+        self.enabled = False
+
+    def isIdle(self):
+        """ Is the lock not correcting (no corrective move pending)? """
+        return not self.correcting and self.target is None
+
+    def hold(self,timeout=LOCK_HOLD_TIMEOUT):
+        """ Stop starting new corrections and wait until the running one
+        finishes. Blocking, call from a worker thread. Call :func:`release`
+        afterwards.
+
+        Args:
+            timeout (float): Maximum waiting time [s]. Defaults to
+                :data:`LOCK_HOLD_TIMEOUT`.
+
+        Returns:
+            bool: True if the stage is not corrected anymore.
+        """
+        self.holding = True
+        endT = time.perf_counter() + timeout
+        while self.enabled and not self.isIdle():
+            if time.perf_counter() > endT:
+                al.printE("FocusLock: Correction did not finish!")
+                return False
+            time.sleep(0.005)
+        return True
+
+    def release(self):
+        """ Allow corrections stopped by :func:`hold` """
+        self.holding = False
+
+    def push(self,img,meta):
+        """ Measure sharpness of every :attr:`every`-th frame or of the first
+        frame exposed after a corrective move settled and update the lock.
+        Called by :class:`basler.Thread` with each grabbed image, moves of
+        the stage do not block.
+
+        Args:
+            img (:class:`np.ndarray`): Grabbed image.
+            meta (dict): Metadata of the image, see :func:`AutoFocus.push`.
+        """
+        if not self.enabled or (self.autofocus is not None
+                and self.autofocus.running):
+            return
+        if not self.motor.connected:
+            self.enabled = False
+            self.failed.emit("Focus lock stopped, Z stage is not connected!")
+            return
+        accepted = self.frameRequest.accept(meta)
+        if self.holding and self.isIdle():
+            return
+        if self.xyMoved:
+            # New field of view: measure new reference once XY settles
+            if not all(m.isSettled() for m in self.xyMotors):
+                return
+            self.xyMoved = False
+            self.correcting = False
+            self.ref = None
+            self.target = self.motor.DPOS.get()
+            self.settled = False
+        self.frames += 1
+        if self.target is not None:
+            if not self.settled:
+                if self.motor.isSettled(self.target):
+                    self.settled = True
+                    self.frameRequest.request()
+                return
+            if not accepted:
+                return
+            self.target = None
+        elif not self.correcting and self.frames % self.every:
+            return
+        self.__update(sharpness(img,self.metric,self.roi,self.size,
+            meta.get('bayer') or None))
+
+    def __update(self,score):
+        """ Evaluate sharpness `score` of the current position """
+        z = self.motor.DPOS.get()
+        if self.ref is None:
+            self.ref = score
+            return
+        if not self.correcting:
+            if score > self.ref:
+                self.ref = score
+            elif score < self.ref*(1-self.drop):
+                self.correcting = True
+                self.best = (z,score)
+                self.reversals = 0
+                self.steps = 0
+                self.__move(z + self.direction*self.step)
+            return
+
+        self.steps += 1
+        if score > self.best[1]:
+            self.best = (z,score)
+            if score >= self.ref*(1-self.recover):
+                self.__finish(z)
+            elif self.steps >= LOCK_MAX_STEPS:
+                self.ref = score
+                self.__finish(z)
+            else:
+                self.__move(z + self.direction*self.step)
+            return
+
+        self.reversals += 1
+        if self.reversals < 2 and self.steps < LOCK_MAX_STEPS:
+            self.direction = -self.direction
+            self.__move(self.best[0] + self.direction*self.step)
+        else:
+            # Sharpest position is not as sharp as the reference
+            self.ref = self.best[1]
+            self.__move(self.best[0])
+            self.__finish(self.best[0])
+
+    def __xyMoved(self,*_):
+        self.xyMoved = True
+
+    def __move(self,z):
+        """ Start corrective move to `z` (non-blocking) """
+        self.target = self.motor.clip(z)
+        self.settled = False
+        self.motor.step(self.target - self.motor.DPOS.get())
+
+    def __finish(self,z):
+        self.correcting = False
+        self.corrections += 1
+        self.corrected.emit(z)
+
+def mapGrid(xlim,ylim,n=MAP_POINTS,margin=MAP_MARGIN):
+    """ Positions of focus map points: regular grid within limits of the XY
+    stage ordered in a serpentine (short travel between points).
+
+    Args:
+        xlim ([float,float]): Limits of X [mm], e.g.
+            :attr:`xeryon.XYWidget.xlim`.
+        ylim ([float,float]): Limits of Y [mm].
+        n ((int,int)): Number of points along X and Y. Defaults to
+            :data:`MAP_POINTS`.
+        margin (float): Margin from the limits (fraction of the range).
+            Defaults to :data:`MAP_MARGIN`.
+
+    Returns:
+        :class:`np.ndarray`: Positions (x, y) of shape (n[0]*n[1], 2).
+    """
+    dx,dy = margin*(xlim[1]-xlim[0]),margin*(ylim[1]-ylim[0])
+    xs = np.linspace(xlim[0]+dx,xlim[1]-dx,n[0])
+    ys = np.linspace(ylim[0]+dy,ylim[1]-dy,n[1])
+    X,Y = np.meshgrid(xs,ys)
+    X[1::2] = X[1::2,::-1]      # Odd rows backwards
+    return np.column_stack([X.ravel(),Y.ravel()])
+
+def tpsKernel(r):
+    """ Radial basis of the thin-plate spline, U(r) = r^2 log(r).
+
+    Args:
+        r (:class:`np.ndarray`): Distances.
+
+    Returns:
+        :class:`np.ndarray`: U(r), zero for r = 0.
+    """
+    with np.errstate(divide='ignore',invalid='ignore'):
+        u = r*r*np.log(r)
+    return np.where(r > 0,u,0.0)
+
+class FocusMap():
+    """
+    Smooth surface z(x, y) fitted to focused positions [mm] of the stage.
+
+    **Models:**
+
+        - 'plane': Least squares plane (flat tilted sample).
+        - 'tps': Thin-plate spline, i.e. the smoothest surface passing
+          through the points (approximating them if :attr:`smoothing` is
+          set). Plane is used for less than 4 points.
+
+    Args:
+        model (str): 'plane' or 'tps'. Defaults to 'plane'.
+        smoothing (float): Regularization of the thin-plate spline. Defaults
+            to 0 (interpolation).
+
+    Attributes:
+        points (:class:`np.ndarray`): Focused positions (x, y, z) of shape
+            (n, 3).
+    """
+
+    def __init__(self,model='plane',smoothing=0):
+        self.model = model
+        self.smoothing = smoothing
+        self.clear()
+
+    def __len__(self):
+        return len(self.points)
+
+    def clear(self):
+        """ Remove all points """
+        self.points = np.empty((0,3))
+        self.affine = None      # Coefficients of 1, x, y
+        self.weights = None     # Weights of `tpsKernel()` (spline only)
+
+    def add(self,x,y,z):
+        """ Add focused position and refit the surface.
+
+        Args:
+            x (float): Position X [mm].
+            y (float): Position Y [mm].
+            z (float): Best focus Z [mm].
+        """
+        self.points = np.vstack([self.points,[x,y,z]])
+        self.fit()
+
+    def isDetermined(self):
+        """ Check if the surface is determined, i.e. there are at least 3
+        points which are not collinear.
+
+        Returns:
+            bool: True if determined.
+        """
+        if len(self) < 3:
+            return False
+        xy = self.points[:,:2] - self.points[0,:2]
+        return np.linalg.matrix_rank(xy,tol=1e-9) == 2
+
+    def setModel(self,model):
+        """ Set :attr:`model` ('plane' or 'tps') and refit the surface """
+        self.model = model
+        self.fit()
+
+    def fit(self):
+        """ Fit the surface to :attr:`points` """
+        n = len(self.points)
+        self.weights = None
+        if n == 0:
+            self.affine = None
+            return
+        xy,z = self.points[:,:2],self.points[:,2]
+        P = np.column_stack([np.ones(n),xy])
+        if self.model == 'tps' and n >= 4:
+            r = np.hypot(*(xy[:,None,:]-xy[None,:,:]).transpose(2,0,1))
+            A = np.zeros((n+3,n+3))
+            A[:n,:n] = tpsKernel(r) + self.smoothing*np.eye(n)
+            A[:n,n:] = P
+            A[n:,:n] = P.T
+            sol = np.linalg.lstsq(A,np.r_[z,np.zeros(3)],rcond=None)[0]
+            self.weights,self.affine = sol[:n],sol[n:]
+        else:
+            # Least squares (minimum norm for less than 3 points)
+            self.affine = np.linalg.lstsq(P,z,rcond=None)[0]
+
+    def z(self,x,y):
+        """ Evaluate the surface.
+
+        Args:
+            x: Position(s) X [mm], float or array.
+            y: Position(s) Y [mm], float or array.
+
+        Returns:
+            Z [mm] of the same shape as `x` and `y` (float for scalars) or
+            None if there are no points.
+        """
+        if self.affine is None:
+            return None
+        x,y = np.broadcast_arrays(np.asarray(x,float),np.asarray(y,float))
+        z = self.affine[0] + self.affine[1]*x + self.affine[2]*y
+        if self.weights is not None:
+            r = np.hypot(x[...,None]-self.points[:,0],
+                y[...,None]-self.points[:,1])
+            z = z + tpsKernel(r) @ self.weights
+        return float(z) if z.ndim == 0 else z
+
+    def residuals(self):
+        """ Differences of focused Z and the surface at :attr:`points`.
+
+        Returns:
+            :class:`np.ndarray`: Residuals [mm].
+        """
+        if not len(self):
+            return np.empty(0)
+        return self.points[:,2] - self.z(self.points[:,0],self.points[:,1])
+
+class FocusMapper(QObject):
+    """
+    **Bases:** :class:`QObject`
+
+    Builds :attr:`map` by running :func:`AutoFocus.search` at given XY
+    positions (see :func:`mapGrid`) and commands Z from it (see
+    :func:`follow`). Autofocus is marked as running while mapping so
+    :class:`FocusLock` holds.
+
+    Args:
+        autofocus (:class:`AutoFocus`): Autofocus of the Z stage.
+        motorX (:class:`xeryon.Motor`): X stage.
+        motorY (:class:`xeryon.Motor`): Y stage.
+        focusMap (:class:`FocusMap`,optional): Map to be filled. Defaults to
+            a new plane map.
+
+    Attributes:
+        map (:class:`FocusMap`): Focus map.
+        mapT (float): Duration of the last mapping [s].
+        following (bool): Z follows the map, see :func:`follow`.
+        pointFocused (:class:`pyqtSignal`): Emits x, y and z of each focused
+            point.
+        finished (:class:`pyqtSignal`): Emits :attr:`mapT`.
+        failed (:class:`pyqtSignal`): Emits error message.
+    """
+
+    pointFocused = pyqtSignal(float,float,float)
+    finished = pyqtSignal(float)
+    failed = pyqtSignal(str)
+
+    def __init__(self,autofocus,motorX,motorY,focusMap=None):
+        super().__init__()
+
+        self.autofocus = autofocus
+        self.motorX = motorX
+        self.motorY = motorY
+        self.map = FocusMap() if focusMap is None else focusMap
+        self.mapT = None
+        self.following = False
+        self.running = False
+        self.aborted = False
+        self.threadpool = QThreadPool()
+
+    def start(self,points):
+        """ Run :func:`mapFocus` in a worker thread. :attr:`finished` or
+        :attr:`failed` emits when done.
+
+        Args:
+            points: Sequence of (x, y) positions [mm].
+
+        Returns:
+            bool: False if a motor is not connected or autofocus is running.
+        """
+        if self.running or self.autofocus.running:
+            return False
+        if not (self.motorX.connected and self.motorY.connected
+                and self.autofocus.motor.connected):
+            self.failed.emit("XYZ stages are not connected!")
+            return False
+        self.running = True
+        self.aborted = False
+        self.autofocus.running = True
+        self.autofocus.aborted = False
+        worker = al.Worker(self.__run,points,name="FocusMapper")
+        self.threadpool.start(worker)
+        return True
+
+    def abort(self):
+        """ Stop running mapping after the current measurement """
+        self.aborted = True
+        self.autofocus.abort()
+
+    def __run(self,points):
+        try:
+            done = self.mapFocus(points)
+        finally:
+            self.running = False
+            self.autofocus.running = False
+        if done:
+            self.finished.emit(self.mapT)
+        else:
+            self.failed.emit("Focus mapping aborted" if self.aborted
+                else "Focus mapping failed")
+
+    def mapFocus(self,points):
+        """ Focus at `points` and fit :attr:`map` (cleared first). The first
+        points are searched in the full range of autofocus, the others
+        (once the surface is determined) in :data:`MAP_SPAN` around the
+        surface fitted so far. Blocking, call
+        from a worker thread (see :func:`start`).
+
+        Args:
+            points: Sequence of (x, y) positions [mm].
+
+        Returns:
+            bool: True if all points were focused.
+        """
+        startT = time.perf_counter()
+        self.map.clear()
+        for x,y in points:
+            if self.aborted:
+                return False
+            self.motorX.DPOS.set(x)
+            self.motorY.DPOS.set(y)
+            if not (self.motorX.waitForPosition(x)
+                    and self.motorY.waitForPosition(y)):
+                al.printE(f"FocusMapper: XY stage did not settle at "
+                    f"({x:.3f},{y:.3f})!")
+                return False
+            if self.map.isDetermined():
+                z = self.autofocus.search(self.map.z(x,y),MAP_SPAN)
+            else:
+                z = self.autofocus.search()
+            if z is None:
+                return False
+            self.map.add(x,y,z)
+            self.pointFocused.emit(x,y,z)
+        self.mapT = time.perf_counter() - startT
+        rms = np.sqrt(np.mean(self.map.residuals()**2))
+        al.printOK(f"FocusMapper: {len(self.map)} points in "
+            f"{self.mapT:.1f} s (RMS residual {rms*1000:.1f} um)")
+        return True
+
+    def moveZ(self,x,y):
+        """ Move Z stage to the surface of :attr:`map` at (x, y).
+
+        Args:
+            x (float): Position X [mm].
+            y (float): Position Y [mm].
+
+        Returns:
+            float: Commanded Z [mm] or None if the map is empty.
+        """
+        z = self.map.z(x,y)
+        if z is None:
+            return None
+        z = self.autofocus.motor.clip(z)
+        self.autofocus.motor.DPOS.set(z)
+        return z
+
+    def follow(self,enabled=True):
+        """ Command Z from :attr:`map` (:func:`moveZ`) whenever the desired
+        position of the XY stage changes (e.g. tile scan, click to the
+        canvas of :class:`xeryon.XYWidget`).
+
+        Args:
+            enabled (bool): Follow the map. Defaults to True.
+        """
+        if enabled == self.following:
+            return
+        for motor in (self.motorX,self.motorY):
+            if enabled:
+                motor.DPOS.signal.connect(self.__xyMoved)
+            else:
+                motor.DPOS.signal.disconnect(self.__xyMoved)
+        self.following = enabled
+        if enabled:
+            self.__xyMoved()
+
+    def __xyMoved(self,*_):
+        if not self.running:
+            self.moveZ(self.motorX.DPOS.get(),self.motorY.DPOS.get())
+
+class AutoFocusGUI(QWidget):
+    """
+    **Bases:** :class:`QWidget`
+
+    Controls of :class:`AutoFocus`: start/abort button, metric and range of
+    the search, and checkbox of :class:`FocusLock`. Streaming of the camera
+    is started if needed. Result (position and time-to-focus) is shown in a
+    label. Lock is restarted at the position found by autofocus.
+
+    Args:
+        autofocus (:class:`AutoFocus`): Autofocus to be controlled.
+        camera (:class:`basler.BaslerGUI`): Camera providing frames.
+        focusLock (:class:`FocusLock`,optional): Focus lock to be controlled.
+            Defaults to None (no checkbox).
+        messageSignal (:class:`pyqtSignal`,optional): Signal showing messages
+            in the statusbar. Defaults to None.
+    """
+
+    def __init__(self,autofocus,camera,focusLock=None,messageSignal=None):
+        super().__init__()
+
+        self.autofocus = autofocus
+        self.focusLock = focusLock
+        self.camera = camera
+        self.messageSignal = messageSignal
+
+        self.autofocus.finished.connect(self.__finished)
+        self.autofocus.failed.connect(self.__failed)
+
+        self.btnFocus = QPushButton('Autofocus',self)
+        self.btnFocus.setToolTip('Find the best focus (click again to abort)')
+        self.btnFocus.setCursor(Qt.PointingHandCursor)
+        self.btnFocus.clicked.connect(self.__btnFocusClicked)
+
+        self.cmbMetric = QComboBox(self)
+        self.cmbMetric.addItems(list(METRICS))
+        self.cmbMetric.setCurrentText(self.autofocus.metric)
+        self.cmbMetric.setToolTip('Focus metric')
+        self.cmbMetric.currentTextChanged.connect(self.__cmbMetricChanged)
+
+        self.qleSpan = QLineEdit(str(self.autofocus.span),self)
+        self.qleSpan.setFixedWidth(50)
+        self.qleSpan.setValidator(QDoubleValidator(0.001,100,3))
+        self.qleSpan.setToolTip('Search range [mm]')
+        self.qleSpan.editingFinished.connect(self.__qleSpanSet)
+
+        self.chbLock = QCheckBox('Lock',self)
+        self.chbLock.setToolTip('Keep focus while moving the sample')
+        self.chbLock.toggled.connect(self.__chbLockToggled)
+        self.chbLock.setVisible(focusLock is not None)
+        if focusLock is not None:
+            self.focusLock.failed.connect(self.__lockFailed)
+
+        self.lblResult = QLabel('',self)
+
+        hbox = QHBoxLayout()
+        hbox.setContentsMargins(0,0,0,0)
+        hbox.addWidget(self.btnFocus)
+        hbox.addWidget(self.cmbMetric)
+        hbox.addWidget(self.qleSpan)
+        hbox.addWidget(self.chbLock)
+        hbox.addWidget(self.lblResult)
+        hbox.addStretch()
+        self.setLayout(hbox)
+
+    def __btnFocusClicked(self):
+        if self.autofocus.running:
+            self.autofocus.abort()
+            return
+        self.camera.startStream()
+        if self.autofocus.start():
+            self.btnFocus.setText('Abort')
+            self.lblResult.setText('Focusing...')
+
+    def __cmbMetricChanged(self,metric):
+        self.autofocus.metric = metric
+
+    def __qleSpanSet(self):
+        self.autofocus.span = float(self.qleSpan.text())
+
+    def __chbLockToggled(self,checked):
+        if checked:
+            self.camera.startStream()
+            if not self.focusLock.start():
+                return      # Unchecked by `__lockFailed()`
+            al.emitMsg(self.messageSignal,'Focus locked')
+        else:
+            self.focusLock.stop()
+            al.emitMsg(self.messageSignal,'Focus unlocked (%d corrections)'%
+                self.focusLock.corrections)
+
+    def __finished(self,z,focusT):
+        self.btnFocus.setText('Autofocus')
+        if self.focusLock is not None and self.focusLock.enabled:
+            self.focusLock.start()
+        self.lblResult.setText('Z = %0.4f (%0.1f s)'%(z,focusT))
+        al.emitMsg(self.messageSignal,
+            'Autofocus: Z = %0.4f mm in %0.2f s'%(z,focusT))
+
+    def __failed(self,msg):
+        self.btnFocus.setText('Autofocus')
+        self.lblResult.setText('')
+        al.emitMsg(self.messageSignal,msg)
+
+    def __lockFailed(self,msg):
+        self.chbLock.blockSignals(True)
+        self.chbLock.setChecked(False)
+        self.chbLock.blockSignals(False)
+        al.emitMsg(self.messageSignal,msg)
+
+class FocusMapGUI(QWidget):
+    """
+    **Bases:** :class:`QWidget`
+
+    Controls of :class:`FocusMapper`: start/abort button, model of the
+    surface and checkbox to follow the map. Points of the map (see
+    :func:`mapGrid`) are placed within limits of `xystage` and shown on its
+    canvas as they are focused.
+
+    Args:
+        mapper (:class:`FocusMapper`): Mapper to be controlled.
+        xystage (:class:`xeryon.XYWidget`): XY stage widget.
+        camera (:class:`basler.BaslerGUI`): Camera providing frames.
+        messageSignal (:class:`pyqtSignal`,optional): Signal showing messages
+            in the statusbar. Defaults to None.
+    """
+
+    def __init__(self,mapper,xystage,camera,messageSignal=None):
+        super().__init__()
+
+        self.mapper = mapper
+        self.xystage = xystage
+        self.camera = camera
+        self.messageSignal = messageSignal
+
+        self.mapper.pointFocused.connect(self.__pointFocused)
+        self.mapper.finished.connect(self.__finished)
+        self.mapper.failed.connect(self.__failed)
+
+        self.btnMap = QPushButton('Focus map',self)
+        self.btnMap.setToolTip('Focus grid of points within the stage limits '
+            '(click again to abort)')
+        self.btnMap.setCursor(Qt.PointingHandCursor)
+        self.btnMap.clicked.connect(self.__btnMapClicked)
+
+        self.cmbModel = QComboBox(self)
+        self.cmbModel.addItems(['plane','tps'])
+        self.cmbModel.setCurrentText(self.mapper.map.model)
+        self.cmbModel.setToolTip('Surface fitted to the points')
+        self.cmbModel.currentTextChanged.connect(self.mapper.map.setModel)
+
+        self.chbFollow = QCheckBox('Follow',self)
+        self.chbFollow.setToolTip('Move Z to the map when XY moves')
+        self.chbFollow.toggled.connect(self.mapper.follow)
+
+        self.lblResult = QLabel('',self)
+
+        hbox = QHBoxLayout()
+        hbox.setContentsMargins(0,0,0,0)
+        hbox.addWidget(self.btnMap)
+        hbox.addWidget(self.cmbModel)
+        hbox.addWidget(self.chbFollow)
+        hbox.addWidget(self.lblResult)
+        hbox.addStretch()
+        self.setLayout(hbox)
+
+    def __btnMapClicked(self):
+        if self.mapper.running:
+            self.mapper.abort()
+            return
+        self.camera.startStream()
+        points = mapGrid(self.xystage.xlim,self.xystage.ylim)
+        if self.mapper.start(points):
+            self.xystage.setPoints()
+            self.btnMap.setText('Abort')
+            self.lblResult.setText('Mapping...')
+
+    def __pointFocused(self,*_):
+        self.xystage.setPoints(self.mapper.map.points[:,:2])
+        self.lblResult.setText('%d points'%len(self.mapper.map))
+
+    def __finished(self,mapT):
+        self.btnMap.setText('Focus map')
+        rms = np.sqrt(np.mean(self.mapper.map.residuals()**2))
+        self.lblResult.setText('%d points (%0.0f s)'%(len(self.mapper.map),mapT))
+        al.emitMsg(self.messageSignal,'Focus map: %d points in %0.1f s, '
+            'RMS residual %0.1f um'%(len(self.mapper.map),mapT,rms*1000))
+
+    def __failed(self,msg):
+        self.btnMap.setText('Focus map')
+        self.lblResult.setText('%d points'%len(self.mapper.map))
+        al.emitMsg(self.messageSignal,msg)
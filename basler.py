@@ -33,12 +33,17 @@ Todo:
 import os
 import sys
 import time
+from datetime import datetime
+import queue
+import threading
+import collections
+from contextlib import contextmanager
 import numpy as np
 from PyQt5.QtCore import (Qt, QThreadPool, QObject, QRunnable, pyqtSlot,
-    pyqtSignal, QThread)
+    pyqtSignal, QThread, QTimer, QRect, QSize)
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QPushButton,
     QHBoxLayout, QVBoxLayout, QStyle, QLabel, QSlider, QComboBox, QGridLayout,
-    QLineEdit, QCheckBox, QFileDialog, QMessageBox)
+    QLineEdit, QCheckBox, QFileDialog, QMessageBox, QRubberBand)
 
 from PyQt5.QtGui import QPixmap, QImage, QIntValidator
 
@@ -47,10 +52,209 @@ import pyqtgraph as pg
 import qtawesome as qta     # use bash: `qta-browser` to see icon list
 
 from pypylon import pylon   # Camera communication
-
-from PIL import Image       # Pillow library for image operations
+from pypylon import genicam
 
 import ablolib as al
+from recorder import Recorder, ImageSaver
+from synthcam import SyntheticCamera, listDevices as syntheticDevices
+from bayer import (BAYER_PATTERNS, bayerPattern, binBayer, decimateBayer,
+    preview as bayerPreview)
+
+# Maximum rate of painting the live view, independent of acquisition fps
+DISPLAY_RATE = 30       # [Hz]
+
+# Grab strategies of a persistent grab session (see :func:`Basler.startGrabbing`)
+GRAB_STRATEGIES = {
+    'latest':   pylon.GrabStrategy_LatestImageOnly, # Newest frame, skip others
+    'onebyone': pylon.GrabStrategy_OneByOne,        # All frames in order
+    'upcoming': pylon.GrabStrategy_UpcomingImage,   # Wait for the next frame
+}
+
+# Grab timeout: number of frame periods (or exposure times) plus margin
+TIMEOUT_FRAMES = 3
+TIMEOUT_MARGIN = 0.2    # [s]
+
+# Acquisition is stalled after this number of consecutive failed grabs. Then
+# the camera is reconnected (bounded number of attempts, growing delay).
+STALL_GRABS = 3
+RECONNECT_ATTEMPTS = 3
+RECONNECT_DELAY = 1.0   # [s]
+
+# Supported pixel formats: name -> (bit depth, packed). Unpacked formats of
+# more than 8 bits are delivered as `np.uint16`, packed are unpacked by
+# `unpack12()`.
+PIXEL_FORMATS = {
+    'Mono8':        (8,False),
+    'Mono10':       (10,False),
+    'Mono12':       (12,False),
+    'Mono12p':      (12,True),
+    'Mono12Packed': (12,True),
+}
+# Color formats deliver raw Bayer images, see `bayer`
+PIXEL_FORMATS.update({f'Bayer{pattern}{suffix}': value
+    for pattern in BAYER_PATTERNS
+    for suffix,value in [('8',(8,False)),('12',(12,False)),('12p',(12,True)),
+        ('12Packed',(12,True))]})
+
+# Chunk data attached by the camera to each image (see `Basler.frameInfo`):
+# key -> options (chunk selector, node of the grab result). Frame counter is
+# named differently by GigE and USB cameras.
+CHUNKS = {
+    'camT':     [('Timestamp','ChunkTimestamp')],
+    'frameId':  [('Framecounter','ChunkFramecounter'),
+                 ('CounterValue','ChunkCounterValue')],
+    'exposure': [('ExposureTime','ChunkExposureTime')],
+}
+
+# Camera nodes kept by :class:`NodeCache`
+SIZE_NODES = ['Width','Height','OffsetX','OffsetY']
+CACHED_NODES = SIZE_NODES + ['BinningHorizontal','BinningVertical',
+    'BinningHorizontalMode','DecimationHorizontal','DecimationVertical',
+    'ExposureTime','ResultingFrameRate','PixelFormat']
+
+# Nodes changed by writing given node. Writing of any other node may change
+# limits of all nodes (e.g. binning changes maximum width).
+NODE_DEPENDENCIES = {
+    'ExposureTime': ['ResultingFrameRate'],
+}
+
+def pylonDevices():
+    """ List Basler cameras available via ``pypylon``. Enumeration of
+    transport layers may take several seconds.
+
+    Returns:
+        list: Dictionaries with `serial`, `model`, `interface` and `name`.
+    """
+    devices = []
+    for info in pylon.TlFactory.GetInstance().EnumerateDevices():
+        devices.append({
+            'serial':       info.GetSerialNumber(),
+            'model':        info.GetModelName(),
+            'interface':    info.GetDeviceClass(),
+            'name':         info.GetFriendlyName(),
+        })
+    return devices
+
+def pylonCamera(serial=None):
+    """ Create camera object of Basler camera with given serial number or of
+    the first camera found if `serial` is None """
+    factory = pylon.TlFactory.GetInstance()
+    if serial is None:
+        return pylon.InstantCamera(factory.CreateFirstDevice())
+    info = pylon.DeviceInfo()
+    info.SetSerialNumber(serial)
+    return pylon.InstantCamera(factory.CreateFirstDevice(info))
+
+# Functions creating (not opened) camera object, see :attr:`Basler.backend`.
+# Optional argument `serial` selects the camera.
+CAMERA_BACKENDS = {
+    'pylon':     pylonCamera,       # Basler camera via `pypylon`
+    'synthetic': SyntheticCamera,   # Simulated camera, see `synthcam`
+}
+
+# Functions listing available cameras of each backend
+DEVICE_DISCOVERY = {
+    'pylon':     pylonDevices,
+    'synthetic': syntheticDevices,
+}
+
+def isWritable(node):
+    """ Check if camera `node` can be written. Works with ``genicam`` nodes
+    as well as with nodes of :class:`synthcam.SyntheticCamera`. """
+    try:
+        return genicam.IsWritable(node)
+    except TypeError:
+        return node.IsWritable()
+
+def decimate(ndarray,width,height):
+    """ Decimate image by taking every `n`-th pixel so it fits into
+    `width`x`height`. No data are copied, a strided view is returned.
+
+    Args:
+        ndarray (:class:`np.ndarray`): Image data.
+        width (int): Maximum width of the result.
+        height (int): Maximum height of the result.
+
+    Returns:
+        :class:`np.ndarray`: View of `ndarray`.
+    """
+    h,w = ndarray.shape[:2]
+    n = max(1,int(np.ceil(max(w/max(width,1),h/max(height,1)))))
+    return ndarray[::n,::n]
+
+def binImage(ndarray,n):
+    """ Bin image by summing `n`x`n` blocks of pixels and dividing the sum,
+    i.e. averaging. Edge pixels which do not fill a whole block are cropped.
+
+    Args:
+        ndarray (:class:`np.ndarray`): 2D image data.
+        n (int): Binning factor.
+
+    Returns:
+        :class:`np.ndarray`: Binned image of the same type as `ndarray`.
+    """
+    h,w = ndarray.shape[0]//n, ndarray.shape[1]//n
+    blocks = ndarray[:h*n,:w*n].reshape(h,n,w,n)
+    return (blocks.sum(axis=(1,3),dtype=np.uint32)//(n*n)).astype(ndarray.dtype)
+
+def unpack12(data,width,height,packing='Mono12p',out=None):
+    """ Unpack 12-bit image data where two pixels are stored in three bytes
+    `b0`, `b1`, `b2`:
+
+        - `Mono12p` (GenICam, also `Bayer..12p`): ``p0 = b0 | (b1 & 0xF) << 8``
+          and ``p1 = b1 >> 4 | b2 << 4``,
+        - `Mono12Packed` (Basler GigE, also `Bayer..12Packed`):
+          ``p0 = b0 << 4 | b1 & 0xF`` and ``p1 = b2 << 4 | b1 >> 4``.
+
+    Whole image is unpacked by a few vectorized integer operations written
+    directly to `out`.
+
+    Args:
+        data: Buffer of packed data (bytes, memoryview, ``np.ndarray``).
+        width (int): Image width.
+        height (int): Image height, `width` x `height` must be even.
+        packing (str): Pixel format, formats ending with 'Packed' are
+            unpacked as 'Mono12Packed', others as 'Mono12p'. Defaults to
+            'Mono12p'.
+        out (:class:`np.ndarray`,optional): C-contiguous ``np.uint16`` array
+            of shape (height, width) to write to. Defaults to None (new array).
+
+    Returns:
+        :class:`np.ndarray`: ``np.uint16`` image with values 0-4095.
+    """
+    raw = np.frombuffer(data,np.uint8,count=width*height*3//2).reshape(-1,3)
+    b0,b1,b2 = raw[:,0],raw[:,1],raw[:,2]
+    if out is None:
+        out = np.empty((height,width),np.uint16)
+    pairs = out.reshape(-1,2)       # View of `out`
+    p0,p1 = pairs[:,0],pairs[:,1]
+    if not packing.endswith('Packed'):
+        np.bitwise_and(b1,0x0F,out=p0)
+        p0 <<= 8
+        p0 |= b0
+    else:
+        np.copyto(p0,b0)
+        p0 <<= 4
+        p0 |= b1 & 0x0F
+    np.copyto(p1,b2)
+    p1 <<= 4
+    p1 |= b1 >> 4
+    return out
+
+def ndarray2qimage(ndarray):
+    """ Wrap ``np.ndarray`` into ``QImage``. Data are not copied if they
+    already are a C-contiguous ``np.uint8`` array, so the array must not be
+    modified while the image is used. Reference to the data is kept in the
+    `ndarray` attribute of the returned image.
+
+    Array of shape (h, w) is wrapped as grayscale, array of shape (h, w, 3)
+    as RGB (``QImage.Format_RGB888``). """
+    data = np.ascontiguousarray(ndarray,dtype=np.uint8)
+    h,w = data.shape[:2]
+    fmt = QImage.Format_RGB888 if data.ndim == 3 else QImage.Format_Grayscale8
+    qimg = QImage(data.data,w,h,data.strides[0],fmt)
+    qimg.ndarray = data     # Keep data alive as long as the image
+    return qimg
 
 def ndarray2qpixmap(ndarray):
     """ Convert ``np.ndarray`` into ``QPixmap`` """
@@ -58,12 +262,8 @@ def ndarray2qpixmap(ndarray):
 
     # Convert and normalize data
     # data = np.uint8((img-img.min())/img.ptp()*255.0)
-    
-    data = np.uint8(ndarray)    # Convert data
-    h,w = data.shape
-    qimg = QImage(data.data,w,h,w,QImage.Format_Indexed8)
-    qpxm = QPixmap(qimg)
-    return qpxm
+
+    return QPixmap.fromImage(ndarray2qimage(ndarray))
 
 class MyImageItem(pg.ImageItem):
     """
@@ -96,6 +296,321 @@ class MyImageItem(pg.ImageItem):
 
         return super(MyImageItem,self).mouseClickEvent(ev)
 
+class NodeCache():
+    """
+    Snapshot of camera nodes: current value, minimum, maximum and increment
+    of nodes :data:`CACHED_NODES`. Every access to a camera node is a round
+    trip to the camera, so values are read once (:func:`refresh`) and served
+    from the cache afterwards.
+
+    **Invalidation:** Writing a node by :func:`set` updates its value in the
+    cache and marks nodes which may change as stale (see
+    :data:`NODE_DEPENDENCIES`). Stale nodes are read again on the next
+    access. Call :func:`invalidate` if nodes are changed in other way.
+
+    **Transactions:** Writes within :func:`transaction` are collected and
+    written together when the outermost transaction ends. Writes which do not
+    change the value are skipped. Reading a node which depends on pending
+    writes writes them first so reads always reflect previous writes.
+
+    Attributes:
+        reads (int): Number of node reads (round trips).
+        writes (int): Number of node writes.
+        skipped (int): Number of writes skipped because the value did not
+            change.
+    """
+
+    def __init__(self,names=CACHED_NODES):
+        self.names = list(names)
+        self.cam = None
+        self.lock = threading.RLock()
+        self.nodes = {}         # Node objects
+        self.values = {}        # name -> value
+        self.limits = {}        # name -> (min,max,inc) or None
+        self.stale = set()      # Nodes to be read again
+        self.pending = []       # Writes of the transaction: (name,value)
+        self.depth = 0          # Depth of nested transactions
+        self.reads = 0
+        self.writes = 0
+        self.skipped = 0
+
+    def attach(self,cam):
+        """ Attach newly opened camera and read all nodes.
+
+        Args:
+            cam: Camera object (see :attr:`Basler.cam`) or None to detach.
+        """
+        with self.lock:
+            self.cam = cam
+            self.nodes = {}
+            self.pending = []
+            if cam is None:
+                self.values,self.limits,self.stale = {},{},set()
+                return
+            for name in self.names:
+                try:
+                    self.nodes[name] = getattr(cam,name)
+                except (genicam.LogicalErrorException,AttributeError):
+                    pass    # Node not supported by this camera
+            self.refresh()
+
+    def refresh(self,names=None):
+        """ Read nodes `names` (all if None) from the camera """
+        with self.lock:
+            for name in (self.nodes if names is None else names):
+                self.__read(name)
+
+    def invalidate(self,names=None):
+        """ Mark nodes `names` (all if None) as stale so they are read again
+        on the next access. """
+        with self.lock:
+            self.stale.update(self.nodes if names is None else names)
+
+    def __read(self,name):
+        node = self.nodes.get(name)
+        if node is None:
+            return
+        self.reads += 1
+        self.values[name] = node.GetValue()
+        try:
+            self.limits[name] = (node.GetMin(),node.GetMax(),node.GetInc())
+        except Exception:
+            self.limits[name] = None    # Enumeration, read-only node etc.
+        self.stale.discard(name)
+
+    def __fresh(self,name):
+        """ Make sure `name` is up to date, write pending writes if needed """
+        if self.pending and name in self.__affected(n for n,_ in self.pending):
+            self.__commit()
+        if name in self.stale:
+            self.__read(name)
+
+    def __affected(self,names):
+        """ Get nodes which may change by writing `names` """
+        affected = set()
+        for name in names:
+            affected.update(NODE_DEPENDENCIES.get(name,self.nodes))
+        return affected
+
+    def has(self,name):
+        """ Does the camera have node `name`? """
+        return name in self.nodes
+
+    def writable(self,name):
+        """ Is node `name` writable now? Access mode is checked on each call
+        (it changes e.g. when grabbing starts). """
+        node = self.nodes.get(name)
+        return node is not None and isWritable(node)
+
+    def get(self,name):
+        """ Get value of node `name` (None if not available) """
+        with self.lock:
+            for n,value in reversed(self.pending):
+                if n == name:
+                    return value
+            self.__fresh(name)
+            return self.values.get(name)
+
+    def getLimits(self,name):
+        """ Get minimum, maximum and increment of node `name`.
+
+        Returns:
+            (float,float,float): Limits or None if not available.
+        """
+        with self.lock:
+            self.__fresh(name)
+            return self.limits.get(name)
+
+    def set(self,name,value):
+        """ Write `value` to node `name`. Within :func:`transaction`, the write
+        is postponed until the transaction ends. """
+        with self.lock:
+            self.pending.append((name,value))
+            if self.depth == 0:
+                self.__commit()
+
+    @contextmanager
+    def transaction(self):
+        """ Context manager collecting writes, see class description.
+
+        Example:
+            ::
+
+                with nodes.transaction():
+                    nodes.set('OffsetX',0)
+                    nodes.set('Width',640)
+        """
+        with self.lock:
+            self.depth += 1
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.__commit()
+
+    def __commit(self):
+        """ Write pending writes in order, skip those not changing value """
+        pending,self.pending = self.pending,[]
+        try:
+            for name,value in pending:
+                if name in self.stale:
+                    self.__read(name)
+                if self.values.get(name) == value:
+                    self.skipped += 1
+                    continue
+                self.nodes[name].SetValue(value)
+                self.writes += 1
+                # Written node is known, dependent nodes must be read again
+                self.stale.update(self.__affected([name]))
+                self.stale.discard(name)
+                self.values[name] = value
+        except Exception:
+            self.invalidate()   # State of the camera is not known
+            raise
+
+    def flush(self):
+        """ Write pending writes now, even within :func:`transaction` (e.g.
+        to handle a rejected write). Raises the exception of the camera. """
+        with self.lock:
+            self.__commit()
+
+    def stats(self):
+        """ Get numbers of reads, writes and skipped writes """
+        return {'reads': self.reads,'writes': self.writes,
+            'skipped': self.skipped}
+
+class BufferPool():
+    """
+    Pool of preallocated frame buffers. Images retrieved by the grab session
+    are copied into buffers of this pool so the camera buffer can be released
+    immediately (see :func:`Basler.grabImg`).
+
+    **Ownership:** Each buffer counts its holders. :func:`acquire` gives a
+    buffer held once by the caller. Every consumer which keeps the frame (or
+    a view of it) beyond the call it got it in (:class:`FrameRing`,
+    :class:`recorder.Recorder`, ...) calls :func:`retain` and
+    :func:`release` when done. Buffer is reused only when nobody holds it.
+    Arrays which do not come from the pool are ignored by :func:`retain` and
+    :func:`release`, so consumers need not care where a frame comes from.
+
+    Pool grows up to :attr:`maxSize` buffers. If all of them are held, a new
+    buffer outside the pool is allocated and counted in :attr:`overflows`.
+    Growing number of :func:`outstanding` buffers and overflows indicate a
+    consumer which does not release frames.
+
+    **Format change:** When a buffer of another shape or type is acquired
+    (new resolution, ROI or pixel format), buffers of the old format are
+    removed from the pool. Those still held are retired: they are counted
+    by :func:`outstanding` until their last :func:`release`.
+
+    Args:
+        maxSize (int): Maximum number of buffers. Defaults to 16.
+
+    Attributes:
+        allocated (int): Number of buffers allocated by the pool since its
+            creation (including buffers of previous formats).
+        overflows (int): Number of buffers allocated outside the pool.
+    """
+
+    def __init__(self,maxSize=16):
+        self.maxSize = maxSize
+        self.buffers = []
+        self.holds = {}         # id of buffer -> number of holders
+        self.retired = {}       # id -> held buffer of a previous format
+        self.lock = threading.Lock()
+        self.allocated = 0
+        self.overflows = 0
+
+    def acquire(self,shape,dtype):
+        """ Get free buffer of given shape and type, held once by the caller
+        (see :func:`release`). Buffers of other format are retired.
+
+        Args:
+            shape (tuple): Shape of the buffer.
+            dtype: Data type of the buffer.
+
+        Returns:
+            :class:`np.ndarray`: Uninitialized buffer.
+        """
+        with self.lock:
+            if self.buffers and (self.buffers[0].shape != tuple(shape)
+                    or self.buffers[0].dtype != dtype):
+                for buf in self.buffers:
+                    if self.holds[id(buf)] > 0:
+                        self.retired[id(buf)] = buf
+                    else:
+                        del self.holds[id(buf)]
+                self.buffers = []
+            for buf in self.buffers:
+                if self.holds[id(buf)] == 0:
+                    self.holds[id(buf)] = 1
+                    return buf
+            buf = np.empty(shape,dtype)
+            if len(self.buffers) < self.maxSize:
+                self.buffers.append(buf)
+                self.holds[id(buf)] = 1
+                self.allocated += 1
+            else:
+                self.overflows += 1
+            return buf
+
+    def __buffer(self,frame):
+        """ Get id of the pool buffer `frame` (or its view) is made of """
+        while isinstance(getattr(frame,'base',None),np.ndarray):
+            frame = frame.base
+        key = id(frame)
+        return key if key in self.holds else None
+
+    def retain(self,frame):
+        """ Hold buffer of `frame` until :func:`release`.
+
+        Returns:
+            :class:`np.ndarray`: `frame`
+        """
+        with self.lock:
+            key = self.__buffer(frame)
+            if key is not None:
+                self.holds[key] += 1
+        return frame
+
+    def release(self,frame):
+        """ Drop hold of :func:`acquire` or :func:`retain` on buffer of
+        `frame` """
+        with self.lock:
+            key = self.__buffer(frame)
+            if key is not None:
+                if self.holds[key] > 0:
+                    self.holds[key] -= 1
+                    if self.holds[key] == 0 and key in self.retired:
+                        del self.retired[key],self.holds[key]
+                else:
+                    al.printW("BufferPool: Buffer released more times than "
+                        "held!")
+
+    def outstanding(self):
+        """ Get number of buffers held by consumers """
+        with self.lock:
+            return sum(n > 0 for n in self.holds.values())
+
+    def stats(self):
+        """ Get statistics of the pool.
+
+        Returns:
+            dict: Number of buffers in the pool (`size`), retired buffers
+            of previous formats still held (`retired`), buffers held by
+            consumers (`outstanding`, including retired), allocated by the
+            pool and outside the pool.
+        """
+        return {
+            'size':         len(self.buffers),
+            'retired':      len(self.retired),
+            'outstanding':  self.outstanding(),
+            'allocated':    self.allocated,
+            'overflows':    self.overflows,
+        }
+
 class Basler():
     """
     Object which connects to the camera, gets images etc. This is initiated by
@@ -106,61 +621,223 @@ class Basler():
         connectionSignal: Emits True (False) upon (dis)connection. Defaults to
             None.
         messageSignal: Status messages are emitted here. Defaults to None.
+        backend (str): Key of :data:`CAMERA_BACKENDS`. Defaults to 'pylon'.
+        backendOptions (dict,optional): Keyword arguments of the backend
+            function, e.g. ``{'width': 640, 'fps': 100}`` for 'synthetic'.
+        serial (str,optional): Serial number of the camera. Defaults to None,
+            i.e. the first camera found.
+        autoConnect (bool): Connect the camera in the constructor. Defaults to
+            True. Set False and call :func:`connect` from a background thread
+            to avoid blocking (as :class:`BaslerGUI` does).
+
+    **Camera backend:** Camera object :attr:`cam` is created by a function of
+    :data:`CAMERA_BACKENDS`. Backend 'synthetic' simulates the camera (see
+    :mod:`synthcam`) so the whole pipeline can be run without hardware.
+    Available cameras are listed by :func:`discover`, camera is chosen by
+    :attr:`serial`.
+
+    **Grab session:** By default, :func:`grabImg` starts and stops
+    acquisition for every single image. Call :func:`startGrabbing` to keep
+    acquisition running so images are retrieved back to back; :func:`grabImg`
+    then only waits for the next image. Parameters which are locked during
+    acquisition (like resolution) are written within :func:`reconfigure` which
+    stops and restarts the session.
+
+    **Camera nodes:** Nodes are read and written via :attr:`nodes` which
+    caches their values and limits (see :class:`NodeCache`). Settings which
+    write several nodes do it in one :func:`transaction`.
+
+    **Timeout:** :func:`grabImg` waits for an image at most
+    :func:`grabTimeout` which is derived from the exposure time and frame
+    rate, so long exposures do not time out and a stalled camera is detected
+    early. Grab which fails or times out returns None and is counted in
+    :attr:`timeouts` or :attr:`errors`. Stalled camera is reopened by
+    :func:`reconnect`, usually called by the watchdog of :class:`Thread`.
+
+    **Frame sequence:** Chunk data of :data:`CHUNKS` (camera timestamp,
+    frame counter and exposure time) are enabled if the camera supports them
+    and read with each image into :attr:`frameInfo`. Frames grabbed by the
+    grab session are checked by :attr:`frameStats` so frames missing in the
+    sequence are counted and the true sensor frame rate is known.
+
+    **Buffers:** Every grab result is released right after its image is
+    copied so no camera buffer is held by the application. Images of the
+    grab session are copied into :attr:`pool` (see :func:`grabImg`).
+    Statistics of buffers are returned by :func:`bufferStats`.
+
+    **Bit depth:** Pixel format (see :data:`PIXEL_FORMATS`) is set by
+    :func:`setPixelFormat`. Images of more than 8 bits are returned as
+    ``np.uint16`` (packed formats are unpacked by :func:`unpack12`) and
+    :func:`getBitDepth` tells the number of significant bits.
+
+    **Color:** Color cameras deliver raw Bayer images (1 value per pixel, see
+    :mod:`bayer`) which are returned by :func:`grabImg` as they are, the
+    pattern is in :attr:`frameInfo`. Colors are reconstructed by the
+    consumers: half resolution preview by :class:`Thread`, full resolution
+    for saved images. Recorded frames stay raw unless color recording is
+    enabled in :class:`SaveSettings` (see :class:`recorder.Recorder`).
+
+    **Binning and decimation:** Set :attr:`binning` (:attr:`decimation`) to
+    combine (skip) pixels. Camera binning (decimation) is used if the camera
+    supports given factor, otherwise images are reduced in :func:`grabImg`.
 
     Attributes:
         cam (:class:`pylon.InstantCamera`): Camera object. Initiated in
-            :func:`connect`. 
+            :func:`connect`. :class:`synthcam.SyntheticCamera` for backend
+            'synthetic'.
         connected (bool): True if connected, False otherwise.
         resolution (:class:`ablolib.DynVar`): Dynamic variable, should be accessed
             via `set() and `get()` methods. The value corresponds to percentual 
             ratio between maximum and minimum resolution.
         exposure (:class:`ablolib.DynVar`): Dynamic variable,...
+        binning (:class:`ablolib.DynVar`): Dynamic variable, binning factor
+            (horizontal and vertical).
+        decimation (:class:`ablolib.DynVar`): Dynamic variable, decimation
+            factor (horizontal and vertical).
+        frameInfo (dict): Information about the last grabbed image:
+            camera timestamp `camT` [s], host time `retrieveT`
+            (``time.perf_counter()``) when the image was retrieved, frame
+            counter `frameId`, `exposure` time [us] (None without chunk
+            data), `pixelFormat`, `bitDepth`, Bayer pattern `bayer` (None for
+            mono images, see :func:`bayer.bayerPattern`), number of images
+            `skipped` by the grab strategy and `gap`, the number of frames
+            missing before this one (see :func:`FrameStats.add`).
+        frameStats (:class:`FrameStats`): Completeness and frame rate of the
+            frames grabbed by the grab session.
+        chunks (dict): Chunk data enabled on the camera: key of
+            :data:`CHUNKS` -> node of the grab result.
+        pixelSize (float): Size of one sensor pixel projected to the sample,
+            in stage units [mm]. Used as image-to-stage calibration, see
+            :func:`getPixelSize`.
+        limits (dict): Minimum, maximum and increment of `Width`, `Height`,
+            `OffsetX` and `OffsetY` camera nodes (full sensor, i.e. zero
+            offsets). Read from :attr:`nodes` in :func:`connect` and when binning
+            or decimation changes.
+        roi ((int,int,int,int)): Area of interest (x, y, width, height) set by
+            :func:`setROI` or None if full frame is read out.
+        grabStrategy (str): Key of :data:`GRAB_STRATEGIES` used by the grab
+            session. Defaults to 'latest'.
+        bufferCount (int): Number of buffers allocated for the grab session.
+            Defaults to 5.
+        nodes (:class:`NodeCache`): Cached camera nodes.
+        pool (:class:`BufferPool`): Buffers of grabbed images.
+        unreleased (int): Number of grab results retrieved but not released
+            yet. It is nonzero only during :func:`grabImg`.
+        timeouts (int): Number of grabs which timed out.
+        errors (int): Number of grabs which failed.
+        recoveryTimes (list): Durations of successful :func:`reconnect` [s].
+        devices (list): Cameras found by the last :func:`discover`.
+        serial (str): Serial number of the camera to connect (None for the
+            first camera found).
     """
 
-    def __init__(self,connectionSignal=None,messageSignal=None):
+    def __init__(self,connectionSignal=None,messageSignal=None,
+                 backend='pylon',backendOptions=None,serial=None,
+                 autoConnect=True):
         self.cam = None
+        self.backend = backend
+        self.backendOptions = backendOptions or {}
+        self.serial = serial
+        self.devices = []
         self.connected = False
+        self.session = False        # Is the persistent grab session running?
+        self.grabStrategy = 'latest'
+        self.bufferCount = 5
+        self.nodes = NodeCache()
+        self.pool = BufferPool()
+        self.unreleased = 0
+        self.limits = {}
+        self.roi = None
         self.connectionSignal = connectionSignal
         self.connectionSignal.connect(self.__setConnectionStatus)
         self.messageSignal = messageSignal
 
         # Init resolution and connect it to a slot function.
         self.resolution = al.DynVar(30)
-        self.resolution.signal.connect(self.__setResolution)
+        # Direct connection: camera is set in the thread which calls `set()`
+        self.resolution.signal.connect(self.__setResolution,Qt.DirectConnection)
 
         # Init exposureT and connect it to a slot function.
         self.exposureT = al.DynVar(0)
-        self.exposureT.signal.connect(self.__setExposureT)
+        self.exposureT.signal.connect(self.__setExposureT,Qt.DirectConnection)
+
+        # Init binning and decimation. Factors which are not supported by the
+        # camera are applied in software.
+        self.binning = al.DynVar(1)
+        self.binning.signal.connect(self.__setBinning,Qt.DirectConnection)
+        self.decimation = al.DynVar(1)
+        self.decimation.signal.connect(self.__setDecimation,Qt.DirectConnection)
+        self.swBinning = 1
+        self.swDecimation = 1
+
+        self.pixelSize = 0.001
+
+        self.frameInfo = {}
+        self.frameStats = FrameStats()
+        self.chunks = {}
+        self.tickFrequency = 1e9    # Camera timestamp ticks per second
 
-        self.connected = self.connect()
+        self.timeout = 5000         # [ms], see `grabTimeout()`
+        self.timeouts = 0
+        self.errors = 0
+        self.recoveryTimes = []
+
+        if autoConnect:
+            self.connected = self.connect()
 
     def __setConnectionStatus(self,connection_status):
         self.connected = connection_status
 
-    def connect(self):
+    def discover(self):
+        """ Find available cameras and save them to :attr:`devices`. This may
+        take several seconds, do not call it from the `main` thread.
+
+        Returns:
+            list: Dictionaries with `serial`, `model`, `interface` and `name`.
+        """
+        al.emitMsg(self.messageSignal,'Searching for cameras...')
+        try:
+            self.devices = DEVICE_DISCOVERY[self.backend]()
+        except Exception as ex:
+            al.printException(ex)
+            self.devices = []
+        al.emitMsg(self.messageSignal,f'{len(self.devices)} camera(s) found')
+        return self.devices
+
+    def connect(self,serial=None):
         """
-        Connect Basler camera. Initialization of :attr:`cam`.
+        Connect Basler camera. Initialization of :attr:`cam`. This may take
+        several seconds, :class:`BaslerGUI` calls it from a background thread.
+
+        Args:
+            serial (str,optional): Serial number of the camera. Defaults to
+                :attr:`serial`.
 
         Returns:
             bool: The return value. True for success, False otherwise.
         """
 
+        if serial is not None:
+            self.serial = serial
         self.connected = False
         print('Connecting Basler camera:',end='')
+        al.emitMsg(self.messageSignal,'Connecting camera {}...'.format(
+            self.serial or ''))
 
         # Attempt to connect several times
         for _ in range(2):
             try:
-                # Connect camera
-                self.cam = pylon.InstantCamera(pylon.TlFactory.GetInstance().CreateFirstDevice())
-                self.cam.Open()
+                self.__open()
                 self.connected = True
                 break
             except:
                 print('.',end='')
 
         if self.connected:
-            self.exposureT.set(self.cam.ExposureTime.Min)
+            # Remember the camera, e.g. for `reconnect()`
+            self.serial = self.cam.GetDeviceInfo().GetSerialNumber()
+            self.__readLimits()
+            self.exposureT.set(self.nodes.getLimits('ExposureTime')[0])
             self.__setResolution()              # Set camera default resolution
             al.printOK(" Connected!")
             msg = "Basler camera connected!"
@@ -174,12 +851,102 @@ class Basler():
             self.disconnect()
             return False
 
+    def __open(self):
+        """ Create camera object (see :data:`CAMERA_BACKENDS`) and open it """
+        options = dict(self.backendOptions)
+        if self.serial is not None:
+            options['serial'] = self.serial
+        self.cam = CAMERA_BACKENDS[self.backend](**options)
+        self.cam.Open()
+        self.nodes.attach(self.cam)
+        try:    # GigE cameras, USB cameras count in ns
+            self.tickFrequency = self.cam.GevTimestampTickFrequency.GetValue()
+        except Exception:
+            self.tickFrequency = 1e9
+        self.__enableChunks()
+
+    def __enableChunks(self):
+        """ Enable chunk data of :data:`CHUNKS` supported by the camera """
+        self.chunks = {}
+        try:
+            self.cam.ChunkModeActive.SetValue(True)
+            selectors = self.cam.ChunkSelector.GetSymbolics()
+        except Exception:
+            return      # No chunk data, values of grab results are used
+        for key,options in CHUNKS.items():
+            for selector,node in options:
+                if selector not in selectors:
+                    continue
+                try:
+                    self.cam.ChunkSelector.SetValue(selector)
+                    self.cam.ChunkEnable.SetValue(True)
+                    self.chunks[key] = node
+                except Exception as ex:
+                    al.printW(f"Chunk '{selector}' can not be enabled!")
+                    al.printException(ex)
+                break
+
+    def reconnect(self,attempts=RECONNECT_ATTEMPTS):
+        """ Reopen stalled camera and restore its settings (pixel format,
+        exposure time, binning, decimation, resolution or area of interest).
+        Running grab session is restarted. Camera is disconnected if all
+        attempts fail.
+
+        Args:
+            attempts (int): Maximum number of attempts. Delay between attempts
+                grows by :data:`RECONNECT_DELAY`. Defaults to
+                :data:`RECONNECT_ATTEMPTS`.
+
+        Returns:
+            float: Recovery time [s] or None if the camera was not recovered.
+        """
+        t0 = time.perf_counter()
+        session = self.session
+        roi = self.roi
+        pixelFormat = self.nodes.get('PixelFormat')
+        self.session = False
+        try:
+            self.cam.StopGrabbing()
+            self.cam.Close()
+        except Exception:
+            pass    # Camera is probably gone, it is opened again below
+
+        for i in range(attempts):
+            al.printW(f"Reconnecting Basler camera ({i+1}/{attempts})...")
+            try:
+                self.__open()
+                if pixelFormat is not None:
+                    self.setPixelFormat(pixelFormat)
+                self.__readLimits()
+                self.__setExposureT()
+                self.__setBinning()     # Binning and decimation also set
+                self.__setDecimation()  # resolution
+                if roi is not None:
+                    self.setROI(*roi)
+                break
+            except Exception as ex:
+                al.printException(ex)
+                time.sleep(RECONNECT_DELAY*(i+1))
+        else:
+            al.printE("Basler camera not recovered!")
+            self.disconnect()
+            return None
+
+        if session:
+            self.startGrabbing()
+        recoveryT = time.perf_counter()-t0
+        self.recoveryTimes.append(recoveryT)
+        al.printOK(f"Basler camera recovered in {recoveryT:.2f} s")
+        return recoveryT
+
     def disconnect(self):
         """ Disconnect """
+        self.session = False
         try:
             self.cam.StopGrabbing()
             self.cam.Close()
             self.cam = None
+            self.nodes.attach(None)
             msg = "Basler camera disconnected!"
             print(msg)
             al.emitMsg(self.messageSignal,msg)
@@ -189,80 +956,439 @@ class Basler():
         finally:
             self.connectionSignal.emit(False)
 
-    def grabImg(self):
+    def startGrabbing(self,strategy=None,bufferCount=None):
+        """ Start a persistent grab session. Acquisition keeps running until
+        :func:`stopGrabbing` is called so images can be retrieved back to back
+        via :func:`grabImg`.
+
+        Note:
+            Strategy 'upcoming' is not supported by USB cameras.
+
+        Args:
+            strategy (str,optional): Key of :data:`GRAB_STRATEGIES`. Defaults
+                to :attr:`grabStrategy`.
+            bufferCount (int,optional): Number of buffers used for grabbing.
+                Defaults to :attr:`bufferCount`.
+
+        Returns:
+            bool: True if the session is running, False otherwise.
+        """
+
+        if strategy is not None:
+            self.grabStrategy = strategy
+        if bufferCount is not None:
+            self.bufferCount = bufferCount
+
+        if not self.connected:
+            return False
+
+        if self.cam.IsGrabbing():
+            self.cam.StopGrabbing()
+        self.cam.MaxNumBuffer.SetValue(self.bufferCount)
+        self.frameStats.restart()
+        self.cam.StartGrabbing(GRAB_STRATEGIES[self.grabStrategy])
+        self.session = True
+        return True
+
+    def stopGrabbing(self):
+        """ Stop the persistent grab session started by :func:`startGrabbing`.
+        """
+        self.session = False
+        if self.cam is not None and self.cam.IsGrabbing():
+            self.cam.StopGrabbing()
+
+    @contextmanager
+    def reconfigure(self):
+        """ Context manager used to change parameters which cannot be written
+        while grabbing. Running grab session is stopped before and restarted
+        (with the same strategy and buffer count) after the block.
 
-        """ Grab image and return image data.
+        Example:
+            ::
+
+                with basler.reconfigure():
+                    basler.nodes.set('Width',640)
+        """
+        restart = self.session
+        if restart:
+            self.stopGrabbing()
+        try:
+            yield
+        finally:
+            self.__updateTimeout()      # Frame rate might change
+            if restart:
+                self.startGrabbing()
+
+    @contextmanager
+    def transaction(self):
+        """ Context manager writing camera nodes in one batch: grab session
+        is stopped once (see :func:`reconfigure`) and writes are collected
+        and written together (see :func:`NodeCache.transaction`).
+
+        Example:
+            ::
+
+                with basler.transaction():
+                    basler.nodes.set('OffsetX',0)
+                    basler.nodes.set('Width',640)
+        """
+        with self.reconfigure(), self.nodes.transaction():
+            yield
+
+    def grabTimeout(self):
+        """ Get timeout of :func:`grabImg`: :data:`TIMEOUT_FRAMES` frame
+        periods (or exposure times if longer) plus :data:`TIMEOUT_MARGIN`.
+        Value is cached, it is updated when exposure time or image size
+        changes.
+
+        Returns:
+            int: Timeout [ms].
+        """
+        return self.timeout
+
+    def __updateTimeout(self):
+        """ Update timeout returned by :func:`grabTimeout` """
+        period = self.exposureT.get()/1e6
+        fps = self.nodes.get('ResultingFrameRate')
+        if fps:     # Node not available, exposure time is used
+            period = max(period,1/fps)
+        self.timeout = int(1000*(TIMEOUT_FRAMES*period + TIMEOUT_MARGIN))
+
+    def grabImg(self,pooled=False):
+
+        """ Grab image and return image data. If the grab session is running
+        (see :func:`startGrabbing`), the next image of the session is returned.
+        Otherwise, acquisition is started for a single image.
         
+        Image is copied (packed formats unpacked) into a new array or a buffer
+        of :attr:`pool` and the grab result is always released.
+
+        Args:
+            pooled (bool): Copy into a buffer of :attr:`pool` held by the
+                caller, who must call :func:`BufferPool.release` when done
+                (used by :class:`Thread`). Defaults to False.
+
         Returns:
-            :class:`np.ndarray`: 2D array of image data.
+            :class:`np.ndarray`: 2D array of image data (``np.uint8`` or
+            ``np.uint16``, see :func:`getBitDepth`; raw Bayer image of color
+            cameras) or None if the grab failed or timed out (see
+            :func:`grabTimeout`).
          """
 
         n_img = 1
         try:
-            self.cam.StartGrabbingMax(n_img)
+            if not self.session:
+                self.cam.StartGrabbingMax(n_img)
             # `StopGrabbing()` is called automatically by `RetrieveResult()`
-            while self.cam.IsGrabbing():
-                # Wait for an image, timeout is 5000 ms
-                grabResult = self.cam.RetrieveResult(
-                    5000, pylon.TimeoutHandling_ThrowException)
-
-                if grabResult.GrabSucceeded():
-                    # Access the image data.
-                    return grabResult.Array
-
+            grabResult = self.cam.RetrieveResult(
+                self.grabTimeout(), pylon.TimeoutHandling_Return)
+            self.unreleased += 1
+            try:
+                if not grabResult.IsValid():
+                    self.timeouts += 1
+                elif grabResult.GrabSucceeded():
+                    info = self.__frameInfo(grabResult)
+                    self.frameInfo = info
+                    buf = self.__copyResult(grabResult,info['pixelFormat'],
+                        pooled)
+                    img = self.__reduce(buf,info['bayer'])
+                    if pooled and not np.may_share_memory(img,buf):
+                        self.pool.release(buf)  # Reduced into a new array
+                    return img
+                else:
+                    self.errors += 1
+            finally:
                 grabResult.Release()
+                self.unreleased -= 1
 
         except Exception as ex:
-            self.disconnect()
-            msg = "Camera not connected!"
+            self.errors += 1
+            msg = "Grabbing failed!"
             al.printW(msg)
             al.printException(ex)
             al.emitMsg(self.messageSignal,msg)
-            return np.random.normal(size=(100,100))
 
-    def grabVideoInit(self):
-        self.cam.StartGrabbing(pylon.GrabStrategy_LatestImageOnly)
-        self.converter = pylon.ImageFormatConverter()
-        self.converter.OutputPixelFormat = pylon.PixelType_BGR8packed
-        self.converter.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
-
-    def grabVideo(self):
-        grabResult = self.cam.RetrieveResult(
-            5000, pylon.TimeoutHandling_ThrowException)
+        # Single image was not grabbed, stop acquisition started above
+        if not self.session:
+            try:
+                self.cam.StopGrabbing()
+            except Exception:
+                pass
+        return None
+
+    def __frameInfo(self,grabResult):
+        """ Compose :attr:`frameInfo` of `grabResult`. Chunk data are
+        preferred to values of the grab result (host side counters). """
+        info = {
+            'retrieveT':    time.perf_counter(),
+            'camT':         grabResult.TimeStamp,
+            'frameId':      grabResult.BlockID,
+            'exposure':     None,
+            'skipped':      grabResult.NumberOfSkippedImages,
+            'pixelFormat':  self.nodes.get('PixelFormat'),
+        }
+        info['bitDepth'] = PIXEL_FORMATS.get(info['pixelFormat'],(8,))[0]
+        info['bayer'] = bayerPattern(info['pixelFormat'])
+        for key,node in self.chunks.items():
+            try:
+                info[key] = getattr(grabResult,node).Value
+            except Exception:
+                pass    # Chunk missing in this image
+        info['camT'] /= self.tickFrequency
+        if self.session:
+            info['gap'] = self.frameStats.add(
+                info['frameId'],info['camT'],info['skipped'])
+        else:   # Single images are not a sequence
+            info['gap'] = 0
+        return info
+
+    def __copyResult(self,grabResult,pixelFormat=None,pooled=False):
+        """ Copy image of `grabResult` into a new array or (`pooled`) a
+        buffer of :attr:`pool`. Packed `pixelFormat` is unpacked into the
+        buffer. """
+        alloc = self.pool.acquire if pooled else np.empty
+        if PIXEL_FORMATS.get(pixelFormat,(8,False))[1]:
+            w,h = grabResult.Width,grabResult.Height
+            buf = alloc((h,w),np.uint16)
+            return unpack12(grabResult.GetBuffer(),w,h,pixelFormat,out=buf)
+        with grabResult.GetArrayZeroCopy() as array:
+            buf = alloc(array.shape,array.dtype)
+            np.copyto(buf,array)
+        return buf
+
+    def bufferStats(self):
+        """ Get statistics of buffers (see :class:`BufferPool`).
 
-        if grabResult.GrabSucceeded():
-            image = self.converter.Convert(grabResult)
-            img = image.GetArray()
-            return img
-        grabResult.Release()
+        Returns:
+            dict: :func:`BufferPool.stats` and number of `unreleased` grab
+            results.
+        """
+        return dict(self.pool.stats(),unreleased=self.unreleased)
 
     def __setExposureT(self,*_):
-        self.cam.ExposureTime.SetValue(self.exposureT.get())
+        # Exposure time can usually be changed on the fly. Otherwise, the grab
+        # session is restarted.
+        if self.nodes.writable('ExposureTime'):
+            self.nodes.set('ExposureTime',self.exposureT.get())
+            self.__updateTimeout()
+        else:
+            with self.transaction():
+                self.nodes.set('ExposureTime',self.exposureT.get())
+
+    def __readLimits(self):
+        """ Read limits of image size nodes and save them to :attr:`limits`.
+        Offsets are reset first so maximum size corresponds to full sensor.
+        Maximum offsets reported by the camera depend on the current size, so
+        they are replaced by the sensor size minus the minimum size (the
+        actual maximum is given to :func:`__snap` by :func:`setROI`). """
+        self.roi = None
+        with self.nodes.transaction():
+            self.nodes.set('OffsetX',0)
+            self.nodes.set('OffsetY',0)
+        for key in SIZE_NODES:
+            self.limits[key] = self.nodes.getLimits(key)
+        for offset,size in [('OffsetX','Width'),('OffsetY','Height')]:
+            vmin,_,inc = self.limits[offset]
+            minSize,maxSize,_ = self.limits[size]
+            self.limits[offset] = (vmin,maxSize-minSize,inc)
+
+    def __snap(self,key,value,vmax=None):
+        """ Round `value` to a valid value of node `key` (see :attr:`limits`).
+        Maximum can be lowered by `vmax`. """
+        vmin,_vmax,inc = self.limits[key]
+        if vmax is None or vmax > _vmax:
+            vmax = _vmax
+        value = vmin + inc*round((value-vmin)/inc)
+        return int(min(max(value,vmin),vmin+inc*((vmax-vmin)//inc)))
 
     def __setResolution(self,*_):
         if self.connected:
             # Load camera parameters
-            minW = self.cam.Width.GetMin()
-            maxW = self.cam.Width.GetMax()
-            minH = self.cam.Height.GetMin()
-            maxH = self.cam.Height.GetMax()
+            minW,maxW,_ = self.limits['Width']
+            _,maxH,_ = self.limits['Height']
             # Calculate new width and height
             # Width: width-minW must be dividable without rest by 32
             nW = minW + 32*round(self.resolution.get()*((maxW-minW)/32)/100)
+            nW = self.__snap('Width',nW)    # Rounding may exceed maximum
             # Height: Keep aspect ratio same as maxW/maxH
-            nH = round(nW/maxW*maxH)
-            # Write new values to camera settings
-            self.cam.Width.SetValue(nW)
-            self.cam.Height.SetValue(nH)
+            nH = self.__snap('Height',nW/maxW*maxH)
+            # Write new values to camera settings (locked while grabbing)
+            with self.transaction():
+                self.roi = None
+                self.nodes.set('OffsetX',0)
+                self.nodes.set('OffsetY',0)
+                self.nodes.set('Width',nW)
+                self.nodes.set('Height',nH)
+
+    def setROI(self,x,y,w,h):
+        """ Set area of interest (AOI) of the camera sensor so only this area
+        is read out. Values are rounded to valid values of camera nodes.
+        Full frame is restored by setting :attr:`resolution`.
+
+        Args:
+            x (int): Horizontal offset (sensor pixels).
+            y (int): Vertical offset (sensor pixels).
+            w (int): Width (sensor pixels).
+            h (int): Height (sensor pixels).
+
+        Returns:
+            (int,int,int,int): Area of interest which was really set.
+        """
+        maxW = self.limits['Width'][1]
+        maxH = self.limits['Height'][1]
+        w = self.__snap('Width',w)
+        h = self.__snap('Height',h)
+        x = self.__snap('OffsetX',x,maxW-w)
+        y = self.__snap('OffsetY',y,maxH-h)
+        with self.transaction():
+            # Offsets first to zero so any new size is valid
+            self.nodes.set('OffsetX',0)
+            self.nodes.set('OffsetY',0)
+            self.nodes.set('Width',w)
+            self.nodes.set('Height',h)
+            self.nodes.set('OffsetX',x)
+            self.nodes.set('OffsetY',y)
+        self.roi = (x,y,w,h)
+        return self.roi
+
+    def setViewROI(self,x,y,w,h):
+        """ Set area of interest from a rectangle in relative coordinates of
+        the current image (e.g. drawn in the view, see
+        :attr:`PixmapView.roiSelected`).
+
+        Args:
+            x (float): Left edge, from 0 to 1.
+            y (float): Top edge, from 0 to 1.
+            w (float): Width, from 0 to 1.
+            h (float): Height, from 0 to 1.
+
+        Returns:
+            (int,int,int,int): Area of interest which was really set.
+        """
+        W,H = self.nodes.get('Width'),self.nodes.get('Height')
+        oX,oY = self.getOffset()
+        return self.setROI(oX+x*W,oY+y*H,w*W,h*H)
+
+    def __nodeAccepts(self,name,n):
+        """ Is `n` within limits of node `name` and on its increment? """
+        limits = self.nodes.getLimits(name)
+        if limits is None:
+            return True     # Not known, the camera decides on writing
+        vmin,vmax,inc = limits
+        return vmin <= n <= vmax and (n-vmin) % (inc or 1) == 0
+
+    def __setNodePair(self,prefix,n):
+        """ Set `prefix`+Horizontal and `prefix`+Vertical camera nodes to `n`.
+        Nodes are reset to 1 if `n` is not supported, i.e. out of limits, not
+        on the increment or rejected by the camera (some cameras support
+        e.g. only 1, 2 and 4).
+
+        Returns:
+            bool: True if the camera supports factor `n`, False otherwise.
+        """
+        hName,vName = prefix+'Horizontal',prefix+'Vertical'
+        if not (self.nodes.writable(hName) and self.nodes.writable(vName)):
+            return n == 1
+        if n != 1 and self.__nodeAccepts(hName,n) and \
+                self.__nodeAccepts(vName,n):
+            try:
+                self.nodes.set(hName,n)
+                self.nodes.set(vName,n)
+                self.nodes.flush()
+                return True
+            except Exception:
+                pass    # Rejected by the camera
+        self.nodes.set(hName,1)
+        self.nodes.set(vName,1)
+        return n == 1
+
+    def __setBinning(self,*_):
+        if self.connected:
+            n = int(self.binning.get())
+            with self.transaction():
+                if self.nodes.writable('BinningHorizontalMode'):
+                    self.nodes.set('BinningHorizontalMode','Average')
+                self.swBinning = 1 if self.__setNodePair('Binning',n) else n
+                self.__readLimits()     # Sensor size changed
+                self.__setResolution()
+
+    def __setDecimation(self,*_):
+        if self.connected:
+            n = int(self.decimation.get())
+            with self.transaction():
+                self.swDecimation = 1 if self.__setNodePair('Decimation',n) else n
+                self.__readLimits()     # Sensor size changed
+                self.__setResolution()
+
+    def __reduce(self,img,bayer=None):
+        """ Apply binning and decimation not supported by the camera. Raw
+        images of color cameras (`bayer` pattern) keep the pattern. """
+        if self.swBinning > 1:
+            img = (binBayer(img,self.swBinning) if bayer
+                else binImage(img,self.swBinning))
+        if self.swDecimation > 1:
+            img = (decimateBayer(img,self.swDecimation) if bayer
+                else img[::self.swDecimation,::self.swDecimation])
+        return img
+
+    def setPixelFormat(self,pixelFormat):
+        """ Set pixel format of the camera.
+
+        Args:
+            pixelFormat (str): One of :func:`getPixelFormats`.
+        """
+        if self.connected:
+            with self.transaction():
+                self.nodes.set('PixelFormat',pixelFormat)
+
+    def getPixelFormats(self):
+        """ Get pixel formats supported by the camera and
+        :data:`PIXEL_FORMATS` """
+        try:
+            available = self.cam.PixelFormat.GetSymbolics()
+        except Exception:
+            return []
+        return [fmt for fmt in PIXEL_FORMATS if fmt in available]
+
+    def getBitDepth(self):
+        """ Get number of significant bits of pixel values """
+        return PIXEL_FORMATS.get(self.nodes.get('PixelFormat'),(8,))[0]
+
+    def getBayerPattern(self):
+        """ Get Bayer pattern of color camera or None for mono camera (see
+        :func:`bayer.bayerPattern`) """
+        return bayerPattern(self.nodes.get('PixelFormat'))
+
+    def getPixelSize(self):
+        """ Get size of one image pixel on the sample, i.e. :attr:`pixelSize`
+        scaled by binning and decimation.
+
+        Returns:
+            float: Pixel size in stage units [mm].
+        """
+        return self.pixelSize*self.binning.get()*self.decimation.get()
+
+    def getOffset(self):
+        """ Get offset of the camera image on the sensor (see :func:`setROI`).
+
+        Returns:
+            int,int: Horizontal and vertical offset
+        """
+        if self.roi is None:
+            return 0,0
+        return self.roi[0],self.roi[1]
 
     def getDimensions(self):
         """ Get dimensions of the camera image. Can be changed by changing
-        :attr:`resolution`.
+        :attr:`resolution`, :attr:`binning` and :attr:`decimation`.
 
         Returns:
             int,int: Width and height of image
         """
-        return self.cam.Width.GetValue(),self.cam.Height.GetValue()
+        w,h = self.nodes.get('Width'),self.nodes.get('Height')
+        w,h = w//self.swBinning,h//self.swBinning
+        n = self.swDecimation
+        return -(-w//n),-(-h//n)
 
     def getDeviceInfo(self):
         """ Get device information """
@@ -274,6 +1400,464 @@ class Basler():
         txt += f"{al.bold('Serial number:')} {info.GetSerialNumber()}\n"
         print(txt)
 
+class DisplayLUT():
+    """
+    Lookup table mapping raw pixel values to 8-bit display values. The table
+    has one entry per possible value (4096 for 12-bit images) and is computed
+    only when settings change, so a frame is mapped by a single ``np.take``
+    without any per-pixel float math. :class:`Thread` applies it to the
+    decimated preview, full frames keep their bit depth for saving and
+    recording.
+
+    Level and window are fractions of the full scale: values below
+    ``level-window/2`` are black, values above ``level+window/2`` are white
+    and values in between are mapped by ``x**(1/gamma)``.
+
+    Args:
+        level (float): Center of the window. Defaults to 0.5.
+        window (float): Width of the window. Defaults to 1.
+        gamma (float): Gamma. Defaults to 1.
+    """
+
+    def __init__(self,level=0.5,window=1.0,gamma=1.0):
+        self.lock = threading.Lock()
+        self.level = level
+        self.window = window
+        self.gamma = gamma
+        self.tables = {}    # Bit depth -> table, see `table()`
+
+    def set(self,level=None,window=None,gamma=None):
+        """ Change settings, None keeps the current value """
+        with self.lock:
+            if level is not None:
+                self.level = level
+            if window is not None:
+                self.window = window
+            if gamma is not None:
+                self.gamma = gamma
+            self.tables = {}
+
+    def isIdentity(self,bitDepth):
+        """ Does the table map 8-bit values to themselves? """
+        return (bitDepth == 8 and self.level == 0.5 and self.window == 1
+            and self.gamma == 1)
+
+    def table(self,bitDepth):
+        """ Get table for images of `bitDepth` bits.
+
+        Returns:
+            :class:`np.ndarray`: ``np.uint8`` table of ``2**bitDepth``
+            entries.
+        """
+        with self.lock:
+            table = self.tables.get(bitDepth)
+            if table is None:
+                x = np.arange(2**bitDepth)/(2**bitDepth-1)
+                x = (x-self.level+self.window/2)/max(self.window,1e-6)
+                x = np.clip(x,0,1)**(1/self.gamma)
+                table = np.uint8(np.round(255*x))
+                self.tables[bitDepth] = table
+            return table
+
+    def apply(self,img,bitDepth=8):
+        """ Map `img` to 8 bits.
+
+        Args:
+            img (:class:`np.ndarray`): Image of integer type.
+            bitDepth (int): Number of significant bits of `img`. Defaults to
+                8.
+
+        Returns:
+            :class:`np.ndarray`: ``np.uint8`` image, `img` itself if it is
+            8-bit and the table is identity.
+        """
+        if img.dtype == np.uint8 and self.isIdentity(bitDepth):
+            return img
+        return np.take(self.table(bitDepth),img,mode='clip')
+
+class FrameRing():
+    """
+    Fixed-size ring of preallocated frame slots shared between the grabbing
+    :class:`Thread` (writer) and :class:`BaslerGUI` (reader).
+
+    **Latest frame wins:** The writer copies every frame into a free slot and
+    publishes it as the newest one. The reader only takes the newest frame
+    when it is ready to paint. A published frame which is overwritten before
+    it is read is dropped and counted in :attr:`dropped`. Slot held by the
+    reader is never written so at least three slots are needed.
+
+    **Dual stream:** Besides the (decimated) frame, each slot can keep
+    reference to the full frame it was made from (see :func:`write`). The full
+    frame of the slot held by the reader, i.e. the frame on screen, is
+    returned by :func:`current`. It is valid until the next :func:`read`,
+    retain it (see :class:`BufferPool`) to keep it longer.
+
+    Args:
+        size (int): Number of slots (minimum is 3). Defaults to 3.
+
+    Attributes:
+        written (int): Number of frames written to the ring.
+        dropped (int): Number of frames which were never read.
+        release (callable): Called with a full frame when its slot is
+            overwritten or reset, e.g. :func:`BufferPool.release`. Defaults
+            to None.
+    """
+
+    def __init__(self,size=3):
+        self.release = None
+        self.size = max(3,size)
+        self.slots = [None]*self.size
+        self.full = [None]*self.size    # Full frames (not copied)
+        self.meta = [None]*self.size    # Metadata of frames
+        self.lock = threading.Lock()    # Guards indices below (not the data)
+        self.latestIdx = None   # Slot with the newest unread frame
+        self.readIdx = None     # Slot held by the reader
+        self.writeIdx = 0       # Next slot to try for writing
+        self.written = 0
+        self.dropped = 0
+
+    def allocate(self,shape,dtype=np.uint8):
+        """ Preallocate all slots for frames of given shape and type. Slots are
+        also reallocated automatically by :func:`write` when the frame format
+        changes (e.g. new resolution).
+
+        Args:
+            shape (tuple): Shape of frames.
+            dtype: Data type of frames. Defaults to ``np.uint8``.
+        """
+        with self.lock:
+            self.slots = [np.empty(shape,dtype) for _ in range(self.size)]
+            self.latestIdx = None
+            self.readIdx = None
+        self.__releaseFull()
+
+    def __releaseFull(self):
+        """ Forget full frames of all slots """
+        with self.lock:
+            full,self.full = self.full,[None]*self.size
+        if self.release is not None:
+            for frame in full:
+                if frame is not None:
+                    self.release(frame)
+
+    def write(self,frame,full=None,meta=None):
+        """ Copy `frame` into a free slot and publish it as the newest frame.
+
+        Args:
+            frame (:class:`np.ndarray`): New frame.
+            full (:class:`np.ndarray`,optional): Full frame from which `frame`
+                was made. It is not copied so it must not be modified by the
+                caller afterwards. Ring takes over one hold of it (see
+                :attr:`release`).
+            meta (dict,optional): Metadata of the frame (e.g. timestamps).
+                Time of publishing is added as `publish`
+                (``time.perf_counter()``) before the reader can see the
+                frame.
+
+        Returns:
+            bool: True if there was no unread frame, i.e. the reader should be
+            notified. False if an unread frame was dropped instead.
+        """
+        with self.lock:
+            for i in range(self.size):
+                idx = (self.writeIdx+i) % self.size
+                if idx != self.latestIdx and idx != self.readIdx:
+                    break
+            self.writeIdx = (idx+1) % self.size
+
+        slot = self.slots[idx]
+        if (slot is None or slot.shape != frame.shape
+                or slot.dtype != frame.dtype):
+            slot = np.empty_like(frame)
+            self.slots[idx] = slot
+        np.copyto(slot,frame)
+        old,self.full[idx] = self.full[idx],full
+        self.meta[idx] = meta
+        if old is not None and self.release is not None:
+            self.release(old)
+
+        with self.lock:
+            if meta is not None:
+                meta['publish'] = time.perf_counter()
+            notify = self.latestIdx is None
+            if not notify:
+                self.dropped += 1
+            self.latestIdx = idx
+            self.written += 1
+        return notify
+
+    def read(self):
+        """ Take the newest unread frame. Its slot is reserved for the reader
+        until the next call of this method.
+
+        Returns:
+            :class:`np.ndarray`: Newest frame or None if there is no new frame.
+        """
+        with self.lock:
+            if self.latestIdx is None:
+                return None
+            self.readIdx = self.latestIdx
+            self.latestIdx = None
+            return self.slots[self.readIdx]
+
+    def current(self):
+        """ Get full frame of the slot held by the reader, i.e. full frame of
+        the last frame returned by :func:`read`.
+
+        Returns:
+            :class:`np.ndarray`: Full frame or None.
+        """
+        with self.lock:
+            if self.readIdx is None:
+                return None
+            return self.full[self.readIdx]
+
+    def currentMeta(self):
+        """ Get metadata of the slot held by the reader (see :func:`current`).
+
+        Returns:
+            dict: Metadata or None.
+        """
+        with self.lock:
+            if self.readIdx is None:
+                return None
+            return self.meta[self.readIdx]
+
+    def reset(self):
+        """ Forget unread frame and reset counters """
+        with self.lock:
+            self.latestIdx = None
+            self.readIdx = None
+            self.meta = [None]*self.size
+            self.written = 0
+            self.dropped = 0
+        self.__releaseFull()
+
+class LatencyStats():
+    """
+    Rolling statistics of latencies of the camera pipeline. Timestamps of
+    each frame are recorded at every stage of :data:`STAGES`:
+
+        - `exposure`: end of exposure (camera timestamp, see below),
+        - `retrieve`: image retrieved from the camera (:func:`Basler.grabImg`),
+        - `convert`: image converted (decimated) by :class:`Thread`,
+        - `publish`: image written to :class:`FrameRing`,
+        - `paint`: image painted by :func:`BaslerGUI.setImage`.
+
+    Latency of a stage is the time elapsed from the previous stage. Camera
+    clock is not synchronized with the host clock. Therefore, it is aligned
+    so the fastest frame has zero `exposure` -> `retrieve` latency, i.e. this
+    latency shows delays above the minimum transfer time.
+
+    Args:
+        size (int): Number of last frames used for statistics. Defaults to
+            1000.
+    """
+
+    STAGES = ['exposure','retrieve','convert','publish','paint']
+
+    def __init__(self,size=1000):
+        self.size = size
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """ Forget all recorded frames """
+        with self.lock:
+            self.data = np.full((self.size,len(self.STAGES)),np.nan)
+            self.idx = 0
+            self.count = 0
+            self.clockOffset = None     # Host time minus camera time
+
+    def add(self,stamps):
+        """ Record timestamps of one frame.
+
+        Args:
+            stamps (dict): Host times [s] of stages (keys of :data:`STAGES`),
+                camera time [s] for `exposure`. Missing stages are ignored.
+        """
+        row = np.array([stamps.get(key,np.nan) for key in self.STAGES],float)
+        with self.lock:
+            if not np.isnan(row[0]) and not np.isnan(row[1]):
+                offset = row[1]-row[0]
+                if self.clockOffset is None or offset < self.clockOffset:
+                    self.clockOffset = offset
+            self.data[self.idx] = row
+            self.idx = (self.idx+1) % self.size
+            self.count = min(self.count+1,self.size)
+
+    def latencies(self):
+        """ Get latencies of recorded frames.
+
+        Returns:
+            :class:`np.ndarray`: Latencies [ms] of shape (frames, stages-1),
+            columns correspond to :data:`STAGES` without the first one.
+        """
+        with self.lock:
+            data = self.data[:self.count].copy()
+            if self.count == self.size:     # Oldest frame first
+                data = np.roll(data,-self.idx,axis=0)
+            offset = self.clockOffset
+        data[:,0] += np.nan if offset is None else offset
+        return 1000*np.diff(data,axis=1)
+
+    def percentiles(self,q=(50,95,99)):
+        """ Get percentiles of latencies of each stage.
+
+        Args:
+            q (tuple): Percentiles. Defaults to (50,95,99).
+
+        Returns:
+            dict: Stage -> list of percentiles [ms] (nan if not available).
+            Key `total` holds latencies from `exposure` to `paint`.
+        """
+        lat = self.latencies()
+        if len(lat) == 0:
+            lat = np.full((1,len(self.STAGES)-1),np.nan)
+        lat = np.column_stack([lat,lat.sum(axis=1)])
+        keys = self.STAGES[1:] + ['total']
+        result = {}
+        for i,key in enumerate(keys):
+            col = lat[:,i]
+            col = col[~np.isnan(col)]
+            result[key] = (list(np.percentile(col,q)) if len(col)
+                else [np.nan]*len(q))
+        return result
+
+    def summary(self):
+        """ Get text table of :func:`percentiles` """
+        txt = f"{'stage':<9}{'p50':>8}{'p95':>8}{'p99':>8}  [ms]\n"
+        for key,values in self.percentiles().items():
+            txt += f"{key:<9}" + "".join(f"{v:8.2f}" for v in values) + "\n"
+        return txt.rstrip()
+
+    def toCSV(self,fullname):
+        """ Save latencies of all recorded frames to a ``.csv`` file.
+
+        Args:
+            fullname (str): Full name of the file.
+        """
+        header = ','.join(self.STAGES[1:])
+        np.savetxt(fullname,self.latencies(),delimiter=',',fmt='%.3f',
+            header=header,comments='')
+
+class FrameStats():
+    """
+    Completeness and timing of the sequence of grabbed frames. Frame counter
+    of the camera (see :data:`CHUNKS`) increments with every acquired frame,
+    so a gap between counters of two consecutive grabbed frames is the
+    number of frames which were acquired but never grabbed:
+
+        - `skipped`: frames skipped on purpose by the grab strategy (e.g.
+          'latest' keeps the newest image only), reported by the grab result,
+        - `lost`: remaining missing frames, lost on the way to the host
+          (transport errors, no free buffer).
+
+    Sensor frame rate is computed from camera timestamps and frame counters
+    of the last :attr:`window` frames, i.e. missing frames are included. Grab
+    frame rate counts grabbed frames only.
+
+    Frame counter may start from the beginning when the grab session
+    restarts, so :func:`restart` must be called before. Counter going back
+    (e.g. overflow) is handled the same way.
+
+    Args:
+        window (int): Number of last frames used for frame rates. Defaults
+            to 100.
+
+    Attributes:
+        received (int): Number of grabbed frames.
+        missed (int): Number of frames missing in the sequence.
+        skipped (int): Number of frames skipped by the grab strategy.
+    """
+
+    def __init__(self,window=100):
+        self.window = window
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """ Forget all frames and zero the counters """
+        with self.lock:
+            self.received = 0
+            self.missed = 0
+            self.skipped = 0
+            self.lastId = None
+            # Last frames: (frame counter, camera time, received frames)
+            self.history = collections.deque(maxlen=self.window)
+
+    def restart(self):
+        """ Do not compare the next frame to the previous one. Counters are
+        kept. """
+        with self.lock:
+            self.lastId = None
+            self.history.clear()
+
+    def add(self,frameId,camT,skipped=0):
+        """ Record grabbed frame.
+
+        Args:
+            frameId (int): Frame counter of the camera or None if not
+                available (only `skipped` frames are counted then).
+            camT (float): Camera timestamp [s].
+            skipped (int): Number of frames skipped by the grab strategy
+                before this one. Defaults to 0.
+
+        Returns:
+            int: Number of frames missing before this one.
+        """
+        with self.lock:
+            self.received += 1
+            self.skipped += skipped
+            if frameId is None or self.lastId is None:
+                gap = skipped
+            elif frameId <= self.lastId:
+                gap = skipped
+                self.history.clear()    # Counter went back
+            else:
+                gap = frameId-self.lastId-1
+            self.missed += gap
+            self.lastId = frameId
+            sensorId = self.received+self.missed if frameId is None else frameId
+            self.history.append((sensorId,camT,self.received))
+            return gap
+
+    def lost(self):
+        """ Get number of missing frames which were not skipped """
+        return max(self.missed-self.skipped,0)
+
+    def fps(self):
+        """ Get frame rates of the last frames.
+
+        Returns:
+            (float,float): Sensor and grab frame rate [Hz], nan if not
+            available.
+        """
+        with self.lock:
+            if len(self.history) < 2:
+                return np.nan,np.nan
+            (id0,t0,n0),(id1,t1,n1) = self.history[0],self.history[-1]
+        if t1 <= t0:
+            return np.nan,np.nan
+        return (id1-id0)/(t1-t0),(n1-n0)/(t1-t0)
+
+    def stats(self):
+        """ Get counters and frame rates.
+
+        Returns:
+            dict: `received`, `missed`, `skipped` and `lost` frames, `sensorFps`
+            and `grabFps` [Hz].
+        """
+        sensorFps,grabFps = self.fps()
+        return {
+            'received':     self.received,
+            'missed':       self.missed,
+            'skipped':      self.skipped,
+            'lost':         self.lost(),
+            'sensorFps':    sensorFps,
+            'grabFps':      grabFps,
+        }
+
 class PgView(QWidget):
     """
     **Bases:** :class:`QWidget`
@@ -355,10 +1939,19 @@ class PixmapView(QWidget):
             Defaults to None.
 
     Attributes:
-        img (:class:`MyImageItem`): New image (:class:`np.ndarray`) can be set
-            using command `img.setImage(my_img)`.
+        lbl (:class:`QLabel`): Label showing the image as a pixmap.
+        overlay (:class:`QLabel`): Label shown over the image, see
+            :func:`setOverlay`.
+        resized (:class:`pyqtSignal`): Emits new width and height of the
+            window so images can be prepared in required size.
+        roiSelected (:class:`pyqtSignal`): Emits rectangle (x, y, width,
+            height) drawn by mouse over the image. Coordinates are relative to
+            the shown image, i.e. in range (0,1).
     """
 
+    resized = pyqtSignal(int,int)
+    roiSelected = pyqtSignal(float,float,float,float)
+
     # TODO: Add mouse listener
     # https://stackoverflow.com/questions/44169391/pyqt-qlabel-updating-a-pixmap-to-slow
 
@@ -371,6 +1964,19 @@ class PixmapView(QWidget):
         self.lbl.setPixmap(pixmap)
         self.lbl.setMinimumWidth(100)
         self.lbl.setMinimumHeight(100)
+        self.lbl.setAlignment(Qt.AlignCenter)
+
+        # Overlay with text (e.g. statistics), hidden by default
+        self.overlay = QLabel(self)
+        self.overlay.setStyleSheet(
+            'background-color: rgba(0,0,0,150); color: white;'
+            'font-family: monospace; padding: 4px;')
+        self.overlay.move(5,5)
+        self.overlay.hide()
+
+        # Rectangle drawn by mouse, see `mousePressEvent()`
+        self.rubberBand = QRubberBand(QRubberBand.Rectangle,self.lbl)
+        self.origin = None
 
         hbox = QHBoxLayout()
         hbox.setContentsMargins(0,0,0,0)
@@ -390,16 +1996,63 @@ class PixmapView(QWidget):
             self.setWindowTitle("Basler camera view")
         self.show()
 
+    def setOverlay(self,txt=None):
+        """ Show `txt` over the image. Overlay is hidden if `txt` is None. """
+        if txt is None:
+            self.overlay.hide()
+        else:
+            self.overlay.setText(txt)
+            self.overlay.adjustSize()
+            self.overlay.show()
+            self.overlay.raise_()
+
+    def __pixmapRect(self):
+        """ Get rectangle of the pixmap within :attr:`lbl` """
+        pxm = self.lbl.pixmap()
+        if pxm is None or pxm.isNull():
+            return None
+        rect = pxm.rect()
+        rect.moveCenter(self.lbl.rect().center())
+        return rect
+
+    def mousePressEvent(self,event):
+        """ Reimplementation of `mousePressEvent`. Left button starts drawing
+        of a rectangle. """
+        if event.button() == Qt.LeftButton:
+            self.origin = self.lbl.mapFrom(self,event.pos())
+            self.rubberBand.setGeometry(QRect(self.origin,QSize()))
+            self.rubberBand.show()
+
+    def mouseMoveEvent(self,event):
+        """ Reimplementation of `mouseMoveEvent` """
+        if self.origin is not None:
+            pos = self.lbl.mapFrom(self,event.pos())
+            self.rubberBand.setGeometry(QRect(self.origin,pos).normalized())
+
+    def mouseReleaseEvent(self,event):
+        """ Reimplementation of `mouseReleaseEvent`. Emits
+        :attr:`roiSelected`. """
+        if self.origin is None:
+            return
+        self.rubberBand.hide()
+        self.origin = None
+        pxmRect = self.__pixmapRect()
+        if pxmRect is None:
+            return
+        rect = self.rubberBand.geometry().intersected(pxmRect)
+        if rect.width() < 2 or rect.height() < 2:
+            return
+        pw,ph = pxmRect.width(),pxmRect.height()
+        self.roiSelected.emit(
+            (rect.x()-pxmRect.x())/pw,(rect.y()-pxmRect.y())/ph,
+            rect.width()/pw,rect.height()/ph)
+
     def resizeEvent(self,*_):
-        """ Reimplementation of `resizeEvent` method """
-        # TODO: Problem appears when resizing window after grabbing image.
-        pass
-        # w = self.frameGeometry().width()
-        # h = self.frameGeometry().height()
-        # self.lbl.resize(w,h)
-        # qpxm = self.lbl.pixmap()
-        # qpxm = qpxm.scaled(w,h,Qt.KeepAspectRatio)
-        # self.lbl.setPixmap(qpxm)
+        """ Reimplementation of `resizeEvent` method. Emits :attr:`resized`.
+        """
+        w = self.frameGeometry().width()
+        h = self.frameGeometry().height()
+        self.resized.emit(w,h)
 
     def closeEvent(self,*_):
         """ Reimplementation of `closeEvent` method """
@@ -412,55 +2065,256 @@ class Thread(QThread):
     **Bases:** :class:`QThread`
 
     Object used to grab images from the **Basler** camera. It is optimized to be
-    run in a separate thread. After successfull grabbing signal :attr:`newImg`
-    emits the image which is caught by :func:`Basler.setImg`. All image
-    processing should be done here to ensure smooth running.
+    run in a separate thread. Grabbed images are written to :class:`FrameRing`
+    as fast as the camera delivers them. The reader takes the newest one at its
+    own pace (see :func:`BaslerGUI.setImage`). All image processing should be
+    done here to ensure smooth running. Images are decimated to
+    :attr:`viewSize` (raw images of color cameras demosaiced in half
+    resolution, see :func:`bayer.preview`) and mapped to 8 bits by
+    :attr:`lut` before writing so the `main` thread only wraps them
+    (:func:`ndarray2qimage`) and shows them without any scaling.
+
+    **Handshake:** Camera must not be reconfigured while this thread waits
+    for an image. Therefore, changes of camera settings are passed to
+    :func:`reconfigure` and executed by this thread between two images. If the
+    camera is needed by other thread (e.g. to grab a full resolution image),
+    call :func:`pause` which returns as soon as this thread acknowledges that
+    grabbing stopped, and :func:`resume` afterwards.
 
     Args:
         basler (:class:`Basler`): Pointer to camera instance
+        ring (:class:`FrameRing`): Ring where grabbed frames are written.
         sigStop (:class:`pyqtSignal`): Signal used to stop streaming (exit while
             loop)
-        sigPause (:class:`pyqtSignal`): Signal used to pause streaming (do not
-            exit while loop but stop grabbing)
+
+    **Recording:** If :attr:`recorder` is set, every grabbed image (full
+    size, raw) is pushed to it together with metadata: host time, camera time
+    `camT`, frame counter `frameId`, number of frames missing before the
+    image `gap` (see :class:`FrameStats`), bit depth, Bayer pattern,
+    exposure time and values returned by functions in :attr:`metadata`.
+    Recording is complete if all gaps are zero and no frame was dropped by
+    the recorder.
+
+    **Consumers:** Objects in :attr:`consumers` get every grabbed image the
+    same way as the recorder (``push(img,meta)``), e.g.
+    :class:`autofocus.AutoFocus` measures sharpness of the live stream
+    instead of grabbing extra images. They are called in this thread so they
+    must return quickly. They must not modify `img`. To keep it after
+    ``push()`` returns, they must hold it by :func:`BufferPool.retain` of
+    :attr:`Basler.pool` and release it when done (e.g.
+    :class:`tilescan.TileScan`).
+
+    **Watchdog:** If :data:`STALL_GRABS` grabs in a row fail (each waits
+    at most :func:`Basler.grabTimeout`), acquisition is considered stalled,
+    :attr:`stalled` emits and the camera is reopened by
+    :func:`Basler.reconnect`. :attr:`recovered` emits recovery time on
+    success, otherwise the camera is disconnected and this thread stops.
 
     Attributes:
-        newImg (:class:`pyqtSignal`): Emits :class:`QPixmap` after successfull
-            grabbing.
+        viewSize ((int,int)): Width and height of the view. Set by
+            :class:`BaslerGUI` when the view is resized.
+        recorder (:class:`recorder.Recorder`): Recorder of the video or None.
+        metadata (dict): Functions (without arguments) returning values which
+            are recorded with each image, e.g. stage positions.
+        lut (:class:`DisplayLUT`): Lookup table applied to the preview or
+            None (8-bit images only).
+        consumers (list): Objects with method ``push(img,meta)`` called with
+            every grabbed image, see Consumers above.
+        reconfigured (:class:`pyqtSignal`): Emits after a function passed to
+            :func:`reconfigure` is executed.
+        stalled (:class:`pyqtSignal`): Emits when stalled acquisition is
+            detected, i.e. before reconnecting.
+        recovered (:class:`pyqtSignal`): Emits recovery time [s] after
+            successful reconnection.
     """
 
-    newImg = pyqtSignal(QPixmap)
+    reconfigured = pyqtSignal()
+    stalled = pyqtSignal()
+    recovered = pyqtSignal(float)
 
-    def __init__(self,*args,basler=None,sigStop=None,sigPause=None):
+    def __init__(self,*args,basler=None,ring=None,sigStop=None):
 
         super().__init__(*args)
 
         self.Basler = basler
+        self.ring = ring
+        self.viewSize = (400,400)
+        self.recorder = None
+        self.metadata = {}
+        self.lut = None
+        self.consumers = []
         self.streaming = True
-        self.pause = False
+        self.requests = queue.Queue()           # See `reconfigure()`
+        self.pauseRequest = threading.Event()   # Set by `pause()`
+        self.pauseAck = threading.Event()       # Set by this thread if paused
+        self.resumed = threading.Event()        # Set by `resume()`
+        self.pauseLock = threading.Lock()       # Guards the three above
         sigStop.connect(self.stopStreaming)
-        sigPause.connect(self.togglePause)
-
-    def togglePause(self):
-        self.pause = not self.pause
 
     def stopStreaming(self):
         self.streaming = False
+        self.resumed.set()
+
+    def pause(self,timeout=1.0):
+        """ Pause grabbing and wait until this thread acknowledges it.
+
+        Args:
+            timeout (float): Maximum waiting time in seconds. Defaults to 1.
+
+        Returns:
+            bool: True if paused, False if the thread did not respond in time.
+        """
+        if not self.isRunning():
+            return True
+        with self.pauseLock:
+            self.resumed.clear()
+            self.pauseRequest.set()
+        return self.pauseAck.wait(timeout)
+
+    def resume(self):
+        """ Resume grabbing paused by :func:`pause` """
+        with self.pauseLock:
+            # Clear the acknowledgement too, otherwise `pause()` called
+            # before this thread leaves the paused state would return at once
+            self.pauseRequest.clear()
+            self.pauseAck.clear()
+            self.resumed.set()
+
+    def reconfigure(self,fn):
+        """ Execute `fn` in this thread between two images. This function
+        does not block, :attr:`reconfigured` emits when `fn` is done.
+
+        Args:
+            fn: Function without arguments, e.g. ``lambda:
+                basler.resolution.set(50)``.
+
+        Returns:
+            :class:`threading.Event`: Set when `fn` is done. Use its
+            ``wait(timeout)`` method for bounded waiting.
+        """
+        done = threading.Event()
+        self.requests.put((fn,done))
+        return done
+
+    def metaFields(self):
+        """ Get names of metadata passed with each image (see Recording
+        above) """
+        return (['time','camT','frameId','gap','bitDepth','bayer','exposure']
+            + list(self.metadata))
+
+    def __meta(self,info):
+        """ Collect metadata of the current image, `info` is
+        :attr:`Basler.frameInfo` """
+        exposure = info.get('exposure')
+        meta = {
+            'time':     time.time(),
+            'camT':     info.get('camT'),
+            'frameId':  info.get('frameId'),
+            'gap':      info.get('gap',0),
+            'bitDepth': info.get('bitDepth',8),
+            'bayer':    info.get('bayer') or '',
+            'exposure': self.Basler.exposureT.get() if exposure is None
+                else exposure,
+        }
+        for key,fn in self.metadata.items():
+            try:
+                meta[key] = fn()
+            except Exception:
+                meta[key] = None
+        return meta
+
+    def __handleRequests(self):
+        """ Execute functions passed to :func:`reconfigure` """
+        while True:
+            try:
+                fn,done = self.requests.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                fn()
+            except Exception as ex:
+                al.printException(ex)
+            finally:
+                done.set()
+                self.reconfigured.emit()
+
+    def __recover(self):
+        """ Reconnect stalled camera, see Watchdog above """
+        self.stalled.emit()
+        recoveryT = self.Basler.reconnect()
+        if recoveryT is None:
+            self.streaming = False
+        else:
+            self.recovered.emit(recoveryT)
 
     def run(self):
-        """ Reimplementation of :func:`run`. It grabs images calling
-        :func:`Basler.grabImg` and emits :attr:`newImg`. """
+        """ Reimplementation of :func:`run`. It starts persistent grab session
+        (:func:`Basler.startGrabbing`), grabs images calling
+        :func:`Basler.grabImg` and writes them to :attr:`ring`. Requests of
+        :func:`reconfigure` and :func:`pause` are handled between images. """
 
-        # self.Basler.grabVideoInit()
+        self.Basler.startGrabbing()
+        failed = 0      # Number of failed grabs in a row
         while self.streaming:
-            if not self.pause:
-                img = self.Basler.grabImg()
-                # img = self.Basler.grabVideo()
-                if img is not None:
-                    
-                    qpxm = ndarray2qpixmap(img) # Convert data
-                    self.newImg.emit(qpxm)
-                    
-        self.Basler.cam.StopGrabbing()
+            self.__handleRequests()
+            if self.pauseRequest.is_set():
+                # Release the camera and acknowledge pause. Acknowledgement
+                # is set only in the paused state, atomically with the check
+                # of the request (`resume()` clears both).
+                self.Basler.stopGrabbing()
+                while self.streaming:
+                    with self.pauseLock:
+                        if not self.pauseRequest.is_set():
+                            break
+                        self.pauseAck.set()
+                    self.resumed.wait(0.1)
+                    self.__handleRequests()
+                if self.streaming:
+                    self.Basler.startGrabbing()
+                continue
+            img = self.Basler.grabImg(pooled=True)
+            if img is None:
+                failed += 1
+                if failed >= STALL_GRABS and self.streaming:
+                    self.__recover()
+                    failed = 0
+            else:
+                failed = 0
+                try:
+                    self.__process(img)
+                finally:
+                    self.Basler.pool.release(img)
+
+        self.__handleRequests()
+        self.Basler.stopGrabbing()
+
+    def __process(self,img):
+        """ Pass grabbed `img` to the recorder, consumers and the ring. Each
+        of the recorder and the ring holds it (see :class:`BufferPool`). """
+        pool = self.Basler.pool
+        info = self.Basler.frameInfo
+        consumers = tuple(self.consumers)
+        if self.recorder is not None or consumers:
+            meta = self.__meta(info)
+            if self.recorder is not None:
+                self.recorder.push(pool.retain(img),meta)
+            for consumer in consumers:
+                try:
+                    consumer.push(img,meta)
+                except Exception as ex:
+                    al.printException(ex)
+        if info.get('bayer'):
+            preview = bayerPreview(img,info['bayer'],*self.viewSize)
+        else:
+            preview = decimate(img,*self.viewSize)
+        if self.lut is not None:
+            preview = self.lut.apply(preview,info.get('bitDepth',8))
+        stamps = {
+            'exposure': info.get('camT',np.nan),
+            'retrieve': info.get('retrieveT',np.nan),
+            'convert':  time.perf_counter(),
+        }
+        self.ring.write(preview,full=pool.retain(img),meta=stamps)
 
 class SaveSettings(QMainWindow):
     """ Window for setting option of saving image """
@@ -473,6 +2327,9 @@ class SaveSettings(QMainWindow):
         self.counter = 0
         self.filename_core = 'image'
         self.ext = '.png'
+        self.recExt = '.npy'    # Extension of recorded video chunks
+        self.recColor = False   # Demosaic recorded frames of color cameras
+        self.compression = 6    # Compression level of saved images (0-9)
         self.filename = None    # (initiated below)
         self.fullname = None    # (initiated below)
 
@@ -517,6 +2374,29 @@ class SaveSettings(QMainWindow):
         lblRes = QLabel('Resolution:')
         lblrrr = QLabel('Full (mám to vůbec měnit?)')
 
+        lblCmp = QLabel('Compression:')
+        self.cmbCmp = QComboBox()
+        self.cmbCmp.addItems([str(n) for n in range(10)])
+        self.cmbCmp.setCurrentIndex(self.compression)
+        self.cmbCmp.setToolTip('0: fastest, 9: smallest file')
+        self.cmbCmp.activated[int].connect(self.__cmbCmpChanged)
+
+        lblRec = QLabel('Record format:')
+        self.cmbRec = QComboBox()
+        recExtensions = ['.npy','.raw','.tiff']
+        self.cmbRec.addItems(recExtensions)
+        self.cmbRec.setCurrentIndex(recExtensions.index(self.recExt))
+        self.cmbRec.setToolTip('Video is saved in chunks of this format')
+        self.cmbRec.activated[str].connect(self.__cmbRecChanged)
+
+        lblRecColor = QLabel('Record color:')
+        chbRecColor = QCheckBox()
+        chbRecColor.setChecked(self.recColor)
+        chbRecColor.setToolTip('Demosaic frames of color cameras while '
+            'recording (slow, frames may be dropped). Raw frames are '
+            'recorded otherwise.')
+        chbRecColor.toggled.connect(self.__chbRecColorToggled)
+
         grid.addWidget(lblDir,0,0)
         grid.addWidget(self.btnDir,0,1)
         grid.addWidget(lblAInc,1,0)
@@ -529,6 +2409,12 @@ class SaveSettings(QMainWindow):
         grid.addWidget(self.qleFileName,4,1)
         grid.addWidget(lblRes,5,0)
         grid.addWidget(lblrrr,5,1)
+        grid.addWidget(lblCmp,6,0)
+        grid.addWidget(self.cmbCmp,6,1)
+        grid.addWidget(lblRec,7,0)
+        grid.addWidget(self.cmbRec,7,1)
+        grid.addWidget(lblRecColor,8,0)
+        grid.addWidget(chbRecColor,8,1)
 
         self.btnDone = QPushButton('Done')
         self.btnDone.setIcon(al.standardIcon('SP_DialogApplyButton'))
@@ -623,6 +2509,15 @@ class SaveSettings(QMainWindow):
         self.ext = ext
         self.composeFilenames()
 
+    def __cmbRecChanged(self,ext):
+        self.recExt = ext
+
+    def __chbRecColorToggled(self,checked):
+        self.recColor = checked
+
+    def __cmbCmpChanged(self,compression):
+        self.compression = compression
+
 class BaslerGUI(QWidget):
     """
     **Bases:** :class:`QWidget`
@@ -634,20 +2529,29 @@ class BaslerGUI(QWidget):
 
     PyQt5 does not support interference to the GUI from any other but the `main`
     thread. Therefore, video (grab&display) cannot fully run in a separate
-    thread. Instead, signal (:attr:`Thread.newImg`) from the separate thread
-    (:class:`Thread`) emits pointer to grabbed image which is then displayed in
-    the `main` thread (via :func:`setImg`).
+    thread. Instead, the separate thread (:class:`Thread`) writes grabbed
+    images to :attr:`ring` and :attr:`displayTimer` periodically displays the
+    newest one in the `main` thread (via :func:`setImage`). Painting rate is
+    limited to :data:`DISPLAY_RATE` (see :func:`setDisplayRate`) so
+    acquisition runs at full speed while the GUI stays responsive. Frames
+    which are not displayed are dropped instead of being queued.
 
     Flow of the application is limitted only by the speed of plotting which
     **must** be done in the main thread. See also `this
     <https://groups.google.com/g/pyqtgraph/c/FSjIaxYfYKQ>`_ for possible speed
     up.
 
+    **Dual stream:** If checked, camera runs at full resolution. Decimated
+    frames are shown in :attr:`viewWindow` while full frames go to the
+    recorder and :func:`saveImg` which saves exactly the frame on screen
+    without any reconfiguration of the camera.
+
     **Resolution:**
 
-    In order to prevent exceptions during Basler resolution changes, streaming
-    must be paused first (:attr:`signals_sig2` emits), then change
-    :attr:`Basler.resolution` and continue streaming.
+    In order to prevent exceptions during Basler resolution changes, new
+    settings are passed to :func:`Thread.reconfigure` while streaming. Moves of
+    the resolution slider are coalesced by :attr:`resTimer` so the camera is
+    reconfigured only once the slider settles.
 
     Args:
         parentCloseSignal (:class:`pyqtSignal`,optional): This signal is connected to
@@ -655,26 +2559,54 @@ class BaslerGUI(QWidget):
         messageSignal (:class:`pyqtSignal`,optional): Handle of signal which is connected to
             :func:`BaslerMainWindow.messageCallback` so any message emitted by this
             signal can be shown in the statusbar. Defaults to None.
+        backend (str): Camera backend, see :class:`Basler`. Defaults to
+            'pylon'.
 
     Attributes:
         viewWindow: Instance of :class:`PgView`. This is a separate window
             which shows grabbed images.
+        ring (:class:`FrameRing`): Frames grabbed by :class:`Thread`.
+        displayTimer (:class:`QTimer`): Connected to :func:`setImage` while
+            streaming.
+        imageSaver (:class:`recorder.ImageSaver`): Saves images grabbed by
+            :func:`saveImg`.
+        recorder (:class:`recorder.Recorder`): Recorder of the video stream,
+            see :func:`startRecording`.
+        metadata (dict): Functions (without arguments) returning values which
+            are recorded with each frame, e.g. ``{'X': motorX.EPOS.get}``.
+        consumers (list): Objects getting every grabbed image while
+            streaming, see :attr:`Thread.consumers`. The list is shared with
+            the running thread so consumers can be added at any time.
+        latency (:class:`LatencyStats`): Latencies of displayed frames.
+        lut (:class:`DisplayLUT`): Maps images to 8 bits for display (level,
+            window and gamma set by `sldLevel`, `sldWindow` and `cmbGamma`).
+        resTimer (:class:`QTimer`): Single shot timer restarted by every move
+            of the resolution slider. Resolution is set after timeout.
         signals_sig1: Emit implies stop of :class:`Thread`
-        signals_sig2: Emit toggle pause of :class:`Thread`
+        threadpool (:class:`QThreadPool`): Runs discovery and connection of
+            the camera, see :func:`connectCamera`.
+        devicesFound (:class:`pyqtSignal`): Emits list of cameras found by
+            :func:`Basler.discover`.
 
     **Steps:**
 
         1.  Init Basler camera (:class:`Basler`)
         2.  Create GUI (buttons etc.)
+        3.  Discover and connect camera in the background
+            (:func:`connectCamera`)
     """
 
+    devicesFound = pyqtSignal(list)
+
     # TODO: Update slider values within init according to camera default
     # $ settings.
 
-    def __init__(self,parentCloseSignal=None,messageSignal=None):
+    def __init__(self,parentCloseSignal=None,messageSignal=None,
+                 backend='pylon'):
         super().__init__()
 
         self.streaming = False
+        self.connecting = False     # See `connectCamera()`
         self.layout = None
 
         if parentCloseSignal is not None:
@@ -682,8 +2614,22 @@ class BaslerGUI(QWidget):
 
         self.messageSignal = messageSignal
 
-        self.lastT = 0      # Measure streaming fps
-        self.fps = None     # Measure streaming fps
+        self.lastT = 0      # Measure display fps
+        self.fps = None     # Measure display fps
+        self.titleT = 0     # Last update of the view title
+        self.titleN = 0     # Number of frames written to ring at `titleT`
+
+        self.ring = FrameRing() # Frames passed from `Thread` to `setImage()`
+        self.th = None          # Grabbing thread, see `startStream()`
+        self.recorder = None    # See `startRecording()`
+        self.latency = LatencyStats()
+        self.lut = DisplayLUT()
+        self.metadata = {}      # Recorded with each frame
+        self.consumers = []     # Get each grabbed frame, see `Thread`
+
+        self.displayTimer = QTimer()
+        self.displayTimer.timeout.connect(self.setImage)
+        self.setDisplayRate(DISPLAY_RATE)
 
         self.signals = al.Signals()
 
@@ -691,11 +2637,35 @@ class BaslerGUI(QWidget):
         self.saveSettings.hide()
         self.saveSettings.signals.message.connect(self.__newFilenameSigCallback)
 
-        # Initiate Basler camera -----------------------------------------------
+        # Images are encoded and written in other processes
+        self.imageSaver = ImageSaver()
+        self.imageSaver.saved.connect(self.__imageSaved)
+        self.imageSaver.failed.connect(self.__imageSaveFailed)
+
+        # Initiate Basler camera (connected in background, see below) --------
         self.Basler = Basler(
             connectionSignal=self.signals.connection,
-            messageSignal= self.messageSignal)
+            messageSignal= self.messageSignal,
+            backend=backend,
+            autoConnect=False)
         self.signals.connection.connect(self.__toggleConnection)
+        # Full frames of the stream are held while kept (see `BufferPool`)
+        self.ring.release = self.Basler.pool.release
+        self.imageSaver.release = self.Basler.pool.release
+        self.threadpool = QThreadPool()
+        self.devicesFound.connect(self.__devicesFound)
+
+        # Camera selection -----------------------------------------------------
+        self.cmbDevice = QComboBox()
+        self.cmbDevice.setToolTip('Select camera')
+        self.cmbDevice.activated[int].connect(self.__cmbDeviceChanged)
+        self.btnDiscover = QPushButton('',self)
+        self.btnDiscover.setObjectName('btn_discover')
+        self.btnDiscover.setMaximumWidth(30)
+        self.btnDiscover.setStatusTip('Search for cameras')
+        self.btnDiscover.setCursor(Qt.PointingHandCursor)
+        self.btnDiscover.setIcon(al.standardIcon('SP_BrowserReload'))
+        self.btnDiscover.clicked.connect(self.__btnClicked)
 
         # Buttons --------------------------------------------------------------
         self.btnConnect      = QPushButton('Connect',self)
@@ -704,6 +2674,13 @@ class BaslerGUI(QWidget):
         self.btnSaveImg      = QPushButton('Save'   ,self)
         self.btnSaveSettings = QPushButton(''       ,self)
         self.btnSaveSettings.setMaximumWidth(30)
+        self.btnRecord       = QPushButton('Record' ,self)
+        self.btnRecord.setObjectName('btn_record')
+        self.btnRecord.setStatusTip('Record video to the save directory')
+        self.btnRecord.setCursor(Qt.PointingHandCursor)
+        self.btnRecord.setIcon(qta.icon('fa.circle',color='red'))
+        self.btnRecord.setCheckable(True)
+        self.btnRecord.clicked.connect(self.__btnClicked)
 
         self.btnConnect.setObjectName('btn_connect')
         self.btnGrabImg.setObjectName('btn_grab')
@@ -759,6 +2736,15 @@ class BaslerGUI(QWidget):
         self.sldRes.valueChanged.connect(self.__sldResValueChanged)
         self.sldRes.setMinimum(0)
         self.sldRes.setMaximum(100)
+        # Coalesce slider moves, see `__sldResValueChanged()`
+        self.resTimer = QTimer()
+        self.resTimer.setSingleShot(True)
+        self.resTimer.setInterval(200)
+        self.resTimer.timeout.connect(self.__setResolution)
+
+        hbox0 = QHBoxLayout()
+        hbox0.addWidget(self.cmbDevice,1)
+        hbox0.addWidget(self.btnDiscover)
 
         hbox1 = QHBoxLayout()
         hbox1.addWidget(self.btnConnect)
@@ -768,20 +2754,114 @@ class BaslerGUI(QWidget):
         hbox2 = QHBoxLayout()
         hbox2.addWidget(self.btnSaveImg)
         hbox2.addWidget(self.btnSaveSettings)
+        hbox2.addWidget(self.btnRecord)
 
         hbox3 = QHBoxLayout()
         hbox3.addWidget(self.lblExp)
         hbox3.addWidget(self.sldExp)
 
+        # Area of interest: drawn by mouse in `viewWindow`
+        self.chbROI = QCheckBox('ROI',self)
+        self.chbROI.setToolTip('Draw area of interest in the camera view')
+        self.chbROI.setCursor(Qt.PointingHandCursor)
+        self.chbROI.toggled.connect(self.__chbROIToggled)
+
+        # Dual stream: full resolution to save/record, decimated to display
+        self.chbDual = QCheckBox('Full',self)
+        self.chbDual.setToolTip('Grab full resolution, display decimated '
+            'preview and save the frame on screen')
+        self.chbDual.setCursor(Qt.PointingHandCursor)
+        self.chbDual.toggled.connect(self.__chbDualToggled)
+
         hbox4 = QHBoxLayout()
         hbox4.addWidget(self.lblRes)
         hbox4.addWidget(self.sldRes)
+        hbox4.addWidget(self.chbROI)
+        hbox4.addWidget(self.chbDual)
+
+        # Binning and decimation -----------------------------------------------
+        factors = ['1','2','3','4']
+        lblBin = QLabel('Binning:')
+        self.cmbBin = QComboBox()
+        self.cmbBin.addItems(factors)
+        self.cmbBin.setToolTip('Combine NxN pixels (higher fps, lower noise)')
+        self.cmbBin.activated[str].connect(self.__cmbBinChanged)
+        lblDec = QLabel('Decimation:')
+        self.cmbDec = QComboBox()
+        self.cmbDec.addItems(factors)
+        self.cmbDec.setToolTip('Read every N-th pixel only (higher fps)')
+        self.cmbDec.activated[str].connect(self.__cmbDecChanged)
+
+        hbox5 = QHBoxLayout()
+        hbox5.addWidget(lblBin)
+        hbox5.addWidget(self.cmbBin)
+        hbox5.addWidget(lblDec)
+        hbox5.addWidget(self.cmbDec)
+
+        # Pixel format and display ---------------------------------------------
+        lblFmt = QLabel('Format:')
+        self.cmbFmt = QComboBox()
+        self.cmbFmt.setToolTip('Pixel format (bit depth) of the camera')
+        self.cmbFmt.activated[str].connect(self.__cmbFmtChanged)
+        lblGamma = QLabel('Gamma:')
+        self.cmbGamma = QComboBox()
+        self.cmbGamma.addItems(['0.5','0.7','1.0','1.5','2.2'])
+        self.cmbGamma.setCurrentText('1.0')
+        self.cmbGamma.setToolTip('Gamma of the displayed image')
+        self.cmbGamma.activated[str].connect(self.__cmbGammaChanged)
+
+        hbox7 = QHBoxLayout()
+        hbox7.addWidget(lblFmt)
+        hbox7.addWidget(self.cmbFmt)
+        hbox7.addWidget(lblGamma)
+        hbox7.addWidget(self.cmbGamma)
+
+        # Display window: `sldLevel` is center, `sldWindow` width [%]
+        self.sldLevel = QSlider(Qt.Horizontal,self)
+        self.sldLevel.setCursor(Qt.PointingHandCursor)
+        self.sldLevel.setToolTip('Display level (center of the window)')
+        self.sldLevel.setRange(0,100)
+        self.sldLevel.setValue(50)
+        self.sldLevel.valueChanged.connect(self.__sldLUTValueChanged)
+        self.sldWindow = QSlider(Qt.Horizontal,self)
+        self.sldWindow.setCursor(Qt.PointingHandCursor)
+        self.sldWindow.setToolTip('Display window (range of shown values)')
+        self.sldWindow.setRange(1,100)
+        self.sldWindow.setValue(100)
+        self.sldWindow.valueChanged.connect(self.__sldLUTValueChanged)
+
+        hbox8 = QHBoxLayout()
+        hbox8.addWidget(QLabel('Level'))
+        hbox8.addWidget(self.sldLevel)
+        hbox8.addWidget(QLabel('Window'))
+        hbox8.addWidget(self.sldWindow)
+
+        # Latency statistics ---------------------------------------------------
+        self.chbStats = QCheckBox('Latency overlay',self)
+        self.chbStats.setToolTip('Show latencies of the camera pipeline')
+        self.chbStats.setCursor(Qt.PointingHandCursor)
+        self.chbStats.toggled.connect(self.__chbStatsToggled)
+        self.btnStats = QPushButton('Dump',self)
+        self.btnStats.setObjectName('btn_stats')
+        self.btnStats.setStatusTip('Save latencies to csv file')
+        self.btnStats.setCursor(Qt.PointingHandCursor)
+        self.btnStats.setIcon(al.standardIcon('SP_DialogSaveButton'))
+        self.btnStats.clicked.connect(self.__btnClicked)
+
+        hbox6 = QHBoxLayout()
+        hbox6.addWidget(self.chbStats)
+        hbox6.addWidget(self.btnStats)
 
         vbox = QVBoxLayout()
+        vbox.addLayout(hbox0)
         vbox.addLayout(hbox1)
         vbox.addLayout(hbox2)
         vbox.addLayout(hbox3)
         vbox.addLayout(hbox4)
+        vbox.addLayout(hbox5)
+        vbox.addLayout(hbox7)
+        vbox.addLayout(hbox8)
+        vbox.addLayout(hbox6)
         vbox.addStretch(1)
 
         self.layout = vbox
@@ -789,11 +2869,16 @@ class BaslerGUI(QWidget):
         self.setLayout(self.layout)
 
         self.viewWindow = self.__newViewWindow()
+        self.viewWindow.resized.connect(self.__viewWindowResized)
+        self.viewWindow.roiSelected.connect(self.__roiSelected)
         self.signals.closeWindow.connect(self.__viewWindowClosed)
         
         # Set states of buttons according to connection state of the camera
         self.__toggleConnection(self.Basler.connected)
 
+        # GUI is ready, camera is found and connected in the background
+        self.connectCamera(discover=True)
+
     def __newViewWindow(self):
         """ Init new :attr:`viewWindow` of :class:`PixmapView` class. """
         viewWindow = PixmapView(closeSignal=self.signals.closeWindow)
@@ -813,18 +2898,27 @@ class BaslerGUI(QWidget):
         elif sender.objectName() == 'btn_saveSettings':
             if not self.saveSettings.isVisible():
                 self.saveSettings.show()
+        elif sender.objectName() == 'btn_stats':
+            self.dumpLatency()
+        elif sender.objectName() == 'btn_discover':
+            self.discoverCameras()
+        elif sender.objectName() == 'btn_record':
+            if sender.isChecked():
+                self.startRecording()
+            else:
+                self.stopRecording()
 
     def __sldExpValueChanged(self,value):
         """ Set new exposure time if slider `sldExp` moved by user """
         if self.sldExp.hasFocus():
             # Calculate new exposure time according to slider position
-            y1 = self.Basler.cam.ExposureTime.Min   # minimum
-            y2 = self.Basler.cam.ExposureTime.Max   # maximum
+            # Minimum and maximum (cached, see `NodeCache`)
+            y1,y2,_ = self.Basler.nodes.getLimits('ExposureTime')
             # Exponential function is used to calculate exposure time
             # Lower value of base means there is more option at higher values
             base = 1.15
             y = (y2-y1)/(pow(base,100)-1)*(pow(base,value)-1)+y1
-            self.Basler.exposureT.set(y)
+            self.__setCamera(lambda: self.Basler.exposureT.set(y))
             # Generate text which appears in the exposure label
             txt = "Exposure: "
             if y<1e3:
@@ -838,17 +2932,200 @@ class BaslerGUI(QWidget):
             self.lblExp.setText(txt)
 
     def __sldResValueChanged(self,value):
-        """ Set new resolution if slider `sldRes` moved by user """
+        """ Slider `sldRes` moved by user. Resolution is set after the slider
+        settles (see :attr:`resTimer`). """
         if self.sldRes.hasFocus():
-            if self.streaming:
-                self.signals.sig2.emit()    # Pause streaming
-                time.sleep(0.1)             # Wait for thread (grab and show)
-                # TODO: Is there a better option like threadpool.waitfordone?
-            self.Basler.resolution.set(value)
+            self.lblRes.setText(f"{value}% (...)")
+            self.resTimer.start()
+
+    def __setResolution(self):
+        """ Set resolution according to `sldRes`. Called by :attr:`resTimer`.
+        """
+        value = self.sldRes.value()
+        self.__setCamera(lambda: self.Basler.resolution.set(value))
+
+    def __setCamera(self,fn):
+        """ Change camera settings by calling `fn`. While streaming, `fn` is
+        passed to :func:`Thread.reconfigure`, otherwise it is called directly.
+        """
+        if self.streaming:
+            self.th.reconfigure(fn)
+        else:
+            fn()
+            self.__cameraReconfigured()
+
+    def __cameraReconfigured(self):
+        """ Update labels after camera settings changed """
+        if self.Basler.connected:
             w,h = self.Basler.getDimensions()
-            self.lblRes.setText(f"{value}% ({w}x{h})")
-            if self.streaming:
-                self.signals.sig2.emit()    # Continue streaming
+            if self.Basler.roi is None:
+                self.lblRes.setText(
+                    f"{self.Basler.resolution.get():.0f}% ({w}x{h})")
+            else:
+                self.lblRes.setText(f"ROI ({w}x{h})")
+            self.lblRes.setToolTip(
+                f"{self.Basler.getPixelSize()*1000:.3f} um per pixel")
+
+    def __cameraStalled(self):
+        al.emitMsg(self.messageSignal,'Camera stalled, reconnecting...')
+
+    def __cameraRecovered(self,recoveryT):
+        al.emitMsg(self.messageSignal,f'Camera recovered in {recoveryT:.2f} s')
+        self.__cameraReconfigured()
+
+    def __chbStatsToggled(self,checked):
+        """ Show/hide latency overlay """
+        self.viewWindow.setOverlay(self.__overlayText() if checked else None)
+
+    def __overlayText(self):
+        """ Compose text of the overlay: latencies, buffer and frame
+        statistics """
+        buf = self.Basler.bufferStats()
+        frames = self.Basler.frameStats.stats()
+        return self.latency.summary() + (
+            "\nbuffers  {outstanding}/{size} held ({retired} retired), "
+            "{overflows} overflows, {unreleased} unreleased".format(**buf)) + (
+            "\nframes   {received} grabbed, {missed} missed ({skipped} "
+            "skipped, {lost} lost), sensor {sensorFps:.2f} fps".format(
+                **frames))
+
+    def dumpLatency(self):
+        """ Save latencies of displayed frames (see :attr:`latency`) to a
+        ``.csv`` file in the directory of :attr:`saveSettings`. """
+        fullname = os.path.join(self.saveSettings.path,
+            'latency_'+datetime.now().strftime('%Y%m%d_%H%M%S')+'.csv')
+        self.latency.toCSV(fullname)
+        al.printOK(self.latency.summary())
+        al.emitMsg(self.messageSignal,f"Latencies saved: {fullname}")
+
+    def __cmbBinChanged(self,value):
+        """ Set new binning factor """
+        self.__setCamera(lambda: self.Basler.binning.set(int(value)))
+
+    def __cmbDecChanged(self,value):
+        """ Set new decimation factor """
+        self.__setCamera(lambda: self.Basler.decimation.set(int(value)))
+
+    def __cmbFmtChanged(self,value):
+        """ Set new pixel format """
+        self.__setCamera(lambda: self.Basler.setPixelFormat(value))
+
+    def __cmbGammaChanged(self,value):
+        """ Set gamma of the display """
+        self.lut.set(gamma=float(value))
+
+    def __sldLUTValueChanged(self,*_):
+        """ Set level and window of the display """
+        self.lut.set(level=self.sldLevel.value()/100,
+            window=self.sldWindow.value()/100)
+
+    def __chbROIToggled(self,checked):
+        """ ROI mode (un)checked. Full frame is restored when unchecked. """
+        self.__enableResolution()
+        if checked:
+            al.emitMsg(self.messageSignal,'Draw ROI in the camera view')
+        elif self.Basler.roi is not None:
+            self.__setResolution()
+
+    def __chbDualToggled(self,checked):
+        """ Dual stream (un)checked. Camera is set to full resolution or the
+        resolution of `sldRes` is restored. """
+        self.__enableResolution()
+        if checked:
+            self.__setCamera(lambda: self.Basler.resolution.set(100))
+        else:
+            self.__setResolution()
+
+    def __enableResolution(self):
+        """ Enable resolution controls according to current modes """
+        connection = self.Basler.connected
+        dual = self.chbDual.isChecked()
+        roi = self.chbROI.isChecked()
+        self.sldRes.setEnabled(connection and not (dual or roi))
+        self.chbROI.setEnabled(connection and not dual)
+        self.chbDual.setEnabled(connection and not roi)
+
+    def __roiSelected(self,x,y,w,h):
+        """ Rectangle drawn in :attr:`viewWindow` (relative coordinates of the
+        shown image) is set as the area of interest of the camera. """
+        if not (self.chbROI.isChecked() and self.Basler.connected):
+            return
+        self.__setCamera(lambda: self.Basler.setViewROI(x,y,w,h))
+
+    def connectCamera(self,*_,discover=False):
+        """ Connect camera :attr:`Basler.serial` in a background thread (see
+        :attr:`threadpool`) so the GUI stays responsive. Progress is reported
+        via `messageSignal`, widgets are updated when
+        :attr:`signals_connection` emits.
+
+        Args:
+            discover (bool): Search for cameras first (see
+                :func:`discoverCameras`). Cameras are also searched if none
+                was found yet. Defaults to False.
+        """
+        if self.connecting:
+            return
+        self.__setConnecting(True)
+        discover = discover or not self.Basler.devices
+        worker = al.Worker(self.__connectTask,discover,name='Basler')
+        worker.signals.finished.connect(lambda: self.__setConnecting(False))
+        self.threadpool.start(worker)
+
+    def __connectTask(self,discover):
+        """ Discover (optionally) and connect camera. Run by a worker. """
+        if discover:
+            self.devicesFound.emit(self.Basler.discover())
+        self.Basler.connect()
+
+    def discoverCameras(self):
+        """ Search for cameras in a background thread. Found cameras are
+        listed in `cmbDevice`. """
+        if self.connecting:
+            return
+        self.__setConnecting(True)
+        worker = al.Worker(
+            lambda: self.devicesFound.emit(self.Basler.discover()),
+            name='Basler')
+        worker.signals.finished.connect(lambda: self.__setConnecting(False))
+        self.threadpool.start(worker)
+
+    def __setConnecting(self,connecting):
+        """ Disable camera selection while discovering/connecting """
+        self.connecting = connecting
+        self.btnConnect.setEnabled(not connecting)
+        self.btnDiscover.setEnabled(not connecting)
+        self.cmbDevice.setEnabled(not connecting)
+        if connecting:
+            self.btnConnect.setText('Connecting...')
+        else:
+            self.__toggleConnection(self.Basler.connected)
+
+    def __devicesFound(self,devices):
+        """ List `devices` (see :func:`Basler.discover`) in `cmbDevice` """
+        self.cmbDevice.clear()
+        for device in devices:
+            self.cmbDevice.addItem("{model} ({serial}, {interface})".format(
+                **device),device['serial'])
+        if not devices:
+            self.cmbDevice.addItem('No camera found',None)
+        self.__selectDevice()
+
+    def __selectDevice(self):
+        """ Select item of `cmbDevice` corresponding to :attr:`Basler.serial`
+        """
+        idx = self.cmbDevice.findData(self.Basler.serial)
+        if idx >= 0:
+            self.cmbDevice.setCurrentIndex(idx)
+
+    def __cmbDeviceChanged(self,index):
+        """ Camera selected by user. Connected camera is replaced. """
+        serial = self.cmbDevice.itemData(index)
+        if serial is None or serial == self.Basler.serial:
+            return
+        self.Basler.serial = serial
+        if self.Basler.connected:
+            self.Basler.disconnect()
+        self.connectCamera()
 
     def __toggleConnection(self,connection):
         """ Change appearance of widgets according to connection status """
@@ -858,6 +3135,11 @@ class BaslerGUI(QWidget):
             try:    self.btnConnect.clicked.disconnect()
             except: pass
             self.btnConnect.clicked.connect(self.Basler.disconnect)
+            self.__selectDevice()
+            self.cmbFmt.clear()
+            self.cmbFmt.addItems(self.Basler.getPixelFormats())
+            self.cmbFmt.setCurrentText(self.Basler.nodes.get('PixelFormat'))
+            self.__cameraReconfigured()
         else:
             self.stopStream()
             self.btnConnect.setText('Connect')
@@ -865,12 +3147,17 @@ class BaslerGUI(QWidget):
             # self.btnConnect.setIcon(self.style().standardIcon(getattr(QStyle,'SP_ArrowForward')))
             try:    self.btnConnect.clicked.disconnect()
             except: pass
-            self.btnConnect.clicked.connect(self.Basler.connect)
+            self.btnConnect.clicked.connect(self.connectCamera)
 
         self.btnGrabImg.setEnabled(connection)
         self.btnStream.setEnabled(connection)
         self.btnSaveImg.setEnabled(connection)
-        self.sldRes.setEnabled(connection)
+        self.btnRecord.setEnabled(connection)
+        self.sldExp.setEnabled(connection)
+        self.__enableResolution()
+        self.cmbBin.setEnabled(connection)
+        self.cmbDec.setEnabled(connection)
+        self.cmbFmt.setEnabled(connection)
 
     def __toggle_btnStream(self):
         """ Change functionality of btnStream """
@@ -889,11 +3176,22 @@ class BaslerGUI(QWidget):
             self.btnStream.clicked.connect(self.startStream)
             self.btnGrabImg.setEnabled(True)
 
+    def setDisplayRate(self,rate=None):
+        """ Set maximum rate of painting the live view.
+
+        Args:
+            rate (float,optional): Rate in Hz. Defaults to refresh rate of the
+                screen.
+        """
+        if rate is None:
+            rate = QApplication.primaryScreen().refreshRate()
+        self.displayTimer.setInterval(int(1000/rate))
+
     def startStream(self):
         """ Start streaming. This function opens separate window
-        :attr:`viewWindow` (if not opened yet) and starts new thread
-        :class:`Thread` which signal :attr:`Thread.newImg` is connected to
-        :func:`setImage`. """
+        :attr:`viewWindow` (if not opened yet), starts new thread
+        :class:`Thread` and :attr:`displayTimer` which calls :func:`setImage`.
+        """
 
         if not self.streaming:
             self.streaming = True
@@ -902,18 +3200,42 @@ class BaslerGUI(QWidget):
             if not self.viewWindow.isVisible():
                 self.viewWindow.show()
 
-            th = Thread(self,basler=self.Basler,
-                sigStop=self.signals.sig1,sigPause=self.signals.sig2)
-            th.newImg.connect(self.setImage)
-            th.start()
+            w,h = self.Basler.getDimensions()
+            vw,vh = self.__viewSize()
+            self.ring.allocate(decimate(np.empty((h,w),np.uint8),vw,vh).shape)
+            self.ring.reset()
+            self.latency.reset()
+            self.Basler.frameStats.reset()
+            self.fps = None
+            self.titleT = pg.ptime.time()
+            self.titleN = 0
+
+            self.th = Thread(self,basler=self.Basler,ring=self.ring,
+                sigStop=self.signals.sig1)
+            self.th.viewSize = (vw,vh)
+            self.th.metadata = self.metadata
+            self.th.consumers = self.consumers
+            self.th.lut = self.lut
+            self.th.reconfigured.connect(self.__cameraReconfigured)
+            self.th.stalled.connect(self.__cameraStalled)
+            self.th.recovered.connect(self.__cameraRecovered)
+            self.th.start()
+            self.displayTimer.start()
 
             al.emitMsg(self.messageSignal,'Streaming started')
 
-    @pyqtSlot(QPixmap)
-    def setImage(self,image):
-        """ Function is connected to :attr:`Thread.newImg` which emits when the
-        :class:`Thread` grabs new image. This function also calculates `fps`
-        which is displayed as a title of the :attr:`viewWindow`. """
+    @pyqtSlot()
+    def setImage(self):
+        """ Function is connected to :attr:`displayTimer`. The newest frame is
+        taken from :attr:`ring` and displayed, nothing is done if there is no
+        new frame. This function also calculates display `fps` and
+        acquisition `fps` which are displayed (together with sensor `fps` and
+        numbers of dropped and missed frames, see :class:`FrameStats`) as a
+        title of the :attr:`viewWindow`. """
+
+        image = self.ring.read()
+        if image is None:
+            return
 
         nowT = pg.ptime.time()
         dt = nowT - self.lastT
@@ -923,20 +3245,82 @@ class BaslerGUI(QWidget):
         else:
             s = np.clip(dt*3,0,1)
             self.fps = self.fps * (1-s) + (1.0/dt) * s
-        self.viewWindow.setWindowTitle(
-            "Basler camera view (%0.2f fps)"%self.fps)
 
-        w = self.viewWindow.frameGeometry().width()
-        h = self.viewWindow.frameGeometry().height()
-        image = image.scaled(w,h,Qt.KeepAspectRatio)
-        self.viewWindow.lbl.setPixmap(image)
-        # time.sleep(0.1)
+        # Image is already decimated to the view size by `Thread`
+        self.viewWindow.lbl.setPixmap(ndarray2qpixmap(image))
+
+        stamps = self.ring.currentMeta()
+        if stamps is not None:
+            self.latency.add(dict(stamps,paint=time.perf_counter()))
+
+        # Retitle twice per second only
+        if nowT - self.titleT > 0.5:
+            grabFps = (self.ring.written-self.titleN)/(nowT-self.titleT)
+            self.titleT = nowT
+            self.titleN = self.ring.written
+            frames = self.Basler.frameStats.stats()
+            title = ("Basler camera view (%0.2f fps, grab %0.2f fps, "
+                "sensor %0.2f fps, %d dropped, %d missed)"%(self.fps,grabFps,
+                frames['sensorFps'],self.ring.dropped,frames['missed']))
+            if self.recorder is not None:
+                stats = self.recorder.stats()
+                title += " REC %d frames, %d dropped"%(
+                    stats['written'],stats['dropped'])
+            self.viewWindow.setWindowTitle(title)
+            if self.chbStats.isChecked():
+                self.viewWindow.setOverlay(self.__overlayText())
+
+    def startRecording(self):
+        """ Start recording of the video stream (streaming is started if
+        needed). Frames are written by :class:`recorder.Recorder` to the
+        directory set in :attr:`saveSettings`. """
+        if self.recorder is not None:
+            return
+        self.startStream()
+        name = (self.saveSettings.filename_core + '_'
+            + datetime.now().strftime('%Y%m%d_%H%M%S'))
+        self.recorder = Recorder(self.saveSettings.path,name,
+            ext=self.saveSettings.recExt,color=self.saveSettings.recColor,
+            fields=self.th.metaFields(),release=self.Basler.pool.release)
+        self.recorder.start()
+        self.th.recorder = self.recorder
+        self.btnRecord.setChecked(True)
+        al.emitMsg(self.messageSignal,f'Recording started ({name})')
+
+    def stopRecording(self):
+        """ Stop recording. Frames waiting in the queue are still written,
+        statistics are reported when the writer finishes (see
+        :func:`recorder.Recorder.stop`). """
+        if self.recorder is None:
+            return
+        if self.th is not None:
+            self.th.recorder = None
+        recorder,self.recorder = self.recorder,None
+        recorder.stop()
+        self.btnRecord.setChecked(False)
+        worker = al.Worker(recorder.stop,wait=True,name='Recorder')
+        worker.signals.finished.connect(
+            lambda: self.__recordingFinished(recorder))
+        self.threadpool.start(worker)
+
+    def __recordingFinished(self,recorder):
+        """ Report statistics of finished `recorder` """
+        stats = recorder.stats()
+        msg = ("Recording finished ({received} frames, {written} written, "
+            "{dropped} dropped, {missed} missed, max. queue {maxQueue})"
+            .format(**stats))
+        if stats['dropped'] or stats['missed'] or \
+                stats['written'] < stats['received']-stats['dropped']:
+            al.printW("Recording is not complete!")
+        al.emitMsg(self.messageSignal,msg)
 
     def stopStream(self):
         """ Stop streaming. :attr:`signals_sig1` emits so :class:`Thread` knows
         it should stop grabbing. """
+        self.stopRecording()
         if self.streaming:
             self.streaming = False
+            self.displayTimer.stop()
             self.signals.sig1.emit()
             self.__toggle_btnStream()
             al.emitMsg(self.messageSignal,'Streaming stopped')
@@ -950,48 +3334,94 @@ class BaslerGUI(QWidget):
         if not self.viewWindow.isVisible():
             self.viewWindow.show()
 
-        qpxm = ndarray2qpixmap(self.Basler.grabImg())
-        
+        img = self.Basler.grabImg()
+        if img is None:
+            al.emitMsg(self.messageSignal,'No image grabbed!')
+            return
+        info = self.Basler.frameInfo
+        if info.get('bayer'):
+            img = bayerPreview(img,info['bayer'],*self.__viewSize())
+        else:
+            img = decimate(img,*self.__viewSize())
+        img = self.lut.apply(img,info.get('bitDepth',8))
+        self.viewWindow.lbl.setPixmap(ndarray2qpixmap(img))
+
+    def __viewSize(self):
+        """ Get width and height of :attr:`viewWindow` """
         w = self.viewWindow.frameGeometry().width()
         h = self.viewWindow.frameGeometry().height()
-        qpxm = qpxm.scaled(w,h,Qt.KeepAspectRatio)
-        self.viewWindow.lbl.setPixmap(qpxm)
+        return w,h
+
+    def __viewWindowResized(self,w,h):
+        """ Pass new size of :attr:`viewWindow` to the grabbing thread """
+        if self.th is not None:
+            self.th.viewSize = (w,h)
 
     def saveImg(self):
-        """ Grab new image and save """
+        """ Grab new image and save. Image is encoded and written by
+        :attr:`imageSaver` in the background according to
+        :attr:`saveSettings`. In the dual stream mode, the full frame of the
+        image on screen is saved. Images of more than 8 bits are saved as
+        16-bit, raw images of color cameras are demosaiced in full
+        resolution (see :func:`recorder.encodeImage`). """
+
+        if self.streaming and self.chbDual.isChecked():
+            data = self.ring.current()      # Frame on screen
+            if data is None:
+                al.emitMsg(self.messageSignal,'No image to save!')
+                return
+            self.Basler.pool.retain(data)   # Released by `imageSaver`
+        else:
+            data = self.__grabFullImg()
+            if data is None:
+                return
+
+        # Save image (pillow library used in other process)
+        if data.dtype.kind == 'f':
+            data = data.astype(np.uint8)    # Round floats to ints in (0,255)
+        self.imageSaver.save(data,self.saveSettings.fullname,
+            compression=self.saveSettings.compression,
+            bitDepth=self.Basler.getBitDepth(),
+            bayer=self.Basler.getBayerPattern())
+
+        # Update counter
+        self.saveSettings.increaseCounter()
+
+    def __grabFullImg(self):
+        """ Pause streaming, grab image in full resolution and continue """
 
         # Pause streaming
-        if self.streaming:
-            self.signals.sig2.emit()
-            time.sleep(0.1)
+        if self.streaming and not self.th.pause():
+            al.emitMsg(self.messageSignal,'Camera busy, image not saved!')
+            self.th.resume()
+            return None
         # TODO: Apply save settings (size) here
 
         # Change resolution temporarily to 100%
         _res = self.Basler.resolution.get()
         self.Basler.resolution.set(100)
 
-        # Grab and save image (pillow library used)
+        # Grab image
         # TODO: Add exif info
 
         # data = np.random.normal(size=(100,100))*255
         data = self.Basler.grabImg()    # Grab image
-        data = data.astype(np.uint8)    # Round floats to ints in (0,255)
-        img = Image.fromarray(data)     # Format numpy array to image format
-
-        # img = img.convert('L')    # Convert to grayscale image
-        # img = img.convert('RGB')    # Convert to coloured image
-        
-        img.save(self.saveSettings.fullname)
-
-        # Update counter
-        self.saveSettings.increaseCounter()
 
         # Restore resolution
         self.Basler.resolution.set(_res)
 
         # Continue streaming
         if self.streaming:
-            self.signals.sig2.emit()    # Continue streaming
+            self.th.resume()
+
+        return data
+
+    def __imageSaved(self,fullname):
+        al.emitMsg(self.messageSignal,f"Image saved: {fullname}")
+
+    def __imageSaveFailed(self,fullname,error):
+        al.printE(f"Saving of '{fullname}' failed: {error}")
+        al.emitMsg(self.messageSignal,f"Saving of '{fullname}' failed!")
 
     def __newFilenameSigCallback(self,filename):
         if len(filename) > 20:
@@ -1004,10 +3434,12 @@ class BaslerGUI(QWidget):
 
     def __parentClose(self):
         print('BaslerGUI::__parentClose')
+        self.threadpool.waitForDone()   # Camera might be just connecting
         self.stopStream()
         self.viewWindow.hide()
         self.saveSettings.hide()
         self.Basler.disconnect()
+        self.imageSaver.shutdown()
 
 class BaslerMainWindow(QMainWindow):
     """
@@ -1015,9 +3447,14 @@ class BaslerMainWindow(QMainWindow):
 
     Main window which sets :class:`BaslerGUI` as the central widget. It uses
     statusbar and signals :class:`ablolib.Signals` in a similar way as
-    :class:`AbloMIC.MicMainWindow` does. """
+    :class:`AbloMIC.MicMainWindow` does.
 
-    def __init__(self):
+    Args:
+        backend (str): Camera backend, see :class:`Basler`. Defaults to
+            'pylon'.
+    """
+
+    def __init__(self,backend='pylon'):
         super().__init__()
 
         self.setGeometry(100,100,300,300)
@@ -1027,7 +3464,8 @@ class BaslerMainWindow(QMainWindow):
 
         self.baslerGUI = BaslerGUI(
             parentCloseSignal=self.signals.closeParent,
-            messageSignal=self.signals.message)
+            messageSignal=self.signals.message,
+            backend=backend)
         self.setCentralWidget(self.baslerGUI)
 
         self.statusbar = self.statusBar()
@@ -1048,10 +3486,12 @@ class BaslerMainWindow(QMainWindow):
 
 def main():
     """ Function used for standalone execution. It opens main window
-    :class:`BaslerMainWindow` and ensures clean exit.
+    :class:`BaslerMainWindow` and ensures clean exit. Run with argument
+    ``--synthetic`` to use simulated camera (see :mod:`synthcam`).
     """
     app = QApplication(sys.argv)
-    handle = BaslerMainWindow()
+    backend = 'synthetic' if '--synthetic' in sys.argv else 'pylon'
+    handle = BaslerMainWindow(backend=backend)
     # handle = SaveSettings()
     sys.exit(app.exec_())
 
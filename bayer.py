@@ -0,0 +1,165 @@
+"""
+Bayer
+=====
+
+Module used to process raw images of color cameras with Bayer filter. Each
+pixel of a raw image holds one color given by the 2x2 pattern of the pixel
+format, e.g. `BayerRG8`::
+
+    R G R G ...
+    G B G B ...
+
+Raw frames are grabbed and passed around as they are (1 value per pixel).
+Colors are reconstructed only where they are needed:
+
+    - :func:`preview`: half resolution demosaicing (one RGB pixel from each
+      2x2 cell) combined with decimation to the view size, used by
+      :class:`basler.Thread` for the live view,
+    - :func:`demosaic`: full resolution bilinear demosaicing used for saved
+      and recorded frames.
+
+Binning and decimation in software must keep the pattern, see
+:func:`binBayer` and :func:`decimateBayer`.
+
+All functions are vectorized, there are no loops over pixels.
+"""
+
+import numpy as np
+
+# Positions (row, column) of red and blue pixels in the 2x2 cell. Green pixels
+# are at the other two positions.
+BAYER_PATTERNS = {
+    'RG': ((0,0),(1,1)),
+    'GR': ((0,1),(1,0)),
+    'GB': ((1,0),(0,1)),
+    'BG': ((1,1),(0,0)),
+}
+
+def bayerPattern(pixelFormat):
+    """ Get Bayer pattern of `pixelFormat`.
+
+    Args:
+        pixelFormat (str): Pixel format, e.g. 'BayerRG12'.
+
+    Returns:
+        str: Key of :data:`BAYER_PATTERNS` or None for other formats.
+    """
+    if pixelFormat and pixelFormat.startswith('Bayer'):
+        pattern = pixelFormat[5:7]
+        if pattern in BAYER_PATTERNS:
+            return pattern
+    return None
+
+def preview(raw,pattern,width,height):
+    """ Demosaic `raw` in half resolution and decimate it so it fits into
+    `width` x `height`. Red and blue are taken from each (n-th) 2x2 cell,
+    green is the average of the two greens.
+
+    Args:
+        raw (:class:`np.ndarray`): Raw image.
+        pattern (str): Key of :data:`BAYER_PATTERNS`.
+        width (int): Maximum width of the result.
+        height (int): Maximum height of the result.
+
+    Returns:
+        :class:`np.ndarray`: C-contiguous RGB image of shape (h, w, 3) and
+        the type of `raw`.
+    """
+    h,w = raw.shape[0]//2,raw.shape[1]//2
+    n = max(1,int(np.ceil(max(w/max(width,1),h/max(height,1)))))
+    (ry,rx),(by,bx) = BAYER_PATTERNS[pattern]
+    s = 2*n
+    h,w = -(-h//n),-(-w//n)     # Number of cells taken
+    rgb = np.empty((h,w,3),raw.dtype)
+    rgb[...,0] = raw[ry::s,rx::s][:h,:w]
+    rgb[...,2] = raw[by::s,bx::s][:h,:w]
+    green = np.add(raw[ry::s,bx::s][:h,:w],raw[by::s,rx::s][:h,:w],
+        dtype=np.uint32)
+    green >>= 1
+    rgb[...,1] = green
+    return rgb
+
+def demosaic(raw,pattern):
+    """ Demosaic `raw` in full resolution by bilinear interpolation. Missing
+    colors of each pixel are averages of the nearest pixels of that color
+    (2 or 4 neighbors). Image is padded by mirroring so edges are
+    interpolated the same way.
+
+    Args:
+        raw (:class:`np.ndarray`): Raw image of even width and height.
+        pattern (str): Key of :data:`BAYER_PATTERNS`.
+
+    Returns:
+        :class:`np.ndarray`: RGB image of shape (h, w, 3) and the type of
+        `raw`.
+    """
+    h,w = raw.shape
+    p = np.pad(raw,1,mode='reflect').astype(np.uint32)
+
+    def px(y0,x0,dy,dx):
+        """ Neighbors (dy,dx) of pixels at (y0,x0) of all cells """
+        return p[1+y0+dy:1+y0+dy+h:2,1+x0+dx:1+x0+dx+w:2]
+
+    def cross(y0,x0):
+        return (px(y0,x0,-1,0)+px(y0,x0,1,0)+px(y0,x0,0,-1)+px(y0,x0,0,1)+2)>>2
+
+    def diagonal(y0,x0):
+        return (px(y0,x0,-1,-1)+px(y0,x0,-1,1)+px(y0,x0,1,-1)+px(y0,x0,1,1)+2)>>2
+
+    def horizontal(y0,x0):
+        return (px(y0,x0,0,-1)+px(y0,x0,0,1)+1)>>1
+
+    def vertical(y0,x0):
+        return (px(y0,x0,-1,0)+px(y0,x0,1,0)+1)>>1
+
+    (ry,rx),(by,bx) = BAYER_PATTERNS[pattern]
+    rgb = np.empty((h,w,3),raw.dtype)
+    # Red pixels
+    rgb[ry::2,rx::2,0] = raw[ry::2,rx::2]
+    rgb[ry::2,rx::2,1] = cross(ry,rx)
+    rgb[ry::2,rx::2,2] = diagonal(ry,rx)
+    # Blue pixels
+    rgb[by::2,bx::2,0] = diagonal(by,bx)
+    rgb[by::2,bx::2,1] = cross(by,bx)
+    rgb[by::2,bx::2,2] = raw[by::2,bx::2]
+    # Green pixels in red rows
+    rgb[ry::2,bx::2,0] = horizontal(ry,bx)
+    rgb[ry::2,bx::2,1] = raw[ry::2,bx::2]
+    rgb[ry::2,bx::2,2] = vertical(ry,bx)
+    # Green pixels in blue rows
+    rgb[by::2,rx::2,0] = vertical(by,rx)
+    rgb[by::2,rx::2,1] = raw[by::2,rx::2]
+    rgb[by::2,rx::2,2] = horizontal(by,rx)
+    return rgb
+
+def binBayer(raw,n):
+    """ Bin raw image by averaging pixels of the same color in `n` x `n`
+    cells, so the result is a raw image with the same pattern. Edge pixels
+    which do not fill whole cells are cropped.
+
+    Args:
+        raw (:class:`np.ndarray`): Raw image.
+        n (int): Binning factor.
+
+    Returns:
+        :class:`np.ndarray`: Binned raw image of the same type.
+    """
+    h,w = raw.shape[0]//(2*n),raw.shape[1]//(2*n)
+    cells = raw[:2*n*h,:2*n*w].reshape(h,n,2,w,n,2)
+    binned = cells.sum(axis=(1,4),dtype=np.uint32)//(n*n)
+    return binned.reshape(2*h,2*w).astype(raw.dtype)
+
+def decimateBayer(raw,n):
+    """ Decimate raw image by taking every `n`-th 2x2 cell, so the result is
+    a raw image with the same pattern.
+
+    Args:
+        raw (:class:`np.ndarray`): Raw image.
+        n (int): Decimation factor.
+
+    Returns:
+        :class:`np.ndarray`: Decimated raw image.
+    """
+    h,w = raw.shape[0]//2,raw.shape[1]//2
+    cells = raw[:2*h,:2*w].reshape(h,2,w,2)[::n,:,::n,:]
+    return cells.reshape(cells.shape[0]*2,cells.shape[2]*2)
@@ -0,0 +1,397 @@
+#!/usr/bin/python3
+
+"""
+Benchmarks of the camera pipeline
+=================================
+
+Measures throughput and latency of the camera pipeline of :mod:`basler`
+without any camera, frames are generated by the synthetic backend (see
+:mod:`synthcam`). Following stages are measured for several frame sizes, bit
+depths and display sizes:
+
+    - `grab`: :func:`basler.Basler.grabImg` within a grab session,
+    - `convert`: decimation to the view size (half resolution demosaicing of
+      raw color frames, see :func:`bayer.preview`), mapping to 8 bits by
+      :class:`basler.DisplayLUT` and :func:`basler.ndarray2qpixmap`,
+    - `demosaic`: full resolution demosaicing (:func:`bayer.demosaic`) of
+      raw color frames,
+    - `display`: :func:`basler.BaslerGUI.setImage` (incl. repaint),
+    - `stream`: whole grab -> convert -> display pipeline of
+      :class:`basler.BaslerGUI` (display and grab fps, dropped frames and
+      latencies of :class:`basler.LatencyStats`),
+    - `record`: :class:`recorder.Recorder` writing chunks to disk,
+    - `save`: :func:`recorder.encodeImage` (one image, one process).
+
+Results are printed and can be saved as a JSON baseline. Later runs are
+compared with the baseline and relative changes above the tolerance are
+reported as regressions (exit code 1).
+
+Usage::
+
+    python3 benchmarks/bench_basler.py --save benchmarks/baseline.json
+    python3 benchmarks/bench_basler.py --compare benchmarks/baseline.json
+
+Run ``python3 benchmarks/bench_basler.py -h`` for all options. Baselines are
+specific to the machine (and its screen) they were measured on, see `meta`
+in the file. ``benchmarks/baseline.json`` is a reference measured with the
+offscreen Qt platform, save your own baseline before comparing on another
+machine (see ``README.md``).
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+# Modules of the project are one directory up
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+
+import ablolib as al
+import basler
+from recorder import Recorder, encodeImage
+from synthcam import SyntheticCamera
+import bayer
+
+# Frame sizes (width, height), bit depths and display sizes of benchmarks
+SIZES = [(640,480),(1224,1024),(2448,2048)]
+DEPTHS = [8,12]
+VIEWS = [(400,400),(1280,1024)]
+
+# Formats of `record` and `save` benchmarks
+REC_FORMATS = ['.npy','.raw','.tiff']
+SAVE_FORMATS = ['.png','.tiff','.jpg']
+
+# Metrics where higher value is better, other metrics are times
+HIGHER_IS_BETTER = ['fps','MBps']
+
+def stats(times):
+    """ Summarize durations of repeated operation.
+
+    Args:
+        times (list): Durations [s].
+
+    Returns:
+        dict: Throughput `fps` and percentiles `p50_ms`, `p95_ms`, `p99_ms`.
+    """
+    ms = 1000*np.asarray(times)
+    p50,p95,p99 = np.percentile(ms,[50,95,99])
+    return {
+        'fps':      float(len(ms)/ms.sum()*1000),
+        'p50_ms':   float(p50),
+        'p95_ms':   float(p95),
+        'p99_ms':   float(p99),
+    }
+
+def makeFrames(size,depth,n=8,color=False):
+    """ Render `n` frames by the synthetic camera at different positions.
+
+    Args:
+        size ((int,int)): Width and height.
+        depth (int): Bit depth (8 or 12).
+        n (int): Number of frames. Defaults to 8.
+        color (bool): Raw frames of color camera (`BayerRG`). Defaults to
+            False.
+
+    Returns:
+        list: Frames (:class:`np.ndarray`).
+    """
+    cam = SyntheticCamera(width=size[0],height=size[1],bitDepth=depth,
+        color=color)
+    cam.ExposureTime.SetValue(cam.fullScaleExposure/2)
+    frames = []
+    for i in range(n):
+        cam.stagePosition = lambda: (0.05*i,0.03*i,cam.focusZ)
+        frames.append(cam.render())
+    return frames
+
+def newBasler(size,depth,fps=1000):
+    """ Connect :class:`basler.Basler` to the synthetic camera at full
+    resolution. """
+    signals = al.Signals()
+    cam = basler.Basler(connectionSignal=signals.connection,
+        backend='synthetic',backendOptions={
+            'width': size[0],'height': size[1],'bitDepth': depth,'fps': fps})
+    cam.signals = signals       # Keep signals alive
+    cam.resolution.set(100)
+    return cam
+
+def benchGrab(size,depth,n=100):
+    """ Retrieve `n` frames in a grab session as fast as possible """
+    cam = newBasler(size,depth)
+    cam.startGrabbing('onebyone')
+    times = []
+    for _ in range(n):
+        t = time.perf_counter()
+        cam.grabImg()
+        times.append(time.perf_counter()-t)
+    cam.stopGrabbing()
+    cam.disconnect()
+    return stats(times)
+
+def benchConvert(size,depth,view,color=False,n=200):
+    """ Decimate (`color`: demosaic in half resolution) frames to `view`,
+    map them to 8 bits and convert them to ``QPixmap`` """
+    frames = makeFrames(size,depth,color=color)
+    lut = basler.DisplayLUT()
+    times = []
+    for i in range(n):
+        t = time.perf_counter()
+        if color:
+            preview = bayer.preview(frames[i%len(frames)],'RG',*view)
+        else:
+            preview = basler.decimate(frames[i%len(frames)],*view)
+        basler.ndarray2qpixmap(lut.apply(preview,depth))
+        times.append(time.perf_counter()-t)
+    return stats(times)
+
+def benchDemosaic(size,depth,n=20):
+    """ Demosaic raw color frames in full resolution """
+    frames = makeFrames(size,depth,color=True)
+    times = []
+    for i in range(n):
+        t = time.perf_counter()
+        bayer.demosaic(frames[i%len(frames)],'RG')
+        times.append(time.perf_counter()-t)
+    return stats(times)
+
+def newGUI(app,size,depth,view):
+    """ Create :class:`basler.BaslerGUI` with the synthetic camera and view
+    window of size `view`. """
+    gui = basler.BaslerGUI(backend='synthetic')
+    while gui.connecting:       # Camera is connected in the background
+        app.processEvents()
+        time.sleep(0.01)
+    gui.Basler.disconnect()
+    gui.Basler.backendOptions = {
+        'width': size[0],'height': size[1],'bitDepth': depth,'fps': 1000}
+    gui.Basler.connect()
+    gui.Basler.resolution.set(100)
+    gui.viewWindow.show()
+    gui.viewWindow.resize(*view)
+    app.processEvents()
+    return gui
+
+def closeGUI(app,gui):
+    """ Close GUI created by :func:`newGUI` """
+    gui.stopStream()
+    if gui.th is not None:
+        gui.th.wait(5000)
+    gui.viewWindow.hide()
+    gui.saveSettings.hide()
+    gui.Basler.disconnect()
+    gui.imageSaver.shutdown()
+    gui.deleteLater()
+    app.processEvents()
+
+def benchDisplay(app,size,depth,view,n=200):
+    """ Call :func:`basler.BaslerGUI.setImage` for `n` frames written to its
+    ring. Repaint (processing of events) is included. """
+    gui = newGUI(app,size,depth,view)
+    frames = [gui.lut.apply(basler.decimate(f,*view),depth)
+        for f in makeFrames(size,depth)]
+    gui.ring.allocate(frames[0].shape,frames[0].dtype)
+    times = []
+    for i in range(n):
+        gui.ring.write(frames[i%len(frames)])
+        t = time.perf_counter()
+        gui.setImage()
+        app.processEvents()
+        times.append(time.perf_counter()-t)
+    closeGUI(app,gui)
+    return stats(times)
+
+def benchStream(app,size,depth,view,duration=3.0):
+    """ Stream for `duration` seconds and collect statistics of
+    :class:`basler.BaslerGUI`. """
+    gui = newGUI(app,size,depth,view)
+    gui.startStream()
+    t0 = time.perf_counter()
+    while time.perf_counter()-t0 < duration:
+        app.processEvents()
+        time.sleep(0.001)
+    elapsed = time.perf_counter()-t0
+    written,dropped = gui.ring.written,gui.ring.dropped
+    painted = gui.latency.count
+    lat = gui.latency.percentiles((50,95,99))
+    closeGUI(app,gui)
+    result = {
+        'grab_fps':     written/elapsed,
+        'display_fps':  painted/elapsed,
+        'dropped':      dropped/max(written,1),
+    }
+    for key in ['retrieve','convert','publish','paint','total']:
+        for q,value in zip([50,95,99],lat[key]):
+            result[f'{key}_p{q}_ms'] = float(value)
+    return result
+
+def benchRecord(size,depth,ext,n=100):
+    """ Push `n` frames to :class:`recorder.Recorder` (waiting if its queue is
+    full) and wait until all of them are written. """
+    frames = makeFrames(size,depth)
+    with tempfile.TemporaryDirectory() as path:
+        rec = Recorder(path,'bench',ext=ext,chunkSize=50)
+        rec.start()
+        t = time.perf_counter()
+        for i in range(n):
+            while rec.queue.full():
+                time.sleep(0.0005)
+            rec.push(frames[i%len(frames)],{'i': i})
+        rec.stop(wait=True)
+        elapsed = time.perf_counter()-t
+        written = rec.stats()
+    return {
+        'fps':      n/elapsed,
+        'MBps':     n*frames[0].nbytes/elapsed/1e6,
+        'write_ms': written['writeT'],
+        'dropped':  written['dropped'],
+    }
+
+def benchSave(size,depth,ext,n=10):
+    """ Encode and save `n` images by :func:`recorder.encodeImage` """
+    frames = makeFrames(size,depth)
+    times = []
+    with tempfile.TemporaryDirectory() as path:
+        for i in range(n):
+            fullname = os.path.join(path,f"bench_{i}{ext}")
+            t = time.perf_counter()
+            encodeImage(frames[i%len(frames)],fullname,bitDepth=depth)
+            times.append(time.perf_counter()-t)
+    return stats(times)
+
+def run(args):
+    """ Run selected benchmarks.
+
+    Returns:
+        dict: Benchmark name -> metrics.
+    """
+    app = QApplication.instance() or QApplication(sys.argv)
+    sizes = SIZES[:2] if args.quick else SIZES
+    results = {}
+
+    def add(name,fn,*fnArgs):
+        if args.filter and args.filter not in name:
+            return
+        try:
+            results[name] = fn(*fnArgs)
+        except Exception as ex:
+            al.printE(f"{name} failed!")
+            al.printException(ex)
+            return
+        r = results[name]
+        print(f"{name:<44}"
+            + "  ".join(f"{k}={v:.2f}" for k,v in list(r.items())[:4]))
+
+    for w,h in sizes:
+        for depth in DEPTHS:
+            frame = f"{w}x{h}/{depth}bit"
+            add(f"grab/{frame}",benchGrab,(w,h),depth)
+            for vw,vh in VIEWS:
+                view = f"view{vw}x{vh}"
+                add(f"convert/{frame}/{view}",benchConvert,(w,h),depth,(vw,vh))
+                add(f"convert/{frame}-bayer/{view}",benchConvert,(w,h),depth,
+                    (vw,vh),True)
+                add(f"display/{frame}/{view}",benchDisplay,app,(w,h),depth,
+                    (vw,vh))
+                add(f"stream/{frame}/{view}",benchStream,app,(w,h),depth,
+                    (vw,vh),args.duration)
+            add(f"demosaic/{frame}",benchDemosaic,(w,h),depth)
+            for ext in REC_FORMATS:
+                add(f"record/{frame}/{ext[1:]}",benchRecord,(w,h),depth,ext)
+            for ext in SAVE_FORMATS:
+                if depth > 8 and ext == '.jpg':
+                    continue    # JPG supports 8 bits only
+                add(f"save/{frame}/{ext[1:]}",benchSave,(w,h),depth,ext)
+    return results
+
+def compare(results,baseline,tolerance,minMs=0.2):
+    """ Compare `results` with `baseline` and print the differences.
+
+    Args:
+        results (dict): Results of :func:`run`.
+        baseline (dict): Results loaded from the baseline file.
+        tolerance (float): Relative change considered as a regression.
+        minMs (float): Changes of times smaller than this [ms] are ignored
+            (timer noise). Defaults to 0.2.
+
+    Returns:
+        list: Names of regressed metrics.
+    """
+    regressions = []
+    for name,metrics in results.items():
+        if name not in baseline:
+            continue
+        for key,value in metrics.items():
+            ref = baseline[name].get(key)
+            if ref is None or not np.isfinite(ref) or ref == 0:
+                continue
+            change = (value-ref)/abs(ref)
+            higher = any(key.endswith(k) for k in HIGHER_IS_BETTER)
+            if key == 'dropped':
+                worse = value > ref+tolerance
+            elif higher:
+                worse = -change > tolerance
+            else:
+                worse = change > tolerance and value-ref > minMs
+            if worse:
+                regressions.append(f"{name}:{key}")
+                al.printW(f"{name}:{key} {ref:.2f} -> {value:.2f} "
+                    f"({100*change:+.0f}%)")
+    return regressions
+
+def main():
+    """ Parse arguments, run benchmarks and save/compare results """
+    parser = argparse.ArgumentParser(
+        description='Benchmarks of the camera pipeline (synthetic camera)')
+    parser.add_argument('--save',metavar='JSON',
+        help='save results as a baseline')
+    parser.add_argument('--compare',metavar='JSON',
+        help='compare results with a baseline')
+    parser.add_argument('--tolerance',type=float,default=0.2,
+        help='relative change reported as a regression (default 0.2)')
+    parser.add_argument('--min-ms',type=float,default=0.2,dest='minMs',
+        help='ignore changes of times below this value [ms] (default 0.2)')
+    parser.add_argument('--filter',default='',
+        help='run benchmarks whose name contains this text only')
+    parser.add_argument('--duration',type=float,default=3.0,
+        help='duration of stream benchmarks [s] (default 3)')
+    parser.add_argument('--quick',action='store_true',
+        help='skip the largest frame size')
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = run(args)
+
+    if args.save:
+        data = {
+            'meta': {
+                'date':     datetime.now().isoformat(timespec='seconds'),
+                'platform': platform.platform(),
+                'python':   platform.python_version(),
+                'numpy':    np.__version__,
+                'screen':   app.platformName(),
+            },
+            'results': results,
+        }
+        with open(args.save,'w') as fh:
+            json.dump(data,fh,indent=2)
+        al.printOK(f"Baseline saved: {args.save}")
+
+    if args.compare:
+        with open(args.compare,'r') as fh:
+            baseline = json.load(fh)['results']
+        regressions = compare(results,baseline,args.tolerance,args.minMs)
+        if regressions:
+            al.printE(f"{len(regressions)} regression(s) found!")
+            sys.exit(1)
+        al.printOK("No regressions found.")
+
+if __name__ == "__main__":
+    main()
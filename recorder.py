@@ -0,0 +1,444 @@
+"""
+Recorder
+========
+
+Module used to record video streamed from the camera (see :mod:`basler`) to
+disk. Frames are pushed by the grabbing thread to :class:`Recorder` which
+keeps them in a bounded queue and writes them in its own background thread.
+If the disk stalls and the queue is full, new frames are dropped (and
+counted) so the acquisition is never blocked.
+
+Frames are written in chunks (files) of :attr:`Recorder.chunkSize` frames.
+Supported formats are:
+
+    - ``.npy``: NumPy array of shape (frames, height, width), can be opened by
+      ``np.load(file, mmap_mode='r')``.
+    - ``.raw``: Raw frame data without header. Shape and type are written to
+      the sidecar file.
+    - ``.tiff``: Multi-page TIFF.
+
+Metadata of each frame (timestamp, exposure time, stage positions, ...) are
+written to a sidecar ``.csv`` file with one line per frame. Columns are
+given by :attr:`Recorder.fields` and the first frame. If a frame brings new
+metadata later, the sidecar is rewritten with extended header (rare, e.g.
+when a stage is connected during recording). Metadata `gap`
+is the number of frames the camera acquired before the frame but which were
+not pushed (see :class:`basler.FrameStats`). They are summed in
+:attr:`Recorder.missed`, so the recording is complete if no frame was
+missed or dropped.
+
+Raw frames of color cameras are recorded as they are (one value per pixel),
+their Bayer pattern is in the sidecar (metadata `bayer`) so they can be
+demosaiced offline by :func:`bayer.demosaic`. Optionally (see
+:attr:`Recorder.color`), they are demosaiced by the writer thread. This is
+slow for large frames (about 80 ms for 5 Mpx), so the frame rate the
+recorder keeps up with is limited and frames are dropped at higher rates.
+
+Single images are saved by :class:`ImageSaver` which encodes them (PNG, TIFF,
+JPG) in a pool of processes so neither the GUI nor the grabbing is blocked.
+"""
+
+import os
+import csv
+import time
+import queue
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from PIL import Image, TiffImagePlugin
+
+import ablolib as al
+from bayer import demosaic
+
+# Length of the header of `.npy` chunks. Fixed length allows to rewrite the
+# header with the real number of frames when a chunk is closed.
+NPY_HEADER_LEN = 128
+
+def npyHeader(shape,dtype):
+    """ Compose header of `.npy` file (format version 1.0) padded to
+    :data:`NPY_HEADER_LEN` bytes.
+
+    Args:
+        shape (tuple): Shape of the stored array.
+        dtype: Data type of the stored array.
+
+    Returns:
+        bytes: Header.
+    """
+    header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }"%(
+        np.lib.format.dtype_to_descr(np.dtype(dtype)),tuple(shape))
+    # magic (6) + version (2) + header length (2) + header + '\n'
+    header = header.ljust(NPY_HEADER_LEN-10-1)+'\n'
+    return (b'\x93NUMPY\x01\x00'
+        + np.uint16(len(header)).tobytes() + header.encode('latin1'))
+
+def encodeImage(data,fullname,compression=6,bitDepth=None,bayer=None):
+    """ Encode image and save it. Format is given by extension of
+    `fullname`. Executed in a process of :class:`ImageSaver`.
+
+    ``np.uint16`` images are saved as 16-bit PNG or TIFF with values shifted
+    to the full 16-bit range (raw value times ``2**(16-bitDepth)``) so they
+    are displayed correctly. JPG and color images are saved in 8 bits (not
+    supported otherwise by ``PIL``), the most significant bits are saved.
+
+    Args:
+        data (:class:`np.ndarray`): Image data.
+        fullname (str): Full name of the file.
+        compression (int): Compression level from 0 (none, fastest) to 9
+            (best, slowest). For JPG, it corresponds to quality from 100 to 55.
+        bitDepth (int,optional): Number of significant bits of ``np.uint16``
+            data. Defaults to None (16).
+        bayer (str,optional): Bayer pattern of raw image of color camera,
+            which is demosaiced before saving. Defaults to None (no
+            demosaicing).
+
+    Returns:
+        str: `fullname`
+    """
+    ext = os.path.splitext(fullname)[1].lower()
+    if bayer:
+        data = demosaic(data,bayer)
+    if data.dtype == np.uint16:
+        shift = 16-(bitDepth or 16)
+        if ext in ['.jpg','.jpeg'] or data.ndim == 3:
+            data = (data >> (8-shift)).astype(np.uint8)
+        elif shift > 0:
+            data = data << shift
+    img = Image.fromarray(data)
+    if ext == '.png':
+        img.save(fullname,compress_level=compression)
+    elif ext in ['.tif','.tiff']:
+        img.save(fullname,
+            compression='tiff_adobe_deflate' if compression > 0 else None)
+    elif ext in ['.jpg','.jpeg']:
+        img.save(fullname,quality=100-5*compression)
+    else:
+        img.save(fullname)
+    return fullname
+
+class ImageSaver(QObject):
+    """
+    **Bases:** :class:`QObject`
+
+    Saves images in a pool of processes, see :func:`encodeImage`.
+
+    Args:
+        workers (int,optional): Number of processes. Defaults to number of
+            CPUs.
+
+    Attributes:
+        saved (:class:`pyqtSignal`): Emits full name of the saved file.
+        failed (:class:`pyqtSignal`): Emits full name of the file and error
+            message if saving failed.
+        pending (int): Number of images waiting for saving.
+        release (callable): Called with the image data when saving is
+            finished (the data is not needed anymore), e.g.
+            :func:`basler.BufferPool.release`. Defaults to None.
+    """
+
+    saved = pyqtSignal(str)
+    failed = pyqtSignal(str,str)
+
+    def __init__(self,workers=None):
+        super().__init__()
+        self.workers = workers
+        self.pool = None        # Created on first use
+        self.pending = 0
+        self.release = None
+
+    def save(self,data,fullname,compression=6,bitDepth=None,bayer=None):
+        """ Pass image for saving. This function returns immediately,
+        :attr:`saved` emits when the file is written.
+
+        Args:
+            data (:class:`np.ndarray`): Image data.
+            fullname (str): Full name of the file.
+            compression (int): See :func:`encodeImage`. Defaults to 6.
+            bitDepth (int,optional): See :func:`encodeImage`.
+            bayer (str,optional): See :func:`encodeImage`.
+        """
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.pending += 1
+        future = self.pool.submit(encodeImage,data,fullname,compression,
+            bitDepth,bayer)
+        future.fullname = fullname
+        future.data = data      # Pickled to the process later
+        future.add_done_callback(self.__done)
+
+    def __done(self,future):
+        """ Called (from other thread) when saving is finished """
+        self.pending -= 1
+        if self.release is not None:
+            self.release(future.data)
+        future.data = None
+        try:
+            self.saved.emit(future.result())
+        except Exception as ex:
+            al.printException(ex)
+            self.failed.emit(future.fullname,str(ex))
+
+    def shutdown(self):
+        """ Wait for pending images and stop the pool """
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
+class Chunk():
+    """
+    One file of the recording. Frames are appended by :func:`write`.
+
+    Args:
+        fullname (str): Full name of the file.
+        shape (tuple): Shape of frames.
+        dtype: Data type of frames.
+    """
+
+    def __init__(self,fullname,shape,dtype):
+        self.fullname = fullname
+        self.shape = shape
+        self.dtype = dtype
+        self.count = 0
+        self.ext = os.path.splitext(fullname)[1]
+
+        if self.ext == '.tiff':
+            self.fh = TiffImagePlugin.AppendingTiffWriter(fullname,True)
+        else:
+            self.fh = open(fullname,'wb')
+            if self.ext == '.npy':
+                self.fh.write(npyHeader((0,)+tuple(shape),dtype))
+
+    def write(self,frame):
+        """ Append `frame` to the file """
+        if self.ext == '.tiff':
+            Image.fromarray(frame).save(self.fh)
+            self.fh.newFrame()
+        else:
+            self.fh.write(memoryview(np.ascontiguousarray(frame)))
+        self.count += 1
+
+    def close(self):
+        """ Close the file. Header of `.npy` file is updated with the number
+        of written frames. """
+        if self.ext == '.npy':
+            self.fh.seek(0)
+            self.fh.write(npyHeader((self.count,)+tuple(self.shape),self.dtype))
+        self.fh.close()
+
+class Recorder():
+    """
+    Records frames pushed by :func:`push` to chunked files. Files are written
+    in a separate thread, see module description.
+
+    Args:
+        path (str): Directory where files are saved.
+        name (str): Core of file names. Chunk files are named
+            `name_00000.ext`, `name_00001.ext`, ... and the sidecar
+            `name_meta.csv`.
+        ext (str): Extension, one of '.npy', '.raw' or '.tiff'. Defaults to
+            '.npy'.
+        chunkSize (int): Maximum number of frames in one file. Defaults to
+            100.
+        queueSize (int): Maximum number of frames waiting for writing.
+            Defaults to 64.
+        color (bool): Demosaic raw frames of color cameras (metadata
+            `bayer`) before writing, see module description. Defaults to
+            False (raw frames are recorded).
+        fields (list,optional): Names of metadata known in advance, so they
+            have columns in the sidecar even if the first frame lacks them.
+            Defaults to None.
+        release (callable,optional): Called with each frame passed to
+            :func:`push` when it is not needed anymore (written or dropped),
+            e.g. :func:`basler.BufferPool.release`. Defaults to None.
+
+    Attributes:
+        received (int): Number of frames passed to :func:`push`.
+        written (int): Number of frames written to disk.
+        dropped (int): Number of frames dropped because the queue was full.
+        missed (int): Number of frames missed by the camera, sum of metadata
+            `gap` of received frames.
+        maxQueue (int): Highest number of frames waiting in the queue.
+        writeT (float): Total time spent by writing [s].
+    """
+
+    def __init__(self,path,name,ext='.npy',chunkSize=100,queueSize=64,
+                 color=False,fields=None,release=None):
+        self.path = path
+        self.name = name
+        self.ext = ext
+        self.chunkSize = chunkSize
+        self.color = color
+        self.fields = list(fields or [])
+        self.release = release
+        self.queue = queue.Queue(maxsize=queueSize)
+        self.running = False
+        self.stopping = False
+        self.thread = None
+
+        self.chunk = None       # Current chunk (see `Chunk`)
+        self.nChunks = 0        # Number of opened chunks
+        self.metaFile = None    # Sidecar file
+        self.metaWriter = None  # `csv.DictWriter` of the sidecar
+
+        self.received = 0
+        self.written = 0
+        self.dropped = 0
+        self.missed = 0
+        self.maxQueue = 0
+        self.writeT = 0
+
+    def start(self):
+        """ Start the writer thread. Frames can be pushed afterwards. """
+        os.makedirs(self.path,exist_ok=True)
+        self.running = True
+        self.stopping = False
+        self.thread = threading.Thread(target=self.__run,daemon=True)
+        self.thread.start()
+
+    def stop(self,wait=False):
+        """ Stop recording. Frames already in the queue are written.
+
+        Args:
+            wait (bool): Wait until all frames are written. Defaults to False.
+        """
+        self.running = False
+        self.stopping = True
+        if wait and self.thread is not None:
+            self.thread.join()
+
+    def isBusy(self):
+        """ Is the writer thread still running? """
+        return self.thread is not None and self.thread.is_alive()
+
+    def push(self,frame,meta=None):
+        """ Pass `frame` for writing. This function never blocks. Frame is not
+        copied so it must not be modified by the caller afterwards, it is
+        passed to :attr:`release` when written or dropped.
+
+        Args:
+            frame (:class:`np.ndarray`): Image data.
+            meta (dict,optional): Metadata written to the sidecar file.
+
+        Returns:
+            bool: True if the frame was queued, False if it was dropped.
+        """
+        if not self.running:
+            self.__release(frame)
+            return False
+        self.received += 1
+        if meta and self.received > 1:  # Recording starts by the first frame
+            self.missed += meta.get('gap') or 0
+        try:
+            self.queue.put_nowait((frame,meta or {}))
+        except queue.Full:
+            self.dropped += 1
+            self.__release(frame)
+            return False
+        self.maxQueue = max(self.maxQueue,self.queue.qsize())
+        return True
+
+    def stats(self):
+        """ Get statistics of the recording.
+
+        Returns:
+            dict: Received, written, dropped and missed frames, current and
+            highest queue length and average writing time per frame [ms].
+        """
+        return {
+            'received': self.received,
+            'written':  self.written,
+            'dropped':  self.dropped,
+            'missed':   self.missed,
+            'queue':    self.queue.qsize(),
+            'maxQueue': self.maxQueue,
+            'writeT':   1000*self.writeT/max(self.written,1),
+        }
+
+    def __run(self):
+        """ Writer thread: write frames until stopped and queue is empty """
+        try:
+            while not (self.stopping and self.queue.empty()):
+                try:
+                    frame,meta = self.queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                t = time.perf_counter()
+                try:
+                    self.__write(frame,meta)
+                finally:
+                    self.__release(frame)
+                self.writeT += time.perf_counter()-t
+        except Exception as ex:
+            al.printE("Recorder: writing failed!")
+            al.printException(ex)
+        finally:
+            self.running = False
+            while not self.queue.empty():   # Left by failed writing
+                self.__release(self.queue.get_nowait()[0])
+            if self.chunk is not None:
+                self.chunk.close()
+                self.chunk = None
+            if self.metaFile is not None:
+                self.metaFile.close()
+                self.metaFile = None
+
+    def __release(self,frame):
+        if self.release is not None:
+            self.release(frame)
+
+    def __write(self,frame,meta):
+        """ Write `frame` to the current chunk and `meta` to the sidecar """
+        if self.color and meta.get('bayer'):
+            frame = demosaic(frame,meta['bayer'])
+            if self.ext == '.tiff' and frame.dtype == np.uint16:
+                # 16-bit color is not supported by `PIL`
+                shift = meta.get('bitDepth',16)-8
+                frame = (frame >> shift).astype(np.uint8)
+
+        # New chunk if the current is full or frame format changed
+        if (self.chunk is None or self.chunk.count >= self.chunkSize
+                or self.chunk.shape != frame.shape
+                or self.chunk.dtype != frame.dtype):
+            if self.chunk is not None:
+                self.chunk.close()
+            fullname = os.path.join(self.path,
+                f"{self.name}_{str(self.nChunks).zfill(5)}{self.ext}")
+            self.chunk = Chunk(fullname,frame.shape,frame.dtype)
+            self.nChunks += 1
+
+        row = {
+            'frame': self.written,
+            'file':  os.path.basename(self.chunk.fullname),
+            'index': self.chunk.count,
+            'shape': 'x'.join(str(n) for n in frame.shape),
+            'dtype': str(frame.dtype),
+        }
+        row.update(meta)
+
+        if self.metaWriter is None:
+            self.__openMeta(list(row)+[f for f in self.fields if f not in row])
+        elif not row.keys() <= set(self.metaWriter.fieldnames):
+            self.__openMeta(self.metaWriter.fieldnames
+                +[key for key in row if key not in self.metaWriter.fieldnames])
+
+        self.chunk.write(frame)
+        self.metaWriter.writerow(row)
+        self.written += 1
+
+    def __openMeta(self,fieldnames):
+        """ Open the sidecar with columns `fieldnames`. Rows written so far
+        are rewritten under the new header. """
+        fullname = os.path.join(self.path,f"{self.name}_meta.csv")
+        rows = []
+        if self.metaFile is not None:
+            self.metaFile.close()
+            with open(fullname,newline='') as fh:
+                rows = list(csv.DictReader(fh))
+        self.metaFile = open(fullname,'w',newline='')
+        self.metaWriter = csv.DictWriter(self.metaFile,fieldnames=fieldnames,
+            restval='')
+        self.metaWriter.writeheader()
+        self.metaWriter.writerows(rows)
@@ -0,0 +1,530 @@
+"""
+Synthetic camera
+================
+
+Camera simulator which mimics the part of ``pypylon``'s ``InstantCamera`` used
+by :class:`basler.Basler`. It is used as a camera backend (see
+:data:`basler.CAMERA_BACKENDS`) so the whole acquisition, display and record
+pipeline can be run, benchmarked and tested on a machine without any camera.
+
+Run ``python3 basler.py --synthetic`` to open the Basler GUI with this camera.
+
+Frames are cut out of a synthetic sample (random blobs resembling ablation
+craters) at a position given by :attr:`SyntheticCamera.stagePosition`, so
+features move with the (simulated or real) XY stage and get blurred when the
+Z stage leaves the focal plane. Brightness is proportional to the exposure
+time, frames are delivered at :attr:`SyntheticCamera.fps` with optional
+timing jitter.
+
+Values of grab strategies and timeout handling are the same as in ``pylon``
+so both backends can be used interchangeably. Chunk data (timestamp, frame
+counter, exposure time) are attached to grab results if enabled the same way
+as on a GigE camera (`ChunkModeActive`, `ChunkSelector`, `ChunkEnable`).
+Frames lost on the way to the host can be simulated by
+:attr:`SyntheticCamera.dropRate`. Color camera (`BayerRG` pixel formats) is
+simulated by tinting the sample by :attr:`SyntheticCamera.colorGains`.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+from bayer import BAYER_PATTERNS, bayerPattern
+
+# Grab strategies (same values as `pylon.GrabStrategy_*`)
+GRAB_ONEBYONE = 0
+GRAB_LATEST = 1
+GRAB_UPCOMING = 3
+
+# Timeout handling (same values as `pylon.TimeoutHandling_*`)
+TIMEOUT_RETURN = 0
+TIMEOUT_THROW = 1
+
+# Noise bank is larger than the sensor by this number of pixels
+NOISE_MARGIN = 64
+
+# Chunks which can be enabled: selector -> node of the grab result
+CHUNKS = {
+    'Timestamp':    'ChunkTimestamp',
+    'Framecounter': 'ChunkFramecounter',
+    'ExposureTime': 'ChunkExposureTime',
+}
+
+# Serial numbers of simulated cameras, see `listDevices()`
+SERIALS = ['SYN0001','SYN0002']
+
+def listDevices():
+    """ List simulated cameras (same format as :func:`basler.pylonDevices`).
+
+    Returns:
+        list: Dictionaries with `serial`, `model`, `interface` and `name`.
+    """
+    devices = []
+    for serial in SERIALS:
+        info = DeviceInfo(serial)
+        devices.append({
+            'serial':       info.GetSerialNumber(),
+            'model':        info.GetModelName(),
+            'interface':    info.GetDeviceClass(),
+            'name':         info.GetFriendlyName(),
+        })
+    return devices
+
+def packMono12p(img):
+    """ Pack 12-bit image to `Mono12p` format: two pixels in three bytes,
+    least significant bits first (inverse of :func:`basler.unpack12`).
+
+    Args:
+        img (:class:`np.ndarray`): Image with even number of pixels.
+
+    Returns:
+        :class:`np.ndarray`: 1D ``np.uint8`` array.
+    """
+    pairs = img.reshape(-1,2)
+    out = np.empty((pairs.shape[0],3),np.uint8)
+    out[:,0] = pairs[:,0] & 0xFF
+    out[:,1] = (pairs[:,0] >> 8) | ((pairs[:,1] & 0x0F) << 4)
+    out[:,2] = pairs[:,1] >> 4
+    return out.ravel()
+
+def boxBlur(img,r):
+    """ Blur image by a (2r+1)x(2r+1) box filter. Cumulative sums are used so
+    the time does not depend on `r`.
+
+    Args:
+        img (:class:`np.ndarray`): 2D float image.
+        r (int): Radius of the filter.
+
+    Returns:
+        :class:`np.ndarray`: Blurred image of the same shape.
+    """
+    if r < 1:
+        return img
+    for axis in (0,1):
+        n = img.shape[axis]
+        pad = [(0,0),(0,0)]
+        pad[axis] = (r+1,r)
+        c = np.cumsum(np.pad(img,pad,mode='edge'),axis=axis,dtype=np.float32)
+        hi = np.take(c,np.arange(2*r+1,2*r+1+n),axis=axis)
+        lo = np.take(c,np.arange(0,n),axis=axis)
+        img = (hi-lo)/(2*r+1)
+    return img
+
+class Node():
+    """
+    Camera parameter mimicking ``genicam`` integer, float and enumeration
+    nodes.
+
+    Args:
+        value: Initial value.
+        vmin: Minimum (number or function returning number). Defaults to None.
+        vmax: Maximum (number or function returning number). Defaults to None.
+        inc: Increment. Defaults to 1.
+        writable (bool): Can be written? Defaults to True.
+        symbolics (list): Valid values of enumeration. Defaults to None.
+        onChange: Function called with new value after writing.
+    """
+
+    def __init__(self,value,vmin=None,vmax=None,inc=1,writable=True,
+                 symbolics=None,onChange=None):
+        self.value = value
+        self.vmin = vmin
+        self.vmax = vmax
+        self.inc = inc
+        self.writable = writable
+        self.symbolics = symbolics
+        self.onChange = onChange
+
+    def GetValue(self):
+        return self.value() if callable(self.value) else self.value
+
+    def SetValue(self,value):
+        if not self.writable:
+            raise PermissionError("Node is not writable!")
+        if self.symbolics is not None:
+            if value not in self.symbolics:
+                raise ValueError(f"Invalid value '{value}'!")
+        elif not self.GetMin() <= value <= self.GetMax():
+            raise ValueError(f"Value {value} out of range "
+                f"[{self.GetMin()},{self.GetMax()}]!")
+        self.value = value
+        if self.onChange is not None:
+            self.onChange(value)
+
+    def GetMin(self):
+        return self.vmin() if callable(self.vmin) else self.vmin
+
+    def GetMax(self):
+        return self.vmax() if callable(self.vmax) else self.vmax
+
+    def GetInc(self):
+        return self.inc
+
+    def GetSymbolics(self):
+        return list(self.symbolics or [])
+
+    def IsWritable(self):
+        return self.writable
+
+    Value = property(GetValue,SetValue)
+    Min = property(GetMin)
+    Max = property(GetMax)
+    Inc = property(GetInc)
+
+class DeviceInfo():
+    """ Mimics ``pylon.DeviceInfo`` """
+
+    def __init__(self,serial):
+        self.serial = serial
+
+    def GetVendorName(self):
+        return 'AbloCAM'
+
+    def GetModelName(self):
+        return 'Synthetic camera'
+
+    def GetSerialNumber(self):
+        return self.serial
+
+    def GetDeviceClass(self):
+        return 'Synthetic'
+
+    def GetFriendlyName(self):
+        return f"Synthetic camera ({self.serial})"
+
+class GrabResult():
+    """ Mimics ``pylon.GrabResult`` """
+
+    def __init__(self,array=None,timestamp=0,imageNumber=0,skipped=0,
+                 chunks=None,width=0,height=0,packed=False):
+        self.Array = array
+        self.Width = width
+        self.Height = height
+        self.packed = packed                # `Array` holds packed bytes
+        self.TimeStamp = timestamp          # [ns]
+        self.ImageNumber = imageNumber
+        self.BlockID = imageNumber
+        self.NumberOfSkippedImages = skipped
+        self.released = False
+        # Chunk nodes, e.g. `ChunkTimestamp`
+        for name,value in (chunks or {}).items():
+            setattr(self,name,Node(value,writable=False))
+
+    def GrabSucceeded(self):
+        return self.Array is not None
+
+    def IsValid(self):
+        return self.Array is not None
+
+    def GetArray(self):
+        if self.packed:
+            raise ValueError("Packed pixel format is not supported!")
+        return self.Array
+
+    @contextmanager
+    def GetArrayZeroCopy(self):
+        yield self.GetArray()
+
+    def GetBuffer(self):
+        """ Raw image data (not copied, unlike ``pylon``) """
+        return memoryview(self.Array)
+
+    def Release(self):
+        self.released = True
+
+class SyntheticCamera():
+    """
+    Simulated camera, see module description.
+
+    Args:
+        width (int): Sensor width. Defaults to 2448.
+        height (int): Sensor height. Defaults to 2048.
+        bitDepth (int): 8 (`Mono8`) or 12 (`Mono12`). Defaults to 8. Packed
+            format (`Mono12p`) can be set afterwards.
+        color (bool): Simulate color camera (`BayerRG8` or `BayerRG12`).
+            Defaults to False.
+        fps (float): Maximum frame rate. Defaults to 30.
+        jitter (float): Standard deviation of frame period [s]. Defaults to 0.
+        noise (float): Standard deviation of noise (in 8-bit levels). Defaults
+            to 2.
+        serial (str): Serial number. Defaults to 'SYN0001'.
+
+    Attributes:
+        stagePosition: Function without arguments returning stage position
+            (x, y, z) [mm]. Defaults to None (static sample in focus).
+        pixelSize (float): Size of a sensor pixel on the sample [mm].
+        focusZ (float): Z position of the focal plane [mm].
+        blurPerMm (float): Radius of defocus blur [px] per mm out of focus.
+        fullScaleExposure (float): Exposure time [us] at which the sample
+            brightness reaches full scale.
+        stalled (bool): Simulate hung camera, no frames are delivered while
+            True. Defaults to False.
+        colorGains ((float,float,float)): Relative brightness of red, green
+            and blue of the sample seen by the color camera.
+        dropRate (float): Probability that a frame is lost on the way to
+            the host (frame counter skips it, but the grab result does not
+            report it as skipped). Defaults to 0.
+    """
+
+    def __init__(self,width=2448,height=2048,bitDepth=8,fps=30,jitter=0,
+                 noise=2,serial='SYN0001',color=False):
+        self.sensor = (width,height)
+        self.fps = fps
+        self.jitter = jitter
+        self.noise = noise
+        self.serial = serial
+
+        self.stagePosition = None
+        self.pixelSize = 0.001
+        self.focusZ = 0
+        self.blurPerMm = 50
+        self.fullScaleExposure = 1000
+        self.stalled = False
+        self.colorGains = (1.0,0.8,0.55)
+        self.dropRate = 0
+
+        self.opened = False
+        self.grabbing = False
+        self.maxImages = None       # Limit of `StartGrabbingMax()`
+        self.strategy = GRAB_ONEBYONE
+        self.lock = threading.Lock()
+
+        self.t0 = 0                 # Time of the first frame
+        self.lastIdx = -1           # Index of the last delivered frame
+        self.delivered = 0          # Number of delivered frames
+
+        # Camera nodes
+        b = lambda: self.BinningHorizontal.GetValue()*\
+            self.DecimationHorizontal.GetValue()
+        self.Width = Node(width,16,lambda: width//b()-self.OffsetX.GetValue(),4)
+        self.Height = Node(height,16,lambda: height//b()-self.OffsetY.GetValue(),2)
+        self.OffsetX = Node(0,0,lambda: width//b()-self.Width.GetValue(),4)
+        self.OffsetY = Node(0,0,lambda: height//b()-self.Height.GetValue(),2)
+        self.ExposureTime = Node(10000.0,20.0,1e6,1)
+        self.BinningHorizontal = Node(1,1,4,1,onChange=self.__sizeChanged)
+        self.BinningVertical = Node(1,1,4,1)
+        self.BinningHorizontalMode = Node('Average',
+            symbolics=['Sum','Average'])
+        self.DecimationHorizontal = Node(1,1,4,1,onChange=self.__sizeChanged)
+        self.DecimationVertical = Node(1,1,4,1)
+        self.PixelFormat = Node(('BayerRG' if color else 'Mono')+str(bitDepth),
+            symbolics=['Mono8','Mono12','Mono12p','BayerRG8','BayerRG12',
+                'BayerRG12p'])
+        self.AcquisitionFrameRate = Node(float(fps),1.0,1000.0,0.1,
+            onChange=self.__fpsChanged)
+        self.ResultingFrameRate = Node(self.__resultingFps,writable=False)
+        self.MaxNumBuffer = Node(10,1,1024,1)
+        self.GevTimestampTickFrequency = Node(1000000000,writable=False)
+
+        # Chunk data, `ChunkEnable` applies to the selected chunk
+        self.chunksEnabled = set()
+        self.ChunkModeActive = Node(False,symbolics=[False,True])
+        self.ChunkSelector = Node('Timestamp',symbolics=list(CHUNKS))
+        self.ChunkEnable = Node(self.__chunkEnabled,symbolics=[False,True],
+            onChange=self.__enableChunk)
+
+        self.__makeSample()
+
+    def __sizeChanged(self,*_):
+        """ Keep image within the sensor after binning/decimation changed """
+        b = self.BinningHorizontal.GetValue()*self.DecimationHorizontal.GetValue()
+        w,h = self.sensor[0]//b,self.sensor[1]//b
+        self.OffsetX.value = 0
+        self.OffsetY.value = 0
+        self.Width.value = min(self.Width.value,w) - min(self.Width.value,w)%4
+        self.Height.value = min(self.Height.value,h) - min(self.Height.value,h)%2
+
+    def __chunkEnabled(self):
+        return self.ChunkSelector.GetValue() in self.chunksEnabled
+
+    def __enableChunk(self,enable):
+        if enable:
+            self.chunksEnabled.add(self.ChunkSelector.GetValue())
+        else:
+            self.chunksEnabled.discard(self.ChunkSelector.GetValue())
+        # Value is derived from the selected chunk, not stored
+        self.ChunkEnable.value = self.__chunkEnabled
+
+    def __fpsChanged(self,fps):
+        self.fps = fps
+
+    def __resultingFps(self):
+        """ Frame rate limited by the exposure time """
+        return min(self.fps,1e6/self.ExposureTime.GetValue())
+
+    def __makeSample(self):
+        """ Create periodic sample texture (values 0-1) twice as large as the
+        sensor so any image is a view of it. """
+        w,h = self.sensor
+        rng = np.random.default_rng(0)
+        base = np.full((h,w),0.5,np.float32)
+        # Craters: dark discs with bright rims
+        yy,xx = np.mgrid[-12:13,-12:13]
+        r = np.sqrt(xx**2+yy**2)
+        crater = np.where(r<8,-0.35,0)+np.where((r>=8)&(r<11),0.3,0)
+        for y,x in rng.integers(0,(h-25,w-25),size=(max(w*h//20000,1),2)):
+            base[y:y+25,x:x+25] += crater
+        base += boxBlur(rng.normal(0,0.5,(h,w)).astype(np.float32),3)
+        # Stored as 8 bits (4x less memory), tiled so any view fits into it
+        self.sample = np.tile(np.uint8(255*np.clip(base,0,1)),(2,2))
+        # Noise bank slightly larger than the sensor. Random views of it are
+        # used as noise so no random numbers are generated per frame.
+        m = NOISE_MARGIN
+        self.noiseBank = rng.normal(0,1,(h+m,w+m)).astype(np.float32)
+
+    # Interface of `pylon.InstantCamera` ---------------------------------------
+
+    def Open(self):
+        self.opened = True
+
+    def Close(self):
+        self.StopGrabbing()
+        self.opened = False
+
+    def IsOpen(self):
+        return self.opened
+
+    def GetDeviceInfo(self):
+        return DeviceInfo(self.serial)
+
+    def StartGrabbing(self,strategy=GRAB_ONEBYONE,*_):
+        self.__start(strategy,None)
+
+    def StartGrabbingMax(self,n,strategy=GRAB_ONEBYONE,*_):
+        self.__start(strategy,n)
+
+    def __start(self,strategy,n):
+        if not self.opened:
+            raise RuntimeError("Camera is not open!")
+        with self.lock:
+            self.strategy = strategy
+            self.maxImages = n
+            self.t0 = time.perf_counter()
+            self.lastIdx = -1
+            self.delivered = 0
+            self.grabbing = True
+
+    def StopGrabbing(self):
+        self.grabbing = False
+
+    def IsGrabbing(self):
+        return self.grabbing
+
+    def RetrieveResult(self,timeout,handling=TIMEOUT_THROW):
+        """ Wait for the next frame according to the grab strategy.
+
+        Args:
+            timeout (int): Timeout [ms].
+            handling: :data:`TIMEOUT_THROW` or :data:`TIMEOUT_RETURN`.
+
+        Returns:
+            :class:`GrabResult`: Result (not succeeded if timeout elapsed and
+            `handling` is :data:`TIMEOUT_RETURN`).
+        """
+        if not self.grabbing:
+            raise RuntimeError("Camera is not grabbing!")
+
+        period = 1/self.__resultingFps()
+        now = time.perf_counter()
+        newest = int((now-self.t0)/period)-1    # Newest finished frame
+        buffers = self.MaxNumBuffer.GetValue()
+
+        if self.strategy == GRAB_LATEST:
+            idx = max(newest,self.lastIdx+1)
+        elif self.strategy == GRAB_UPCOMING:
+            idx = newest+1
+        else:
+            # One by one: frames which did not fit to buffers are lost
+            idx = max(self.lastIdx+1,newest-buffers+1)
+        skipped = max(idx-self.lastIdx-1,0)
+        # Frames lost in transport (not reported as skipped)
+        while self.dropRate and np.random.random() < self.dropRate:
+            idx += 1
+
+        # Wait for the end of exposure of frame `idx`. Image is rendered
+        # meanwhile so rendering does not limit the frame rate.
+        tEnd = self.t0 + (idx+1)*period
+        if self.jitter:
+            tEnd += abs(np.random.normal(0,self.jitter))
+        if self.stalled or tEnd - now > timeout/1000:
+            time.sleep(timeout/1000)
+            if handling == TIMEOUT_THROW:
+                raise TimeoutError(f"Grab timed out ({timeout} ms)!")
+            return GrabResult()
+        img = self.render()
+        wait = tEnd - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+
+        self.lastIdx = idx
+        self.delivered += 1
+        if self.maxImages is not None and self.delivered >= self.maxImages:
+            self.grabbing = False
+
+        chunks = {}
+        if self.ChunkModeActive.GetValue():
+            values = {
+                'Timestamp':    int(tEnd*1e9),
+                'Framecounter': idx,
+                'ExposureTime': self.ExposureTime.GetValue(),
+            }
+            for selector in self.chunksEnabled:
+                chunks[CHUNKS[selector]] = values[selector]
+
+        packed = self.PixelFormat.GetValue().endswith('p')
+        h,w = img.shape
+        return GrabResult(packMono12p(img) if packed else img,
+            timestamp=int(tEnd*1e9),imageNumber=idx+1,skipped=skipped,
+            chunks=chunks,width=w,height=h,packed=packed)
+
+    # Image synthesis ----------------------------------------------------------
+
+    def render(self):
+        """ Render image according to current settings and stage position.
+
+        Returns:
+            :class:`np.ndarray`: Image (``np.uint8`` or ``np.uint16``).
+        """
+        x,y,z = (0,0,self.focusZ)
+        if self.stagePosition is not None:
+            x,y,z = self.stagePosition()
+
+        b = self.BinningHorizontal.GetValue()*self.DecimationHorizontal.GetValue()
+        w,h = self.Width.GetValue(),self.Height.GetValue()
+        sw,sh = self.sensor
+
+        # Cut the image out of the (periodic) sample
+        ox = int(round(x/self.pixelSize)) + b*self.OffsetX.GetValue()
+        oy = int(round(-y/self.pixelSize)) + b*self.OffsetY.GetValue()
+        ox,oy = ox % sw, oy % sh
+        view = self.sample[oy:oy+h*b:b,ox:ox+w*b:b]
+
+        # Brightness
+        pixelFormat = self.PixelFormat.GetValue()
+        depth = 8 if pixelFormat.endswith('8') else 12
+        vmax = 2**depth-1
+        scale = vmax*self.ExposureTime.GetValue()/self.fullScaleExposure
+        img = np.multiply(view,np.float32(scale/255),dtype=np.float32)
+
+        # Defocus
+        r = int(abs(z-self.focusZ)*self.blurPerMm/b)
+        img = boxBlur(img,r)
+
+        # Noise
+        nx,ny = np.random.randint(0,NOISE_MARGIN,2)
+        noise = self.noiseBank[ny:ny+h,nx:nx+w]
+        img += noise*np.float32(self.noise*2**(depth-8))
+
+        # Color filter of the sensor
+        pattern = bayerPattern(pixelFormat)
+        if pattern is not None:
+            (ry,rx),(by,bx) = BAYER_PATTERNS[pattern]
+            r,g,b = (np.float32(gain) for gain in self.colorGains)
+            img[ry::2,rx::2] *= r
+            img[ry::2,bx::2] *= g
+            img[by::2,rx::2] *= g
+            img[by::2,bx::2] *= b
+
+        np.clip(img,0,vmax,out=img)
+        return img.astype(np.uint8 if depth == 8 else np.uint16)
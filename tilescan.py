@@ -0,0 +1,639 @@
+"""
+Tile scan
+=========
+
+Module used to acquire mosaics of the sample by moving the XY stage
+(:class:`xeryon.Motor`) and taking one image of the **Basler** camera per
+tile.
+
+**Plan:** Tiles cover a rectangle in stage coordinates [mm]. Tile size is the
+field of view of the camera (:func:`basler.Basler.getDimensions` times
+:func:`basler.Basler.getPixelSize`), neighboring tiles overlap at least by
+the given fraction. Tiles are visited in a serpentine (rows along X, every
+other row backwards), see :func:`planTiles`.
+
+**Acquisition:** For each tile, the stage moves and settles (see
+:func:`xeryon.Motor.waitForPosition`), then the first frame of the live
+stream exposed afterwards is taken (:class:`TileScan` is one of
+:attr:`basler.Thread.consumers`, like :class:`autofocus.AutoFocus`, see
+:class:`autofocus.FrameRequest`). If a focus map is given
+(:class:`autofocus.FocusMapper`), Z moves to the map together with XY. If a
+focus lock is given (:class:`autofocus.FocusLock`), it is held while a tile
+is exposed (see :func:`autofocus.FocusLock.hold`).
+
+**Pipeline:** Only the exposure is serialized with motion. As soon as the
+frame of a tile arrives, it is passed to :class:`TileWriter` which encodes
+and writes it in its own thread while the stage moves to the next tile, so
+time per tile approaches max(move + expose, write) instead of their sum.
+The queue of the writer is bounded, the scan waits if the disk is slower
+than the stage (tiles are never dropped). Duration of each stage (move,
+settle, expose, wait, write) is recorded by :class:`TileTiming`.
+
+**Files:** Tiles are written to separate images (`name_r000_c000.tiff`,
+...). Stage positions and metadata of tiles are written to `name_tiles.csv`,
+pixel positions to `name_TileConfiguration.txt` which can be loaded by
+stitching tools (e.g. *Grid/Collection stitching* of Fiji) and durations of
+stages to `name_timing.csv`.
+"""
+
+import os
+import csv
+import time
+import queue
+import threading
+from datetime import datetime
+import numpy as np
+from PyQt5.QtCore import Qt, QObject, QThreadPool, pyqtSignal
+from PyQt5.QtWidgets import (QWidget, QPushButton, QHBoxLayout, QLabel,
+    QLineEdit)
+from PyQt5.QtGui import QDoubleValidator
+
+import ablolib as al
+from recorder import encodeImage
+from autofocus import FrameRequest
+
+# Minimum overlap of neighboring tiles (fraction of the field of view)
+TILE_OVERLAP = 0.1
+
+# Format and compression of tiles, see `recorder.encodeImage()`
+TILE_EXT = '.tiff'
+TILE_COMPRESSION = 0
+
+# Maximum number of tiles waiting for writing (see `TileWriter`)
+TILE_QUEUE = 8
+
+def planTiles(rect,fov,overlap=TILE_OVERLAP):
+    """ Plan serpentine tile scan of `rect`. Tiles are spread evenly so the
+    first and the last tile of each row (column) touch edges of `rect`, the
+    overlap is at least `overlap`.
+
+    Args:
+        rect ((float,float,float,float)): Scanned area (x0, y0, x1, y1)
+            [mm].
+        fov ((float,float)): Field of view (width, height) [mm].
+        overlap (float): Minimum overlap of tiles (fraction of `fov`).
+            Defaults to :data:`TILE_OVERLAP`.
+
+    Returns:
+        (:class:`np.ndarray`, :class:`np.ndarray`): Centers of tiles (x, y)
+        [mm] and their grid indices (row, column), both of shape (n, 2) in
+        the order of acquisition.
+    """
+    x0,x1 = sorted(rect[0::2])
+    y0,y1 = sorted(rect[1::2])
+
+    def centers(a0,a1,size):
+        """ Centers of tiles covering [a0, a1] """
+        span = a1-a0-size
+        if span <= 0:
+            return np.array([(a0+a1)/2])
+        n = int(np.ceil(span/(size*(1-overlap)) - 1e-9)) + 1
+        return a0 + size/2 + np.linspace(0,span,n)
+
+    xs = centers(x0,x1,fov[0])
+    ys = centers(y0,y1,fov[1])[::-1]    # Top row (highest Y) first
+    cols,rows = np.meshgrid(np.arange(len(xs)),np.arange(len(ys)))
+    cols[1::2] = cols[1::2,::-1]        # Odd rows backwards
+    rows,cols = rows.ravel(),cols.ravel()
+    return np.column_stack([xs[cols],ys[rows]]),np.column_stack([rows,cols])
+
+class TileTiming():
+    """
+    Durations of stages of each tile of a scan:
+
+        - `move`: travel of the stage until it is at the tile position,
+        - `settle`: until the motors report the position reached,
+        - `expose`: until the first frame exposed afterwards arrives,
+        - `wait`: waiting for a free place in the queue of
+          :class:`TileWriter` (disk slower than the stage),
+        - `write`: encoding and writing of the tile (in parallel with the
+          next tiles),
+        - `tile`: wall-clock time of the tile, i.e. from the start of its
+          move to the start of the next move.
+
+    Args:
+        n (int): Number of tiles.
+    """
+
+    STAGES = ['move','settle','expose','wait','write','tile']
+
+    def __init__(self,n):
+        self.data = np.full((n,len(self.STAGES)),np.nan)
+
+    def set(self,tile,stage,duration):
+        """ Record `duration` [s] of `stage` of `tile` """
+        self.data[tile,self.STAGES.index(stage)] = duration
+
+    def means(self):
+        """ Get mean durations of stages.
+
+        Returns:
+            dict: Stage -> mean duration [ms] (nan if not available).
+        """
+        result = {}
+        for i,key in enumerate(self.STAGES):
+            col = self.data[:,i]
+            col = col[~np.isnan(col)]
+            result[key] = 1000*col.mean() if len(col) else np.nan
+        return result
+
+    def summary(self):
+        """ Get text table of mean and maximum durations of stages """
+        txt = f"{'stage':<9}{'mean':>8}{'max':>8}  [ms]\n"
+        for i,key in enumerate(self.STAGES):
+            col = self.data[:,i]
+            col = 1000*col[~np.isnan(col)]
+            values = (col.mean(),col.max()) if len(col) else (np.nan,np.nan)
+            txt += f"{key:<9}" + "".join(f"{v:8.1f}" for v in values) + "\n"
+        return txt.rstrip()
+
+    def toCSV(self,fullname):
+        """ Save durations [ms] of all tiles to a ``.csv`` file.
+
+        Args:
+            fullname (str): Full name of the file.
+        """
+        np.savetxt(fullname,1000*self.data,delimiter=',',fmt='%.3f',
+            header=','.join(self.STAGES),comments='')
+
+class TileWriter():
+    """
+    Writes tiles passed by :func:`put` in a background thread: image files,
+    rows of `name_tiles.csv` and, when closed, `name_TileConfiguration.txt`
+    (see module description). Unlike :class:`recorder.Recorder`, tiles are
+    never dropped, :func:`put` blocks while the queue is full.
+
+    Args:
+        path (str): Directory of tiles.
+        name (str): Core of file names.
+        ext (str): Format of tiles. Defaults to :data:`TILE_EXT`.
+        compression (int): See :func:`recorder.encodeImage`. Defaults to
+            :data:`TILE_COMPRESSION`.
+        queueSize (int): Maximum number of tiles waiting for writing.
+            Defaults to :data:`TILE_QUEUE`.
+        timing (:class:`TileTiming`,optional): Durations of writing are
+            recorded here. Defaults to None.
+        release (callable,optional): Called with each frame passed to
+            :func:`put` when it is written (or skipped after a failure), e.g.
+            :func:`basler.BufferPool.release`. Defaults to None.
+
+    Attributes:
+        written (int): Number of written tiles.
+        failed (bool): Writing failed, the scan should stop.
+    """
+
+    def __init__(self,path,name,ext=TILE_EXT,compression=TILE_COMPRESSION,
+                 queueSize=TILE_QUEUE,timing=None,release=None):
+        self.path = path
+        self.name = name
+        self.ext = ext
+        self.compression = compression
+        self.timing = timing
+        self.release = release
+        self.queue = queue.Queue(maxsize=queueSize)
+        self.thread = None
+        self.written = 0
+        self.failed = False
+        self.tiles = []         # File names and pixel positions of tiles
+
+        os.makedirs(path,exist_ok=True)
+        self.csvFile = open(os.path.join(path,f"{name}_tiles.csv"),'w',
+            newline='')
+        self.csvWriter = None
+
+    def start(self):
+        """ Start the writer thread """
+        self.thread = threading.Thread(target=self.__run,daemon=True)
+        self.thread.start()
+
+    def put(self,frame,record,pixelPos):
+        """ Pass tile for writing. Blocks while the queue is full. Tile is
+        written immediately (in the calling thread) if the writer thread is
+        not started.
+
+        Args:
+            frame (:class:`np.ndarray`): Image of the tile (not copied).
+            record (dict): Row of `name_tiles.csv`: tile number `tile`, grid
+                indices `row` and `col`, stage position `x`, `y`, `z`, file
+                name `file` (see :func:`fileName`) and frame metadata
+                (`bitDepth` and `bayer` are used to encode the image).
+            pixelPos ((float,float)): Position of the tile in the mosaic
+                [px].
+
+        Returns:
+            float: Time spent waiting for the queue [s].
+        """
+        if self.thread is None:
+            try:
+                self.write(frame,record,pixelPos)
+            finally:
+                self.__release(frame)
+            return 0.0
+        t = time.perf_counter()
+        self.queue.put((frame,record,pixelPos))
+        return time.perf_counter() - t
+
+    def fileName(self,row,col):
+        """ Get file name of the tile at grid indices `row`, `col` """
+        return f"{self.name}_r{row:03d}_c{col:03d}{self.ext}"
+
+    def write(self,frame,record,pixelPos):
+        """ Encode and write the tile, see :func:`put` """
+        t = time.perf_counter()
+        encodeImage(frame,os.path.join(self.path,record['file']),
+            self.compression,record.get('bitDepth'),record.get('bayer') or None)
+        if self.csvWriter is None:
+            self.csvWriter = csv.DictWriter(self.csvFile,
+                fieldnames=list(record.keys()),restval='',
+                extrasaction='ignore')
+            self.csvWriter.writeheader()
+        self.csvWriter.writerow(record)
+        self.tiles.append((record['file'],)+tuple(pixelPos))
+        self.written += 1
+        if self.timing is not None:
+            self.timing.set(record['tile'],'write',time.perf_counter()-t)
+
+    def close(self):
+        """ Write tiles waiting in the queue, stop the writer thread and
+        write `name_TileConfiguration.txt`. Blocking. """
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        self.csvFile.close()
+        with open(os.path.join(self.path,
+                  f"{self.name}_TileConfiguration.txt"),'w') as fh:
+            fh.write("# Define the number of dimensions we are working on\n")
+            fh.write("dim = 2\n\n# Define the image coordinates\n")
+            for filename,px,py in self.tiles:
+                fh.write(f"{filename}; ; ({px:.1f}, {py:.1f})\n")
+
+    def __run(self):
+        """ Writer thread: write tiles until `None` is received """
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            try:
+                if not self.failed:     # Else drain so `put()` does not block
+                    self.write(*item)
+            except Exception as ex:
+                self.failed = True
+                al.printE("TileWriter: writing failed!")
+                al.printException(ex)
+            finally:
+                self.__release(item[0])
+
+    def __release(self,frame):
+        if self.release is not None:
+            self.release(frame)
+
+class TileScan(QObject):
+    """
+    **Bases:** :class:`QObject`
+
+    Tile scan engine, see module description. Frames are delivered by
+    :func:`push` (add this object to :attr:`basler.BaslerGUI.consumers`).
+
+    Args:
+        basler (:class:`basler.Basler`): Camera (field of view).
+        motorX (:class:`xeryon.Motor`): X stage.
+        motorY (:class:`xeryon.Motor`): Y stage.
+        focusMapper (:class:`autofocus.FocusMapper`,optional): Z is moved to
+            its map if it is not empty. Defaults to None.
+        focusLock (:class:`autofocus.FocusLock`,optional): Focus lock of the
+            Z stage, held while tiles are exposed. Defaults to None.
+
+    Attributes:
+        overlap (float): Minimum overlap of tiles, see :func:`planTiles`.
+        ext (str): Format of tiles. Defaults to :data:`TILE_EXT`.
+        compression (int): See :func:`recorder.encodeImage`.
+        pipelined (bool): Write tiles in parallel with the next moves (see
+            :class:`TileWriter`). Defaults to True, set False to write each
+            tile before moving on (for comparison).
+        scanT (float): Duration of the last scan [s].
+        timing (:class:`TileTiming`): Durations of stages of the last scan.
+        tileAcquired (:class:`pyqtSignal`): Emits number of acquired tiles
+            and number of all tiles.
+        finished (:class:`pyqtSignal`): Emits :attr:`scanT`.
+        failed (:class:`pyqtSignal`): Emits error message.
+    """
+
+    tileAcquired = pyqtSignal(int,int)
+    finished = pyqtSignal(float)
+    failed = pyqtSignal(str)
+
+    def __init__(self,basler,motorX,motorY,focusMapper=None,focusLock=None):
+        super().__init__()
+
+        self.Basler = basler
+        self.motorX = motorX
+        self.motorY = motorY
+        self.focusMapper = focusMapper
+        self.focusLock = focusLock
+        self.overlap = TILE_OVERLAP
+        self.ext = TILE_EXT
+        self.compression = TILE_COMPRESSION
+        self.pipelined = True
+        self.scanT = None
+        self.timing = None
+
+        self.running = False
+        self.aborted = False
+        self.frameRequest = FrameRequest(discard=basler.pool.release)
+        self.threadpool = QThreadPool()
+
+    def getFOV(self):
+        """ Get field of view of the camera.
+
+        Returns:
+            (float,float): Width and height [mm].
+        """
+        w,h = self.Basler.getDimensions()
+        pixelSize = self.Basler.getPixelSize()
+        return w*pixelSize,h*pixelSize
+
+    def plan(self,rect):
+        """ Plan tiles of `rect` with the current field of view and
+        :attr:`overlap`, see :func:`planTiles`. """
+        return planTiles(rect,self.getFOV(),self.overlap)
+
+    def push(self,img,meta):
+        """ Keep `img` if it was requested by :func:`grab` (retained in
+        :attr:`basler.Basler.pool` until written), otherwise return
+        immediately. Called by :class:`basler.Thread` with each grabbed
+        image.
+
+        Args:
+            img (:class:`np.ndarray`): Grabbed image.
+            meta (dict): Metadata of the image, see
+                :func:`autofocus.AutoFocus.push`.
+        """
+        if self.frameRequest.accept(meta):
+            self.frameRequest.put(self.Basler.pool.retain(img),meta)
+
+    def grab(self):
+        """ Wait for the first frame exposed after this call. Blocking.
+
+        Returns:
+            (:class:`np.ndarray`, dict): Frame and its metadata or (None,
+            None) if no frame came in :data:`autofocus.FRAME_TIMEOUT`.
+        """
+        self.frameRequest.request()
+        frame,meta = self.frameRequest.wait()
+        if frame is None and not self.aborted:
+            al.printE("TileScan: No frame received, is the camera streaming?")
+        return frame,meta
+
+    def moveTo(self,x,y,tile=None):
+        """ Move the stage to (x, y) (and Z to the focus map) and wait until
+        it settles. :attr:`focusLock` is held afterwards (if settled), call
+        its :func:`autofocus.FocusLock.release` when the tile is exposed.
+        Blocking.
+
+        Args:
+            x (float): Position X [mm].
+            y (float): Position Y [mm].
+            tile (int,optional): Durations of `move` and `settle` of this
+                tile are recorded to :attr:`timing`. Defaults to None.
+
+        Returns:
+            (bool, float): True if settled and Z commanded from the focus map
+            or None.
+        """
+        t = time.perf_counter()
+        self.motorX.DPOS.set(x)
+        self.motorY.DPOS.set(y)
+        targets = [(self.motorX,x),(self.motorY,y)]
+        z = None
+        if self.focusMapper is not None:
+            z = self.focusMapper.moveZ(x,y)
+            if z is not None:
+                targets.append((self.focusMapper.autofocus.motor,z))
+        settled = all(motor.waitForPosition(pos,settle=False)
+            for motor,pos in targets)
+        moveT = time.perf_counter()
+        settled = settled and all(motor.waitForPosition(pos)
+            for motor,pos in targets)
+        if settled and self.focusLock is not None:
+            settled = self.focusLock.hold()
+        if tile is not None:
+            self.timing.set(tile,'move',moveT-t)
+            self.timing.set(tile,'settle',time.perf_counter()-moveT)
+        if not settled:
+            al.printE(f"TileScan: Stage did not settle at ({x:.3f},{y:.3f})!")
+        return settled,z
+
+    def start(self,rect,path,name):
+        """ Run :func:`scan` of `rect` in a worker thread. :attr:`finished`
+        or :attr:`failed` emits when done.
+
+        Args:
+            rect ((float,float,float,float)): Scanned area, see
+                :func:`planTiles`.
+            path (str): Directory of tiles.
+            name (str): Core of file names.
+
+        Returns:
+            bool: False if a motor is not connected or a scan is running.
+        """
+        if self.running:
+            return False
+        if not (self.motorX.connected and self.motorY.connected):
+            self.failed.emit("XY stage is not connected!")
+            return False
+        positions,indices = self.plan(rect)
+        self.running = True
+        self.aborted = False
+        worker = al.Worker(self.__run,positions,indices,path,name,
+            name="TileScan")
+        self.threadpool.start(worker)
+        return True
+
+    def abort(self):
+        """ Stop running scan, the current tile is not taken """
+        self.aborted = True
+        self.frameRequest.cancel()
+
+    def __run(self,*args):
+        try:
+            done = self.scan(*args)
+        finally:
+            self.running = False
+        if done:
+            self.finished.emit(self.scanT)
+        else:
+            self.failed.emit("Tile scan aborted" if self.aborted
+                else "Tile scan failed")
+
+    def scan(self,positions,indices,path,name):
+        """ Acquire tiles at `positions` and write them to `path`, see
+        Pipeline in the module description. Blocking, call from a worker
+        thread (see :func:`start`).
+
+        Args:
+            positions (:class:`np.ndarray`): Centers of tiles (x, y) [mm],
+                see :func:`planTiles`.
+            indices (:class:`np.ndarray`): Grid indices (row, column).
+            path (str): Directory of tiles.
+            name (str): Core of file names.
+
+        Returns:
+            bool: True if all tiles were acquired and written.
+        """
+        startT = time.perf_counter()
+        n = len(positions)
+        pixelSize = self.Basler.getPixelSize()
+        self.timing = TileTiming(n)
+        writer = TileWriter(path,name,self.ext,self.compression,
+            timing=self.timing,release=self.Basler.pool.release)
+        if self.pipelined:
+            writer.start()
+        try:
+            for i,((x,y),(row,col)) in enumerate(zip(positions,indices)):
+                tileT = time.perf_counter()
+                if self.aborted or writer.failed:
+                    return False
+                settled,z = self.moveTo(x,y,tile=i)
+                try:
+                    if not settled:
+                        return False
+                    t = time.perf_counter()
+                    frame,meta = self.grab()
+                finally:
+                    if self.focusLock is not None:
+                        self.focusLock.release()
+                if frame is None:
+                    return False
+                self.timing.set(i,'expose',time.perf_counter()-t)
+
+                record = {'tile': i, 'row': row, 'col': col, 'x': x, 'y': y,
+                    'z': z, 'file': writer.fileName(row,col)}
+                record.update(meta)
+                pixelPos = ((x-positions[0,0])/pixelSize,
+                    (positions[0,1]-y)/pixelSize)
+                self.timing.set(i,'wait',writer.put(frame,record,pixelPos))
+                self.timing.set(i,'tile',time.perf_counter()-tileT)
+                self.tileAcquired.emit(i+1,n)
+        finally:
+            writer.close()
+            self.timing.toCSV(os.path.join(path,f"{name}_timing.csv"))
+
+        if writer.failed:
+            return False
+        self.scanT = time.perf_counter() - startT
+        al.printOK(f"TileScan: {n} tiles in {self.scanT:.1f} s "
+            f"({self.scanT/n:.2f} s per tile)\n{self.timing.summary()}")
+        return True
+
+class TileScanGUI(QWidget):
+    """
+    **Bases:** :class:`QWidget`
+
+    Controls of :class:`TileScan`: scanned area (defaults to limits of
+    `xystage`), overlap and start/abort button. Planned tiles are shown on
+    the canvas of `xystage`. Tiles are saved to the directory set in
+    :attr:`basler.BaslerGUI.saveSettings` (file name core and a timestamp).
+
+    Args:
+        tileScan (:class:`TileScan`): Tile scan to be controlled.
+        xystage (:class:`xeryon.XYWidget`): XY stage widget.
+        camera (:class:`basler.BaslerGUI`): Camera providing frames.
+        messageSignal (:class:`pyqtSignal`,optional): Signal showing messages
+            in the statusbar. Defaults to None.
+    """
+
+    def __init__(self,tileScan,xystage,camera,messageSignal=None):
+        super().__init__()
+
+        self.tileScan = tileScan
+        self.xystage = xystage
+        self.camera = camera
+        self.messageSignal = messageSignal
+
+        self.tileScan.tileAcquired.connect(self.__tileAcquired)
+        self.tileScan.finished.connect(self.__finished)
+        self.tileScan.failed.connect(self.__failed)
+
+        self.btnScan = QPushButton('Tile scan',self)
+        self.btnScan.setToolTip('Acquire mosaic of the area (click again to '
+            'abort)')
+        self.btnScan.setCursor(Qt.PointingHandCursor)
+        self.btnScan.clicked.connect(self.__btnScanClicked)
+
+        # Scanned area: x0, y0, x1, y1 [mm]
+        self.qleRect = []
+        for tip in ['X from','Y from','X to','Y to']:
+            qle = QLineEdit('',self)
+            qle.setFixedWidth(45)
+            qle.setValidator(QDoubleValidator())
+            qle.setToolTip(tip+' [mm] (empty: stage limit)')
+            qle.editingFinished.connect(self.__showPlan)
+            self.qleRect.append(qle)
+
+        self.qleOverlap = QLineEdit(str(self.tileScan.overlap),self)
+        self.qleOverlap.setFixedWidth(40)
+        self.qleOverlap.setValidator(QDoubleValidator(0,0.9,2))
+        self.qleOverlap.setToolTip('Overlap of tiles')
+        self.qleOverlap.editingFinished.connect(self.__qleOverlapSet)
+
+        self.lblProgress = QLabel('',self)
+
+        hbox = QHBoxLayout()
+        hbox.setContentsMargins(0,0,0,0)
+        hbox.addWidget(self.btnScan)
+        for qle in self.qleRect:
+            hbox.addWidget(qle)
+        hbox.addWidget(self.qleOverlap)
+        hbox.addWidget(self.lblProgress)
+        hbox.addStretch()
+        self.setLayout(hbox)
+
+    def getRect(self):
+        """ Get scanned area, empty fields are replaced by stage limits.
+
+        Returns:
+            (float,float,float,float): x0, y0, x1, y1 [mm].
+        """
+        limits = [self.xystage.xlim[0],self.xystage.ylim[0],
+            self.xystage.xlim[1],self.xystage.ylim[1]]
+        return tuple(float(qle.text()) if qle.text() else limit
+            for qle,limit in zip(self.qleRect,limits))
+
+    def __showPlan(self):
+        if self.camera.Basler.connected:
+            positions,_ = self.tileScan.plan(self.getRect())
+            self.xystage.setPoints(positions)
+            self.lblProgress.setText('%d tiles'%len(positions))
+
+    def __qleOverlapSet(self):
+        self.tileScan.overlap = float(self.qleOverlap.text())
+        self.__showPlan()
+
+    def __btnScanClicked(self):
+        if self.tileScan.running:
+            self.tileScan.abort()
+            return
+        if not self.camera.Basler.connected:
+            al.emitMsg(self.messageSignal,'Camera is not connected!')
+            return
+        self.camera.startStream()
+        self.__showPlan()
+        settings = self.camera.saveSettings
+        name = (settings.filename_core + '_tiles_'
+            + datetime.now().strftime('%Y%m%d_%H%M%S'))
+        path = os.path.join(settings.path,name)
+        if self.tileScan.start(self.getRect(),path,name):
+            self.btnScan.setText('Abort')
+            al.emitMsg(self.messageSignal,f'Tile scan started ({path})')
+
+    def __tileAcquired(self,i,n):
+        self.lblProgress.setText('%d/%d tiles'%(i,n))
+
+    def __finished(self,scanT):
+        self.btnScan.setText('Tile scan')
+        al.emitMsg(self.messageSignal,'Tile scan finished in %0.1f s'%scanT)
+
+    def __failed(self,msg):
+        self.btnScan.setText('Tile scan')
+        al.emitMsg(self.messageSignal,msg)
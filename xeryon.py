@@ -62,6 +62,11 @@ from serial.tools import list_ports
 # Set timeout after which motor updates its values and emits signals for LEDs
 MOTOR_UPDATE_TIMER = 500    # [ms]
 
+# Settle detection, see `Motor.waitForPosition()`
+MOVE_TIMEOUT = 5            # [s]
+POSITION_TOLERANCE = 0.002  # [units of the motor]
+SETTLE_POLL = 0.005         # [s]
+
 def get_serial_port(serial_number):
     """ Find serial port corresponding to given serial number """
 
@@ -355,6 +360,105 @@ class Motor():
         # print("Motor::step",stepSize)
         self.DPOS.set(float(self.DPOS.get())+stepSize)
 
+    def clip(self,position):
+        """ Clip `position` to :attr:`limits` (linear stages only).
+
+        Args:
+            position (float): Desired position.
+
+        Returns:
+            float: Position within limits.
+        """
+        if self.axis is not None and not self.axis.stage.isLineair:
+            return position
+        return min(max(position,self.limits[0]),self.limits[1])
+
+    def getPosition(self):
+        """ Read actual position from the controller (unlike :attr:`EPOS`
+        which is updated by :attr:`timer` only).
+
+        Returns:
+            float: Position in :attr:`units` or None if not connected.
+        """
+        if not self.connected:
+            return None
+        epos = float(self.axis.getData('EPOS'))
+        return self.axis.convertEncoderUnitsToUnits(epos,self.units)
+
+    def isPositionReached(self):
+        """ Check if the motor stopped at the desired position.
+
+        Returns:
+            bool: Controller status or False if not connected.
+        """
+        return self.connected and bool(self.axis.isPositionReached())
+
+    def isAt(self,position=None,tolerance=POSITION_TOLERANCE):
+        """ Check if the actual position is within `tolerance` of `position`
+        (the motor may still be settling, see :func:`isSettled`).
+
+        Args:
+            position (float,optional): Target position. Defaults to
+                :attr:`DPOS` (clipped to :attr:`limits`).
+            tolerance (float): Tolerance of the position in :attr:`units`.
+                Defaults to :data:`POSITION_TOLERANCE`.
+
+        Returns:
+            bool: True if at the position, False otherwise or if not
+            connected.
+        """
+        if not self.connected:
+            return False
+        if position is None:
+            position = self.clip(self.DPOS.get())
+        return abs(self.getPosition()-position) <= tolerance
+
+    def isSettled(self,position=None,tolerance=POSITION_TOLERANCE):
+        """ Check if the motor settled, i.e. :func:`isPositionReached` and
+        :func:`isAt` `position`. The position check prevents stale status
+        from being taken as settled when the new :attr:`DPOS` has not been
+        written yet (it is written by the thread which owns :attr:`DPOS`).
+
+        Args:
+            position (float,optional): Target position. Defaults to
+                :attr:`DPOS` (clipped to :attr:`limits`).
+            tolerance (float): Tolerance of the position in :attr:`units`.
+                Defaults to :data:`POSITION_TOLERANCE`.
+
+        Returns:
+            bool: True if settled, False if moving or not connected.
+        """
+        return self.isAt(position,tolerance) and self.isPositionReached()
+
+    def waitForPosition(self,position=None,timeout=MOVE_TIMEOUT,
+                        tolerance=POSITION_TOLERANCE,settle=True):
+        """ Block until the motor settles (see :func:`isSettled`). Used
+        from worker threads, e.g. by :class:`autofocus.AutoFocus`.
+
+        Args:
+            position (float,optional): Target position. Defaults to
+                :attr:`DPOS` (clipped to :attr:`limits`).
+            timeout (float): Maximum waiting time [s]. Defaults to
+                :data:`MOVE_TIMEOUT`.
+            tolerance (float): Tolerance of the position in :attr:`units`.
+                Defaults to :data:`POSITION_TOLERANCE`.
+            settle (bool): Wait for :func:`isPositionReached` too. If False,
+                return as soon as the motor :func:`isAt` `position` (e.g. to
+                time travel and settling separately). Defaults to True.
+
+        Returns:
+            bool: True if settled, False if timed out or not connected.
+        """
+        check = self.isSettled if settle else self.isAt
+        endT = time.perf_counter() + timeout
+        while self.connected:
+            if check(position,tolerance):
+                return True
+            if time.perf_counter() > endT:
+                return False
+            time.sleep(SETTLE_POLL)
+        return False
+
     def __setSpeed(self):
         self.axis.setSpeed(self.speed.get())
 
@@ -1283,6 +1387,11 @@ class XYWidget(QWidget):
 
         self.rectMotorLims = None
 
+        # Custom points (e.g. focus map), see `setPoints()`
+        self.points = pg.ScatterPlotItem(size=8,pen=pg.mkPen('k'),
+            brush=pg.mkBrush(200,50,50,200))
+        self.plt.addItem(self.points)
+
         # Hide axes
         self.plt.showAxis('bottom',False)
         self.plt.showAxis('left',False)
@@ -1308,6 +1417,17 @@ class XYWidget(QWidget):
         self.setMinimumHeight(250)
         self.setMaximumHeight(300)
 
+    def setPoints(self,xy=()):
+        """ Show points on the canvas (e.g. focus map points, see
+        :class:`autofocus.FocusMapper`).
+
+        Args:
+            xy: Sequence of (x, y) positions in motor coordinates. Defaults to
+                no points.
+        """
+        xy = np.asarray(xy,dtype=float).reshape(-1,2)
+        self.points.setData(x=xy[:,0],y=xy[:,1])
+
     def __canvasMouseMoved(self,event):
         """ Called when mouse moves over the canvas """
         pos = event[0]